@@ -1,14 +1,49 @@
-from flask import Flask,request,render_template
-import numpy as np
-import pandas as pd
-
-from sklearn.preprocessing import StandardScaler
+import os
+import time
+from flask import Flask,request,render_template,jsonify,g,Response
+from src.exception import DataValidationError
 from src.pipeline.predict_pipeline import CustomData,PredictPipeline
+from src.pipeline.micro_batcher import MicroBatcher
+from src.pipeline.serving_metrics import get_serving_metrics
+from src.logger import bind_log_context, reset_log_context, new_id
+from src.profiler import get_profiler, install_signal_handler
 
 application=Flask(__name__)
 
 app=application
 
+# Optional serving mode: concurrent /predict requests are queued for a few milliseconds and scored together.
+# Enable with MICRO_BATCHING=1; tune with MICRO_BATCH_MAX_SIZE and MICRO_BATCH_MAX_WAIT_MS.
+micro_batcher=MicroBatcher(PredictPipeline().predict_batch) if os.environ.get('MICRO_BATCHING') == '1' else None
+
+# Per-stage timings and request/error counters, served as text on /metrics. Disable with SERVING_METRICS=0.
+metrics=get_serving_metrics()
+
+# On-demand profiles of the next requests, written to profiles/: `kill -USR2 <pid>` profiles the next
+# PROFILE_SIGNAL_REQUESTS /predict and /predict_batch requests, and POST /profile arms any target when PROFILING_ENDPOINT=1
+profiler=get_profiler()
+install_signal_handler()
+
+@app.before_request
+def start_timer():
+    g.request_started=time.perf_counter()
+    # Every log record of this request carries its ID, which is also returned in the X-Request-ID header
+    g.request_id=request.headers.get('X-Request-ID') or new_id()
+    g.log_context_token=bind_log_context(request_id=g.request_id)
+
+@app.after_request
+def count_request(response):
+    if request.url_rule is not None and 'request_started' in g:
+        metrics.count_request(request.url_rule.rule, response.status_code, time.perf_counter()-g.request_started)
+    if 'request_id' in g:
+        response.headers['X-Request-ID']=g.request_id
+    return response
+
+@app.teardown_request
+def clear_log_context(exception=None):
+    if 'log_context_token' in g:
+        reset_log_context(g.log_context_token)
+
 ## Route for a home page
 
 @app.route('/')
@@ -19,26 +54,90 @@ def index():
 def predict_datapoint():
     if request.method == 'GET':
         return render_template('home.html')
+    with profiler.profile('predict'):
+        with metrics.stage('form_parse'):
+            try:
+                fields=dict(
+                    gender=request.form.get('gender'),
+                    race_ethnicity=request.form.get('ethnicity'),
+                    parental_level_of_education=request.form.get('parental_level_of_education'),
+                    lunch=request.form.get('lunch'),
+                    test_preparation_course=request.form.get('test_preparation_course'),
+                    reading_score=float(request.form.get('writing_score')),
+                    writing_score=float(request.form.get('reading_score'))
+                )
+            except (TypeError, ValueError):
+                # A score field left empty, missing or not a number
+                return render_template('home.html',errors=["The reading and writing scores must be numbers"]), 400
+        with metrics.stage('custom_data'):
+            record=CustomData(**fields).get_data_as_dict()
+
+        try:
+            if micro_batcher is not None:
+                result=micro_batcher.predict(record)
+            else:
+                result=PredictPipeline().predict_batch([record])[0]  # no per-request DataFrame
+        except DataValidationError as e:
+            return render_template('home.html',errors=e.errors), 400
+
+        with metrics.stage('render'):
+            return render_template('home.html',results=result)
+
+## Route for scoring many students in one call
+# Accepts a JSON array of records (or {"records": [...]}), each an object or an array of values in FEATURE_COLUMNS order,
+# or a CSV body with a header row, and returns the predictions in the same order as the records
+
+@app.route('/predict_batch', methods = ['POST'])
+def predict_batch():
+    if request.mimetype == 'text/csv':
+        records=request.get_data()
     else:
-        data=CustomData(
-            gender=request.form.get('gender'),
-            race_ethnicity=request.form.get('ethnicity'),
-            parental_level_of_education=request.form.get('parental_level_of_education'),
-            lunch=request.form.get('lunch'),
-            test_preparation_course=request.form.get('test_preparation_course'),
-            reading_score=float(request.form.get('writing_score')),
-            writing_score=float(request.form.get('reading_score'))
-
-        )
-        pred_df=data.get_data_as_data_frame()
-        print(pred_df)
-        print("Before Prediction")
-
-        predict_pipeline=PredictPipeline()
-        print("Mid Prediction")
-        results=predict_pipeline.predict(pred_df)
-        print("after Prediction")
-        return render_template('home.html',results=results[0])
+        payload=request.get_json(silent=True)
+        records=payload.get('records') if isinstance(payload, dict) else payload
+        if not isinstance(records, list):
+            return jsonify(errors=["Expected a JSON array of records or a CSV body"]), 400
+
+    try:
+        with profiler.profile('predict_batch'):
+            results=PredictPipeline().predict_batch(records)
+    except DataValidationError as e:
+        return jsonify(errors=e.errors), 400
+
+    return jsonify(count=len(results), predictions=results.tolist())
+
+## Hit/miss/eviction counters of the prediction cache
+
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify(PredictPipeline().cache.stats())
+
+## Batch-size and queue-wait statistics of the micro-batching serving mode
+
+@app.route('/batching_stats')
+def batching_stats():
+    if micro_batcher is None:
+        return jsonify(enabled=False)
+    return jsonify(enabled=True, **micro_batcher.stats())
+
+## Per-stage latency percentiles (per model version) and request/error counters, in the Prometheus text format
+
+@app.route('/metrics')
+def serving_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+## Armed profiling targets and the latest profiles written; POST arms a target,
+# e.g. target=predict&count=20&mode=sampled (count=0 disarms it)
+
+@app.route('/profile', methods = ['GET', 'POST'])
+def profile():
+    if request.method == 'POST':
+        if not profiler.config.endpoint:
+            return jsonify(errors=["Arming profiles over HTTP is disabled, set PROFILING_ENDPOINT=1"]), 403
+        try:
+            profiler.arm(request.values.get('target', 'predict'), int(request.values.get('count', 1)), request.values.get('mode'))
+        except ValueError as e:
+            return jsonify(errors=[str(e)]), 400
+    return jsonify(profiler.status())
     
 
 if __name__=="__main__":
@@ -0,0 +1,125 @@
+"""
+Helpers shared by the serving benchmarks: input generation over the CustomData domain, latency summaries, and
+machine-readable results that can be compared against a stored baseline.
+
+Results are JSON files of the form {"benchmark": ..., "config": {...}, "results": {name: summary}}, where every
+summary has a "throughput" (per second) and latency percentiles in milliseconds ("p50_ms", "p95_ms", "p99_ms",
+"max_ms"). `compare_results` matches the summaries of two such files by name.
+"""
+
+import os
+import json
+import time
+import platform
+
+import numpy as np
+
+from src.utils import load_object
+from src.components.data_validaton import CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS, SCORE_RANGE, get_known_categories
+from src.pipeline.model_registry import ModelRegistryConfig
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+
+def known_categories():
+    """
+    Returns the categories of every categorical column, read from the trained preprocessor.
+
+    Returns:
+        dict: Column name -> sorted list of categories.
+    """
+    preprocessor = load_object(ModelRegistryConfig().preprocessor_file_path)
+    return {column: sorted(values) for column, values in get_known_categories(preprocessor).items()}
+
+
+def random_records(rng, categories, n):
+    """
+    Draws records uniformly over the input domain: every known category and every integer score.
+
+    Args:
+        rng (np.random.Generator): Source of randomness, seeded by the caller for reproducible runs.
+        categories (dict): Column name -> list of categories, as returned by known_categories.
+        n (int): Number of records.
+
+    Returns:
+        list: Record dicts with every feature column.
+    """
+    low, high = SCORE_RANGE
+    columns = {column: rng.choice(categories[column], size=n).tolist() for column in CATEGORICAL_COLUMNS}
+    columns.update({column: rng.integers(low, high + 1, size=n).tolist() for column in NUMERICAL_COLUMNS})
+    return [{column: values[row] for column, values in columns.items()} for row in range(n)]
+
+
+def summarize(latencies, elapsed=None, errors=0):
+    """
+    Summarizes request latencies.
+
+    Args:
+        latencies (list): Durations in seconds of the successful calls.
+        elapsed (float, optional): Wall time of the run, for the throughput. Defaults to the sum of the latencies.
+        errors (int): Number of failed calls.
+
+    Returns:
+        dict: count, errors, throughput per second, and mean/p50/p95/p99/max latency in milliseconds.
+    """
+    timings = np.asarray(latencies, dtype=float) * 1e3
+    elapsed = elapsed if elapsed is not None else timings.sum() / 1e3
+    summary = {"count": int(len(timings)), "errors": int(errors), "throughput": len(timings) / elapsed if elapsed else 0.0}
+    if len(timings):
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+        summary.update(mean_ms=float(timings.mean()), p50_ms=float(p50), p95_ms=float(p95), p99_ms=float(p99), max_ms=float(timings.max()))
+    return summary
+
+
+def save_results(file_path, benchmark, config, results):
+    """
+    Writes benchmark results as JSON, with the configuration and the machine they were measured on.
+    """
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    with open(file_path, "w") as file_obj:
+        json.dump({
+            "benchmark": benchmark,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "config": config,
+            "results": results,
+        }, file_obj, indent=2)
+
+
+def compare_results(results, baseline_path, tolerance):
+    """
+    Compares results with a stored baseline and prints the relative change of every metric.
+
+    A result regresses when its throughput drops, or any latency percentile grows, by more than `tolerance`.
+
+    Args:
+        results (dict): Name -> summary, as in a results file.
+        baseline_path (str): Path of an earlier results file.
+        tolerance (float): Allowed relative change, e.g. 0.1 for 10%.
+
+    Returns:
+        list: Descriptions of the regressions; empty if there are none.
+    """
+    with open(baseline_path) as file_obj:
+        baseline = json.load(file_obj)["results"]
+
+    regressions = []
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for name, summary in results.items():
+        if name not in baseline:
+            print(f"  {name:<40} not in the baseline")
+            continue
+        changes = []
+        for key in ("throughput",) + LATENCY_KEYS:
+            old, new = baseline[name].get(key), summary.get(key)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            changes.append(f"{key} {change:+.1%}")
+            worse = -change if key == "throughput" else change
+            if worse > tolerance:
+                regressions.append(f"{name} {key}: {old:.3f} -> {new:.3f} ({change:+.1%})")
+        print(f"  {name:<40} {', '.join(changes)}")
+
+    print("  no regressions" if not regressions else "  REGRESSIONS:\n    " + "\n    ".join(regressions))
+    return regressions
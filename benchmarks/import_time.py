@@ -0,0 +1,113 @@
+"""
+Benchmark of the startup cost of the serving and training modules.
+
+Each module is imported in a fresh interpreter with `python -X importtime`, so nothing is cached between
+measurements. For every module the table shows the wall time of the import, which heavy libraries it pulls in, and
+the imports that cost the most (cumulative time of the import, children included). The last rows time a serving
+cold start: importing the app, loading the model from artifacts/ and answering the first prediction.
+
+Usage:
+    python -m benchmarks.import_time [--modules app src.pipeline.predict_pipeline ...] [--top 5] [--repeat 3]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+DEFAULT_MODULES = [
+    "src.logger",
+    "src.utils",
+    "src.pipeline.model_registry",
+    "src.pipeline.predict_pipeline",
+    "app",
+    "src.pipeline.train_pipeline",
+    "src.components.model_trainer",
+]
+HEAVY_LIBRARIES = ["numpy", "pandas", "scipy", "sklearn", "xgboost", "catboost", "pyarrow", "dill", "flask"]
+
+_IMPORT_SCRIPT = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+_COLD_START_SCRIPT = """
+import sys, time, json
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+from src.pipeline.model_registry import get_model_registry
+loaded = get_model_registry().get()
+load = time.perf_counter()
+record = {{"gender": "female", "race_ethnicity": "group B", "parental_level_of_education": "bachelor's degree",
+          "lunch": "standard", "test_preparation_course": "none", "reading_score": 72, "writing_score": 74}}
+app.app.test_client().post("/predict_batch", json=[record])
+done = time.perf_counter()
+print(json.dumps({{"import": imported - started, "load": load - imported, "first_prediction": done - load,
+                  "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def _run(script, importtime=False):
+    """
+    Runs a script in a fresh interpreter from the repository root and returns its JSON output and stderr.
+    """
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", script]
+    completed = subprocess.run(
+        command, capture_output=True, text=True, check=True,
+        env=dict(os.environ, PYTHONPATH=os.getcwd(), MICRO_BATCHING="0"),
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def _top_imports(importtime_output, top, exclude=()):
+    """
+    Parses `-X importtime` output and returns the `top` packages with the largest cumulative import time.
+    """
+    cumulative = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if not cumulative_us.strip().isdigit():
+            continue  # the header line
+        package = name.strip().split(".")[0]
+        if package not in exclude:
+            # The outermost import of a package includes all of its submodules, so it has the largest time
+            cumulative[package] = max(cumulative.get(package, 0), int(cumulative_us))
+    return sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import cost of the project's modules.")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="modules to import, one per interpreter")
+    parser.add_argument("--top", type=int, default=4, help="costliest imported packages shown per module")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per measurement; the fastest is kept")
+    args = parser.parse_args(argv)
+
+    print(f"{'module':<32} {'import ms':>10}  {'heavy libraries loaded':<48} costliest imports (ms)")
+    for module in args.modules:
+        script = _IMPORT_SCRIPT.format(module=module, heavy=HEAVY_LIBRARIES)
+        best = min((_run(script) for _ in range(args.repeat)), key=lambda result: result[0]["seconds"])[0]
+        _, importtime_output = _run(script, importtime=True)
+        top = ", ".join(f"{name} {us / 1000:.0f}" for name, us in _top_imports(importtime_output, args.top, exclude={module.split('.')[0]}))
+        print(f"{module:<32} {best['seconds'] * 1000:>10.1f}  {' '.join(best['loaded']) or '-':<48} {top}")
+
+    if os.path.exists(os.path.join("artifacts", "model")) or os.path.exists(os.path.join("artifacts", "model.pkl")):
+        script = _COLD_START_SCRIPT.format(heavy=HEAVY_LIBRARIES)
+        best = min((_run(script)[0] for _ in range(args.repeat)), key=lambda result: sum(result[key] for key in ("import", "load", "first_prediction")))
+        total = best["import"] + best["load"] + best["first_prediction"]
+        print()
+        print(f"serving cold start: import app {best['import'] * 1000:.0f}ms, load model {best['load'] * 1000:.0f}ms, "
+              f"first prediction {best['first_prediction'] * 1000:.0f}ms, total {total * 1000:.0f}ms")
+        print(f"libraries loaded once serving: {' '.join(best['loaded'])}")
+    else:
+        print("\nNo trained model in artifacts/, skipping the serving cold start")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+HTTP load test of the predict service.
+
+Starts the app locally (the Flask server, or the pre-fork server of serve.py) or targets a running one, and drives
+it with a mix of requests:
+- "repeated": a form POST to /predict with one of a small pool of records, as real traffic repeats inputs;
+- "random": a form POST to /predict with a record drawn uniformly over the CustomData domain;
+- "batch": a JSON POST to /predict_batch with `--batch-size` random records.
+
+Load is either closed-loop (`--concurrency` clients, each sending its next request as soon as the previous one is
+answered) or open-loop (`--rate` requests per second on a fixed schedule, whatever the response times; latency is
+then measured from the scheduled send time, so a slow server cannot hide its queueing delay). Every payload is
+generated up front from `--seed`, so two runs send the same requests in the same order.
+
+The throughput and p50/p95/p99/max latency of each kind of request, and of all of them, are printed and written as
+JSON. With `--baseline` they are compared with an earlier results file, and the exit status is 1 if any metric is
+worse by more than `--tolerance`.
+
+Usage:
+    python -m benchmarks.load_test [--server flask|prefork|--url URL] [--concurrency 8 | --rate 200]
+        [--mix repeated=0.6,random=0.3,batch=0.1] [--duration 10] [--output benchmarks/results/load_test.json]
+        [--baseline benchmarks/results/load_test_baseline.json]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from benchmarks.common import known_categories, random_records, summarize, save_results, compare_results
+
+# Form field names of the /predict route (templates/home.html)
+FORM_FIELDS = {
+    "gender": "gender",
+    "race_ethnicity": "ethnicity",
+    "parental_level_of_education": "parental_level_of_education",
+    "lunch": "lunch",
+    "test_preparation_course": "test_preparation_course",
+    "reading_score": "reading_score",
+    "writing_score": "writing_score",
+}
+KINDS = ("repeated", "random", "batch")
+
+
+def _parse_mix(text):
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        if kind.strip() not in KINDS:
+            raise ValueError(f"Unknown request kind '{kind}', expected one of {KINDS}")
+        mix[kind.strip()] = float(weight)
+    total = sum(mix.values())
+    return {kind: weight / total for kind, weight in mix.items() if weight > 0}
+
+
+def build_requests(args, categories):
+    """
+    Generates the request sequence: (kind, path, body, content type) tuples, in sending order.
+    """
+    rng = np.random.default_rng(args.seed)
+    mix = _parse_mix(args.mix)
+    kinds = rng.choice(list(mix), p=list(mix.values()), size=args.n_requests)
+
+    def form(record):
+        return urlencode({FORM_FIELDS[column]: value for column, value in record.items()}).encode()
+
+    pool = [form(record) for record in random_records(rng, categories, args.repeated_pool)]
+    requests = []
+    for kind in kinds:
+        if kind == "repeated":
+            requests.append((kind, "/predict", pool[rng.integers(len(pool))], "application/x-www-form-urlencoded"))
+        elif kind == "random":
+            requests.append((kind, "/predict", form(random_records(rng, categories, 1)[0]), "application/x-www-form-urlencoded"))
+        else:
+            body = json.dumps(random_records(rng, categories, args.batch_size)).encode()
+            requests.append((kind, "/predict_batch", body, "application/json"))
+    return requests
+
+
+class _Client:
+    """
+    One HTTP connection, reopened whenever the server closes it.
+    """
+
+    def __init__(self, host, port):
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+
+    def send(self, path, body, content_type):
+        try:
+            self.connection.request("POST", path, body=body, headers={"Content-Type": content_type})
+            response = self.connection.getresponse()
+            response.read()
+            if response.will_close:
+                self.connection.close()
+            return response.status < 400
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return False
+
+
+def run_load(host, port, requests, concurrency, duration, rate=None):
+    """
+    Sends requests from the sequence for `duration` seconds, cycling through it, and records every latency.
+
+    Args:
+        host (str), port (int): The server.
+        requests (list): The request sequence from build_requests.
+        concurrency (int): Client threads.
+        duration (float): Seconds to run.
+        rate (float, optional): Requests per second for an open-loop run; None for closed-loop.
+
+    Returns:
+        tuple: ({kind: [latency seconds]}, {kind: errors}, elapsed seconds).
+    """
+    latencies = {kind: [] for kind in KINDS}
+    errors = {kind: 0 for kind in KINDS}
+    lock = threading.Lock()
+    counter = iter(range(sys.maxsize))
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def worker():
+        client = _Client(host, port)
+        local_latencies = {kind: [] for kind in KINDS}
+        local_errors = {kind: 0 for kind in KINDS}
+        while True:
+            with lock:
+                index = next(counter)
+            if rate is not None:
+                scheduled = started + index / rate
+                if scheduled >= deadline:
+                    break
+                time.sleep(max(0.0, scheduled - time.perf_counter()))
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= deadline:
+                    break
+            kind, path, body, content_type = requests[index % len(requests)]
+            ok = client.send(path, body, content_type)
+            if ok:
+                local_latencies[kind].append(time.perf_counter() - scheduled)
+            else:
+                local_errors[kind] += 1
+        with lock:
+            for kind in KINDS:
+                latencies[kind].extend(local_latencies[kind])
+                errors[kind] += local_errors[kind]
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(kind, port, workers):
+    """
+    Starts the app in a subprocess from the repository root and waits until it answers.
+
+    Returns:
+        subprocess.Popen: The server process.
+    """
+    env = dict(os.environ, PYTHONPATH=os.getcwd(), HOST="127.0.0.1", PORT=str(port))
+    if kind == "prefork":
+        env["WEB_WORKERS"] = str(workers)
+        command = [sys.executable, "serve.py"]
+    else:
+        command = [sys.executable, "-c", f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The {kind} server exited with code {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/metrics")
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"The {kind} server did not answer within 120s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the predict service.")
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--server", choices=["flask", "prefork"], default="flask", help="server started when --url is not given")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="workers of the pre-fork server")
+    parser.add_argument("--mix", default="repeated=0.6,random=0.3,batch=0.1", help="request kinds and their weights")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--rate", type=float, help="requests per second (open-loop); closed-loop if not given")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds measured")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of load sent before measuring")
+    parser.add_argument("--batch-size", type=int, default=64, help="records per batch request")
+    parser.add_argument("--repeated-pool", type=int, default=16, help="distinct records of the repeated requests")
+    parser.add_argument("--n-requests", type=int, default=20000, help="length of the generated request sequence")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "load_test.json"))
+    parser.add_argument("--baseline", help="results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    requests = build_requests(args, known_categories())
+    process = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        host, port = "127.0.0.1", _free_port()
+        process = start_server(args.server, port, args.workers)
+
+    try:
+        if args.warmup:
+            run_load(host, port, requests, args.concurrency, args.warmup, args.rate)
+        latencies, errors, elapsed = run_load(host, port, requests, args.concurrency, args.duration, args.rate)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=60)
+
+    results = {kind: summarize(latencies[kind], elapsed, errors[kind]) for kind in KINDS if latencies[kind] or errors[kind]}
+    results["all"] = summarize(sum(latencies.values(), []), elapsed, sum(errors.values()))
+
+    mode = f"open-loop at {args.rate:g} req/s" if args.rate else f"closed-loop, {args.concurrency} clients"
+    print(f"{args.url or args.server} server, {mode}, {elapsed:.1f}s")
+    print(f"{'kind':<10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind, summary in results.items():
+        print(
+            f"{kind:<10} {summary['count']:>9} {summary['errors']:>7} {summary['throughput']:>9.1f} "
+            + " ".join(f"{summary.get(key, float('nan')):>8.2f}" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+        )
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "tolerance")}
+    save_results(args.output, "load_test", config, results)
+    print(f"\nResults written to {args.output}")
+    if args.baseline and compare_results(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
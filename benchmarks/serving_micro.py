@@ -0,0 +1,137 @@
+"""
+In-process microbenchmarks of the serving path, without HTTP in the way.
+
+Times, at several batch sizes:
+- validation and preprocessing: the pandas path (DataFrame, DataValidation, preprocessor.transform) and the
+  compiled path (CompiledPreprocessor.encode and transform_encoded) serving uses for records;
+- model predict for every model family the trainer searches, fitted on the transformed training split
+  (artifacts/train_array.npy, written by the training pipeline), and through the tree engine for the tree models
+  it can compile;
+- PredictPipeline.predict_batch end to end with the model in artifacts/, with the prediction cache disabled so
+  every call is scored.
+
+Inputs are drawn uniformly over the CustomData domain from `--seed`, so runs are comparable. Each timing is the
+distribution of many calls; the p50/p95/p99/max latency and calls per second are printed and written as JSON, and
+with `--baseline` compared with an earlier results file (exit status 1 on a regression beyond `--tolerance`).
+
+Usage:
+    python -m benchmarks.serving_micro [--batch-sizes 1 32 1024] [--n-estimators 100] [--min-seconds 0.5]
+        [--output benchmarks/results/serving_micro.json] [--baseline benchmarks/results/serving_micro_baseline.json]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from catboost import CatBoostRegressor
+from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+from xgboost import XGBRegressor
+
+from benchmarks.common import known_categories, random_records, summarize, save_results, compare_results
+from src.utils import load_array
+from src.components.data_transformation import DataTransformationConfig
+from src.components.data_validaton import DataValidation, SCORE_RANGE
+from src.components.tree_engine import compile_tree_model
+from src.pipeline.model_registry import ModelRegistry
+from src.pipeline.predict_pipeline import PredictPipeline
+from src.pipeline.prediction_cache import PredictionCache, PredictionCacheConfig
+
+
+def _time_calls(call, min_seconds, max_calls=10000):
+    """
+    Calls `call` repeatedly for about `min_seconds`, after one warm-up call, and returns the duration of each call.
+    """
+    call()
+    latencies = []
+    deadline = time.perf_counter() + min_seconds
+    while len(latencies) < 5 or (time.perf_counter() < deadline and len(latencies) < max_calls):
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def _models(n_estimators):
+    return {
+        "Linear Regression": LinearRegression(),
+        "Decision Tree": DecisionTreeRegressor(random_state=0),
+        "Random Forest": RandomForestRegressor(n_estimators=n_estimators, random_state=0),
+        "Gradient Boosting": GradientBoostingRegressor(n_estimators=n_estimators, random_state=0),
+        "AdaBoost Regressor": AdaBoostRegressor(n_estimators=n_estimators, random_state=0),
+        "XGBRegressor": XGBRegressor(n_estimators=n_estimators, random_state=0),
+        "CatBoosting Regressor": CatBoostRegressor(iterations=n_estimators, random_seed=0, verbose=False, allow_writing_files=False),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time preprocessing and prediction in-process.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 1024], help="records per call")
+    parser.add_argument("--n-estimators", type=int, default=100, help="trees per ensemble")
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="time spent on each measurement")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "serving_micro.json"))
+    parser.add_argument("--baseline", help="results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    categories = known_categories()
+    loaded = ModelRegistry().get()
+    preprocessor, compiled = loaded.preprocessor, loaded.compiled_preprocessor
+    pipeline = PredictPipeline(cache=PredictionCache(PredictionCacheConfig(max_size=0)))
+    batches = {n_rows: random_records(rng, categories, n_rows) for n_rows in args.batch_sizes}
+    results = {}
+
+    def measure(name, call):
+        results[name] = summarize(_time_calls(call, args.min_seconds))
+        summary = results[name]
+        print(
+            f"{name:<48} {summary['throughput']:>10.1f} "
+            + " ".join(f"{summary[key]:>8.3f}" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+        )
+
+    print(f"{'measurement':<48} {'calls/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for n_rows, records in batches.items():
+        known = {column: set(values) for column, values in categories.items()}
+        measure(f"validate/pandas/{n_rows}", lambda: DataValidation().validate_features(pd.DataFrame.from_records(records), known))
+        features = DataValidation().validate_features(pd.DataFrame.from_records(records), known)
+        measure(f"preprocess/sklearn/{n_rows}", lambda: preprocessor.transform(features))
+        if compiled is not None:
+            measure(f"validate/compiled/{n_rows}", lambda: compiled.encode(records, value_range=SCORE_RANGE))
+            numeric, codes = compiled.encode(records, value_range=SCORE_RANGE)
+            measure(f"preprocess/compiled/{n_rows}", lambda: compiled.transform_encoded(numeric, codes))
+        measure(f"predict_batch/{loaded.version}/{n_rows}", lambda: pipeline.predict_batch(records))
+
+    config = DataTransformationConfig()
+    if os.path.exists(config.train_array_file_path):
+        train = np.asarray(load_array(config.train_array_file_path))
+        X_train, y_train = train[:, :-1], train[:, -1]
+        for family, model in _models(args.n_estimators).items():
+            model.fit(X_train, y_train)
+            try:
+                engine = compile_tree_model(model)
+            except Exception:
+                engine = None  # not a tree model, or one the engine does not support
+            for n_rows in args.batch_sizes:
+                X = np.resize(X_train, (n_rows, X_train.shape[1]))
+                measure(f"model/{family}/{n_rows}", lambda: model.predict(X))
+                if engine is not None:
+                    measure(f"model/{family} (tree engine)/{n_rows}", lambda: engine.predict(X))
+    else:
+        print(f"\nNo {config.train_array_file_path}, run the training pipeline to time every model family")
+
+    run_config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "tolerance")}
+    run_config["model_version"] = loaded.version
+    save_results(args.output, "serving_micro", run_config, results)
+    print(f"\nResults written to {args.output}")
+    if args.baseline and compare_results(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
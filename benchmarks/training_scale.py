@@ -0,0 +1,225 @@
+"""
+Scalability benchmark of the training pipeline on synthetic data.
+
+For every dataset size, synthetic student records are generated (src/components/synthetic_data.py) and taken
+through DataIngestion, DataTransformation and ModelTrainer. Training is run once per model family and search
+strategy, searching only that family. Every stage runs in a fresh interpreter, in a work directory of its own, so
+its wall time, CPU time (of the stage and of the search workers it started) and peak RSS are its own and nothing
+is cached between runs.
+
+A stage that fails, runs out of memory or exceeds `--timeout` is recorded with its error, and is not tried again
+at the larger sizes; that is where the pipeline breaks. Sources above `--chunk-size` rows are ingested and
+transformed in chunks (INGESTION_CHUNK_SIZE), as a deployment with that much data would be.
+
+Usage:
+    python -m benchmarks.training_scale [--sizes 1000 10000 100000 1000000] [--families "Linear Regression" ...]
+        [--strategies grid halving] [--timeout 3600] [--output benchmarks/results/training_scale.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.common import save_results
+
+FAMILIES = [
+    "Linear Regression",
+    "Decision Tree",
+    "Random Forest",
+    "Gradient Boosting",
+    "AdaBoost Regressor",
+    "XGBRegressor",
+    "CatBoosting Regressor",
+]
+STRATEGIES = ["grid", "halving"]
+
+
+def _prepare_stage(stage, size, options):
+    """
+    Imports what a stage needs and returns a function that runs it from the work directory, so the stage's
+    measurements leave out import time. The function returns what the stage reports about its output.
+    """
+    if stage == "generate":
+        from src.components.synthetic_data import SyntheticDataConfig, SyntheticDataGenerator
+
+        def run():
+            generator = SyntheticDataGenerator(SyntheticDataConfig(source_data_path=options["source"]))
+            generator.write(options["data"], size)
+            return {"bytes": os.path.getsize(options["data"])}
+
+    elif stage == "ingestion":
+        from src.components.data_ingestion import DataIngestion
+
+        def run():
+            ingestion = DataIngestion()
+            ingestion.ingestion_config.source_data_path = options["data"]
+            ingestion.ingestion_config.chunk_size = options["chunk_size"]
+            train_path, test_path = ingestion.initiate_data_ingestion()
+            return {"bytes": os.path.getsize(train_path) + os.path.getsize(test_path)}
+
+    elif stage == "transformation":
+        from src.components.data_ingestion import DataIngestionConfig
+        from src.components.data_transformation import DataTransformation
+
+        def run():
+            transformation = DataTransformation()
+            transformation.data_transformation_config.chunk_size = options["chunk_size"]
+            train_arr, test_arr, _ = transformation.initiate_data_transformation(
+                DataIngestionConfig.train_data_path, DataIngestionConfig.test_data_path
+            )
+            return {"train_shape": list(train_arr.shape), "test_shape": list(test_arr.shape)}
+
+    else:
+        import catboost, sklearn.ensemble, xgboost  # noqa: F401 -- imported by the trainer on its first run
+        from src.utils import load_array
+        from src.components.data_transformation import DataTransformationConfig
+        from src.components.model_trainer import ModelTrainer
+
+        def run():
+            trainer = ModelTrainer()
+            trainer.model_trainer_config.model_families = [options["family"]]
+            trainer.model_trainer_config.search_strategy = options["strategy"]
+            trainer.model_trainer_config.search_n_jobs = options["n_jobs"]
+            trainer.model_trainer_config.search_cache = False
+            r2 = trainer.initiate_model_trainer(
+                load_array(DataTransformationConfig.train_array_file_path),
+                load_array(DataTransformationConfig.test_array_file_path),
+            )
+            return {"r2": float(r2)}
+
+    return run
+
+
+def _stage_main(stage, size, options):
+    """
+    Entry point of a stage's interpreter: runs the stage and prints its resource use as JSON.
+    """
+    import resource
+
+    run = _prepare_stage(stage, size, options)
+    started, times = time.perf_counter(), os.times()
+    output = run()
+    if "joblib" in sys.modules:
+        # Stop the search workers, so their CPU time and memory are counted with this process's children
+        from joblib.externals.loky import get_reusable_executor
+
+        get_reusable_executor().shutdown(wait=True)
+    wall = time.perf_counter() - started
+    end = os.times()
+    cpu = sum(end[i] - times[i] for i in range(4))  # user and system time, of this process and its children
+    print(json.dumps({
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        **output,
+    }))
+
+
+def measure(stage, size, options, workdir, timeout):
+    """
+    Runs a stage in a fresh interpreter from `workdir` and returns its measurements, or its error.
+    """
+    command = [sys.executable, "-m", "benchmarks.training_scale", "--run-stage", stage, "--size", str(size),
+               "--stage-options", json.dumps(options)]
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    try:
+        completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"status": "timeout", "error": f"longer than {timeout}s"}
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines() or [f"exit code {completed.returncode}"]
+        if completed.returncode < 0:
+            lines.append(f"killed by signal {-completed.returncode}")  # e.g. SIGKILL from the out-of-memory killer
+        return {"status": "failed", "error": lines[-1][:300]}
+    return {"status": "ok", **json.loads(completed.stdout.strip().splitlines()[-1])}
+
+
+def _print_row(size, stage, family, strategy, result):
+    if result["status"] == "ok":
+        print(
+            f"{size:>11} {stage:<15} {family:<22} {strategy:<8} {result['wall_s']:>9.2f} {result['cpu_s']:>9.2f} "
+            f"{result['peak_rss_mb']:>9.0f} {result['children_peak_rss_mb']:>9.0f}"
+            + (f"   r2={result['r2']:.4f}" if "r2" in result else "")
+        )
+    else:
+        print(f"{size:>11} {stage:<15} {family:<22} {strategy:<8} {result['status'].upper()}: {result.get('error', '')}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how the training pipeline scales with the data size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000], help="rows generated")
+    parser.add_argument("--families", nargs="+", default=FAMILIES, choices=FAMILIES, help="model families trained")
+    parser.add_argument("--strategies", nargs="+", default=STRATEGIES, choices=STRATEGIES, help="search strategies")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="sources above this many rows are processed in chunks")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="workers of the hyperparameter search")
+    parser.add_argument("--timeout", type=float, default=3600, help="seconds a stage may take")
+    parser.add_argument("--workdir", help="where data and artifacts are written; a temporary directory by default")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "training_scale.json"))
+    # Used by the stage interpreters started by measure()
+    parser.add_argument("--run-stage", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--stage-options", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_stage:
+        _stage_main(args.run_stage, args.size, json.loads(args.stage_options))
+        return
+
+    root = args.workdir or tempfile.mkdtemp(prefix="training_scale_")
+    source = os.path.abspath(os.path.join("notebook", "data", "stud.csv"))
+    results, broken = {}, set()
+
+    print(f"{'rows':>11} {'stage':<15} {'family':<22} {'strategy':<8} {'wall s':>9} {'cpu s':>9} {'rss MB':>9} {'child MB':>9}")
+    try:
+        for size in args.sizes:
+            if "data" in broken:
+                print(f"{size:>11} skipped: the data stages failed at a smaller size")
+                continue
+            workdir = os.path.join(root, str(size))
+            os.makedirs(workdir, exist_ok=True)
+            options = {
+                "source": source,
+                "data": os.path.join(workdir, "students.csv"),  # CSV, like the real source
+                "chunk_size": args.chunk_size if size > args.chunk_size else 0,
+                "n_jobs": args.n_jobs,
+            }
+
+            for stage in ("generate", "ingestion", "transformation"):
+                result = measure(stage, size, options, workdir, args.timeout)
+                results[f"{size}/{stage}"] = result
+                _print_row(size, stage, "-", "-", result)
+                if result["status"] != "ok":
+                    broken.add("data")
+                    break
+            if "data" in broken:
+                continue
+
+            for family in args.families:
+                for strategy in args.strategies:
+                    if (family, strategy) in broken:
+                        continue
+                    result = measure("training", size, dict(options, family=family, strategy=strategy), workdir, args.timeout)
+                    results[f"{size}/training/{family}/{strategy}"] = result
+                    _print_row(size, "training", family, strategy, result)
+                    if result["status"] != "ok":
+                        broken.add((family, strategy))
+
+            if not args.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)  # the next size needs the disk space more
+    finally:
+        if not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "run_stage", "size", "stage_options")}
+    save_results(args.output, "training_scale", config, results)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the flattened tree engine (src/components/tree_engine.py) against sklearn's predict.
+
+Fits each supported tree model on the transformed training split (artifacts/train_array.npy, written by the training
+pipeline), checks that the engine predicts the same numbers as the model on the test split and on inputs placed
+around every threshold, then times both at several batch sizes. The last column shows which one serving would use,
+after the same calibration the exporter runs.
+
+Usage:
+    python -m benchmarks.tree_engine [--n-estimators 256] [--batch-sizes 1 10 100 1000]
+"""
+
+import time
+import argparse
+
+import numpy as np
+from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from src.utils import load_array
+from src.components.data_transformation import DataTransformationConfig
+from src.components.tree_engine import TreeEngineExporter, compile_tree_model, check_parity
+
+
+def _time(predict, X, min_seconds=0.2):
+    """
+    Returns the median time of one call, in milliseconds, over enough calls to take about `min_seconds`.
+    """
+    predict(X)
+    started = time.perf_counter()
+    predict(X)
+    once = max(time.perf_counter() - started, 1e-6)
+    timings = []
+    for _ in range(max(3, min(1000, int(min_seconds / once)))):
+        started = time.perf_counter()
+        predict(X)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the tree engine with sklearn's predict.")
+    parser.add_argument("--n-estimators", type=int, default=256, help="trees per ensemble")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000], help="rows per call")
+    args = parser.parse_args(argv)
+
+    config = DataTransformationConfig()
+    train = np.asarray(load_array(config.train_array_file_path))
+    test = np.asarray(load_array(config.test_array_file_path))
+    X_train, y_train, X_test = train[:, :-1], train[:, -1], test[:, :-1]
+
+    models = {
+        "Decision Tree": DecisionTreeRegressor(random_state=0),
+        "Random Forest": RandomForestRegressor(n_estimators=args.n_estimators, random_state=0),
+        "Gradient Boosting": GradientBoostingRegressor(n_estimators=args.n_estimators, subsample=0.8, random_state=0),
+        "AdaBoost Regressor": AdaBoostRegressor(n_estimators=args.n_estimators, random_state=0),
+    }
+
+    print(f"{'model':<20} {'trees':>5} {'depth':>5} {'rows':>6} {'sklearn ms':>11} {'engine ms':>10} {'speedup':>8} {'served by':>10}")
+    for name, model in models.items():
+        model.fit(X_train, y_train)
+        engine = compile_tree_model(model)
+        difference = max(
+            check_parity(engine, model, X_test),
+            check_parity(engine, model, engine.probe(5000)),
+        )
+        engine.max_batch_rows = TreeEngineExporter()._calibrate(engine, model, X_test)
+        for n_rows in args.batch_sizes:
+            X = np.resize(X_test, (n_rows, X_test.shape[1]))
+            model_ms, engine_ms = _time(model.predict, X), _time(engine.predict, X)
+            print(
+                f"{name:<20} {engine.n_trees:>5} {engine.max_depth:>5} {n_rows:>6} {model_ms:>11.3f} {engine_ms:>10.3f} "
+                f"{model_ms / engine_ms:>7.1f}x {'engine' if engine.handles(n_rows) else 'model':>10}"
+            )
+        print(f"{name:<20} max difference from model.predict: {difference:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# Production entry point: serves app.py from pre-forked worker processes that share one loaded copy of the model.
+# Configure with HOST, PORT, WEB_WORKERS (default: one per core), WORKER_MAX_REQUESTS and WORKER_TIMEOUT;
+# see src/pipeline/prefork_server.py. SIGHUP reloads the model, SIGTTIN / SIGTTOU add or remove a worker.
+from app import app
+from src.pipeline.prefork_server import PreforkServer
+
+if __name__=="__main__":
+    PreforkServer(app).run()
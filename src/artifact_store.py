@@ -0,0 +1,320 @@
+"""
+artifact_store.py
+
+This module saves and loads trained objects (the model, the preprocessor, the prediction table) as versioned
+artifact directories instead of single pickle files.
+
+A pickle is read eagerly and whole, and every serving process ends up with its own copy of every array in it. An
+artifact directory instead keeps the numeric arrays out of the pickle:
+
+    artifacts/model/
+        current.json                  which version is in service, swapped atomically on save
+        3f2a9c0e1b7d4a55/             one directory per version, named after its content
+            manifest.json             format version, object class, library versions, files and their checksums
+            object.pkl                the object graph, pickled with dill (protocol 5) without its array data
+            arrays.bin                the array data, 64-byte aligned, opened with mmap on load
+            booster.ubj / booster.cbm XGBoost / CatBoost models in their own binary formats
+
+Loading maps `arrays.bin` read-only and rebuilds the arrays as views of the map, so nothing is read until it is
+used and every process serving the same version shares the same physical pages. Objects that copy their arrays
+while unpickling (scikit-learn's Tree does) still get their own copy. Boosters are loaded with their library's own
+loader, which is much faster than unpickling the sklearn wrapper.
+
+Functions:
+    save_artifact(path, obj): Saves an object as a new version and makes it current.
+    load_artifact(path): Loads the current version.
+    artifact_version(path): Returns the content checksum of the current version, without loading it.
+    verify_artifact(path): Checks every file of the current version against its manifest checksum.
+    is_artifact(path): Tells whether a path is an artifact directory.
+
+Usage:
+    save_artifact(os.path.join("artifacts", "model"), model)
+    model = load_artifact(os.path.join("artifacts", "model"))
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import importlib
+
+import dill
+import numpy as np
+
+from src.exception import CustomException
+
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "current.json"
+MANIFEST_FILE = "manifest.json"
+ALIGNMENT = 64  # byte alignment of every array block, so the mapped arrays are aligned for SIMD loads
+KEEP_VERSIONS = 3  # versions kept on disk, so processes still serving an older one are not pulled from under
+
+
+def _checksum(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _ArtifactPickler(dill.Pickler):
+    """
+    A dill pickler that lets NumPy arrays use pickle protocol 5 out-of-band buffers.
+
+    dill pickles every ndarray through its own reducer, which always copies the data into the pickle stream. Plain
+    arrays are routed back to ndarray.__reduce_ex__ instead, which hands contiguous data to the buffer callback
+    (and falls back to an in-band copy for object or non-contiguous arrays).
+    """
+
+    def __init__(self, *args, **kwds):
+        super().__init__(*args, **kwds)
+        self.dispatch = {**dill.Pickler.dispatch, np.ndarray: self._save_array}
+
+    @staticmethod
+    def _save_array(pickler, obj):
+        pickler.save_reduce(*obj.__reduce_ex__(pickler.proto), obj=obj)
+
+
+def _class_path(obj):
+    return f"{type(obj).__module__}.{type(obj).__qualname__}"
+
+
+def _import_class(class_path):
+    module, _, name = class_path.rpartition(".")
+    return getattr(importlib.import_module(module), name)
+
+
+def _booster_format(obj):
+    """
+    Returns the native file name to save a booster in, or None for objects that are pickled.
+    """
+    module = type(obj).__module__
+    if module.startswith("xgboost.") and hasattr(obj, "get_booster"):
+        return "booster.ubj"
+    if module.startswith("catboost.") and hasattr(obj, "save_model"):
+        return "booster.cbm"
+    return None
+
+
+def _library_versions(obj):
+    versions = {}
+    for name in {type(obj).__module__.split(".")[0], "numpy", "sklearn"}:
+        module = sys.modules.get(name)
+        if module is not None:
+            versions[name] = getattr(module, "__version__", None)
+    return versions
+
+
+def is_artifact(path):
+    """
+    Tells whether a path is an artifact directory written by save_artifact.
+
+    Args:
+        path (str): The path to check.
+
+    Returns:
+        bool: True if it holds a current version.
+    """
+    return os.path.isfile(os.path.join(path, CURRENT_FILE))
+
+
+def _current(path):
+    with open(os.path.join(path, CURRENT_FILE)) as file_obj:
+        return json.load(file_obj)
+
+
+def artifact_version(path):
+    """
+    Returns the content checksum of the current version: the sha256 of its manifest, which lists the checksum of
+    every file. Only `current.json` is read.
+
+    Args:
+        path (str): The artifact directory.
+
+    Returns:
+        str: The checksum, as a hexadecimal string.
+
+    Raises:
+        CustomException: If the path is not an artifact directory.
+    """
+    try:
+        return _current(path)["checksum"]
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def _write_version(version_path, obj):
+    """
+    Writes the files of one version and returns its manifest.
+    """
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "class": _class_path(obj),
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "libraries": _library_versions(obj),
+        "arrays": [],
+        "files": {},
+    }
+
+    booster_file = _booster_format(obj)
+    if booster_file is not None:
+        booster_path = os.path.join(version_path, booster_file)
+        if booster_file.endswith(".cbm"):
+            obj.save_model(booster_path, format="cbm")
+            payload = {"params": None}  # CatBoost restores its parameters from the .cbm file
+        else:
+            obj.save_model(booster_path)
+            payload = {"params": obj.get_params()}
+        manifest["booster"] = booster_file
+        with open(os.path.join(version_path, "object.pkl"), "wb") as file_obj:
+            dill.dump(payload, file_obj, protocol=5)
+    else:
+        # Protocol 5 hands every contiguous array buffer to the callback instead of copying it into the pickle
+        buffers = []
+        with open(os.path.join(version_path, "object.pkl"), "wb") as file_obj:
+            _ArtifactPickler(file_obj, protocol=5, buffer_callback=buffers.append).dump(obj)
+
+        offset = 0
+        with open(os.path.join(version_path, "arrays.bin"), "wb") as file_obj:
+            for buffer in buffers:
+                view = buffer.raw()
+                padding = -offset % ALIGNMENT
+                file_obj.write(b"\0" * padding)
+                offset += padding
+                file_obj.write(view)
+                manifest["arrays"].append({"offset": offset, "size": view.nbytes})
+                offset += view.nbytes
+
+    for file_name in sorted(os.listdir(version_path)):
+        file_path = os.path.join(version_path, file_name)
+        manifest["files"][file_name] = {"size": os.path.getsize(file_path), "sha256": _checksum(file_path)}
+    return manifest
+
+
+def save_artifact(path, obj, keep_versions=KEEP_VERSIONS):
+    """
+    Saves an object as a new version of an artifact directory and makes it the current one.
+
+    The version is written to a temporary directory, renamed into place, and only then published by replacing
+    `current.json`, so a reader always sees either the previous version or the complete new one.
+
+    Args:
+        path (str): The artifact directory, created if needed.
+        obj: The object to save.
+        keep_versions (int): Number of versions kept, the current one included.
+
+    Returns:
+        str: The content checksum of the saved version.
+
+    Raises:
+        CustomException: If the object cannot be saved.
+    """
+    try:
+        if os.path.isfile(path):
+            os.remove(path)  # a legacy pickle at the same path
+        os.makedirs(path, exist_ok=True)
+        temporary_path = os.path.join(path, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(temporary_path)
+        try:
+            manifest = _write_version(temporary_path, obj)
+            # created_at is left out of the identity, so saving the same object twice gives the same version
+            identity = json.dumps({**manifest, "created_at": None}, sort_keys=True).encode()
+            checksum = hashlib.sha256(identity).hexdigest()
+            with open(os.path.join(temporary_path, MANIFEST_FILE), "w") as file_obj:
+                json.dump(manifest, file_obj, indent=2)
+
+            version = checksum[:16]
+            version_path = os.path.join(path, version)
+            if os.path.isdir(version_path):
+                shutil.rmtree(temporary_path)
+                os.utime(version_path)
+            else:
+                os.replace(temporary_path, version_path)
+        finally:
+            if os.path.isdir(temporary_path):
+                shutil.rmtree(temporary_path)
+
+        current_path = os.path.join(path, CURRENT_FILE)
+        with open(current_path + ".tmp", "w") as file_obj:
+            json.dump({"format_version": FORMAT_VERSION, "version": version, "checksum": checksum}, file_obj)
+        os.replace(current_path + ".tmp", current_path)
+
+        versions = sorted(
+            (entry for entry in os.listdir(path) if os.path.isfile(os.path.join(path, entry, MANIFEST_FILE))),
+            key=lambda entry: os.path.getmtime(os.path.join(path, entry)),
+            reverse=True,
+        )
+        for old_version in [entry for entry in versions if entry != version][max(0, keep_versions - 1):]:
+            shutil.rmtree(os.path.join(path, old_version), ignore_errors=True)
+
+        return checksum
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_artifact(path):
+    """
+    Loads the current version of an artifact directory.
+
+    Array data is memory-mapped read-only rather than read: the arrays of the returned object are views of the
+    mapped file, and cannot be modified in place.
+
+    Args:
+        path (str): The artifact directory.
+
+    Returns:
+        The saved object.
+
+    Raises:
+        CustomException: If the artifact cannot be loaded or has an unknown format version.
+    """
+    try:
+        current = _current(path)
+        version_path = os.path.join(path, current["version"])
+        with open(os.path.join(version_path, MANIFEST_FILE)) as file_obj:
+            manifest = json.load(file_obj)
+        if manifest["format_version"] > FORMAT_VERSION:
+            raise ValueError(f"{path} has artifact format {manifest['format_version']}, newer than {FORMAT_VERSION}")
+
+        if "booster" in manifest:
+            with open(os.path.join(version_path, "object.pkl"), "rb") as file_obj:
+                payload = dill.load(file_obj)
+            model = _import_class(manifest["class"])(**(payload["params"] or {}))
+            model.load_model(os.path.join(version_path, manifest["booster"]))
+            return model
+
+        buffers = []
+        if manifest["arrays"]:
+            mapped = np.memmap(os.path.join(version_path, "arrays.bin"), dtype=np.uint8, mode="r")
+            buffers = [mapped[block["offset"]:block["offset"] + block["size"]] for block in manifest["arrays"]]
+        with open(os.path.join(version_path, "object.pkl"), "rb") as file_obj:
+            return dill.load(file_obj, buffers=buffers)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def verify_artifact(path):
+    """
+    Checks every file of the current version against the checksum in its manifest.
+
+    Args:
+        path (str): The artifact directory.
+
+    Returns:
+        list: The names of the files that are missing or do not match; empty if the version is intact.
+    """
+    version_path = os.path.join(path, _current(path)["version"])
+    with open(os.path.join(version_path, MANIFEST_FILE)) as file_obj:
+        manifest = json.load(file_obj)
+    return [
+        file_name for file_name, recorded in manifest["files"].items()
+        if not os.path.isfile(os.path.join(version_path, file_name))
+        or _checksum(os.path.join(version_path, file_name)) != recorded["sha256"]
+    ]
@@ -18,10 +18,13 @@ import sys
 import os
 from src.exception import CustomException  # Ensure this import is correct and the CustomException class exists
 from src.logger import logging
+from src.utils import save_table, iter_table_chunks, TableWriter, file_checksum
+import json
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from dataclasses import dataclass
 
+from src.components.data_validaton import CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS, TARGET_COLUMN
 from src.components.data_transformation import DataTransformationConfig, DataTransformation
 
 from src.components.model_trainer import ModelTrainerConfig
@@ -32,9 +35,15 @@ class DataIngestionConfig:
     """
     Configuration class for data ingestion.
     """
-    train_data_path: str = os.path.join('artifacts', "train.csv")  # Corrected attribute name
-    test_data_path: str = os.path.join('artifacts', "test.csv")
-    raw_data_path: str = os.path.join('artifacts', "raw_data.csv")
+    train_data_path: str = os.path.join('artifacts', "train.parquet")  # Corrected attribute name
+    test_data_path: str = os.path.join('artifacts', "test.parquet")
+    raw_data_path: str = os.path.join('artifacts', "raw_data.parquet")
+    export_csv: bool = False  # also write raw_data.csv, train.csv and test.csv next to the Parquet files
+    source_data_path: str = os.path.join('notebook', 'data', 'stud.csv')
+    test_size: float = 0.2
+    random_state: int = 42
+    chunk_size: int = int(os.environ.get("INGESTION_CHUNK_SIZE", 0))  # rows read at a time; 0 reads the whole source at once
+    source_state_path: str = os.path.join('artifacts', "ingestion_state.json")  # what was ingested, for incremental updates
 
 class DataIngestion:
     """Class responsible for ingesting raw data into the system."""
@@ -47,25 +56,36 @@ class DataIngestion:
         Ingests raw data from a CSV file and splits it into training and testing datasets.
 
         Returns:
-            tuple: Paths to the training and testing datasets.
+            tuple: Paths to the training and testing datasets (Parquet files).
         """
 
         logging.info("Entered the data ingestion method or component")
 
         try:
-            df = pd.read_csv(os.path.join('notebook', 'data', 'stud.csv'))  # Correct relative path to your CSV file
+            if self.ingestion_config.chunk_size:
+                return self.initiate_chunked_data_ingestion()
+
+            df = pd.read_csv(self.ingestion_config.source_data_path)  # Correct relative path to your CSV file
             logging.info("Dataset loaded as dataframe successfully")
 
             os.makedirs(os.path.dirname(self.ingestion_config.train_data_path), exist_ok=True)
 
-            df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
-
             logging.info("Train test split initiated")
-            train_set, test_set = train_test_split(df, test_size=0.2, random_state=42)
-
-            train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
-            test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
+            train_set, test_set = train_test_split(
+                df, test_size=self.ingestion_config.test_size, random_state=self.ingestion_config.random_state
+            )
 
+            # The splits are handed to DataTransformation as typed Parquet files; CSV copies are an export option
+            for table, path in (
+                (df, self.ingestion_config.raw_data_path),
+                (train_set, self.ingestion_config.train_data_path),
+                (test_set, self.ingestion_config.test_data_path),
+            ):
+                save_table(table, path)
+                if self.ingestion_config.export_csv:
+                    save_table(table, os.path.splitext(path)[0] + ".csv")
+
+            self.record_source_state(len(df))
             logging.info("Ingestion of data completed successfully.")
 
             return (
@@ -77,15 +97,78 @@ class DataIngestion:
             logging.error("Error occurred during data ingestion: {}".format(e))
             raise CustomException(e, sys)
 
-if __name__ == "__main__":
-    data_ingestion = DataIngestion()
-    train_data, test_data = data_ingestion.initiate_data_ingestion()
+    def record_source_state(self, n_rows):
+        """
+        Records the size and checksum of the source as ingested, so IncrementalTrainer can tell whether rows
+        were appended to it since.
+
+        Args:
+            n_rows (int): Number of rows ingested.
+        """
+        source_path = self.ingestion_config.source_data_path
+        state = {
+            "source_path": source_path,
+            "n_rows": int(n_rows),
+            "size_bytes": os.path.getsize(source_path),
+            "checksum": file_checksum(source_path),
+        }
+        with open(self.ingestion_config.source_state_path, "w") as file_obj:
+            json.dump(state, file_obj, indent=2)
+
+    def _is_test_row(self, chunk):
+        """
+        Assigns rows to the test split by a hash of their values, so the split does not depend on how the
+        source is chunked or ordered, and identical rows always land in the same split.
+        """
+        hash_key = f"{self.ingestion_config.random_state:016d}"[-16:]
+        hashes = pd.util.hash_pandas_object(chunk, index=False, hash_key=hash_key).to_numpy()
+        buckets = 1_000_000
+        return (hashes % buckets) < self.ingestion_config.test_size * buckets
+
+    def initiate_chunked_data_ingestion(self):
+        """
+        Ingests the source in chunks of `chunk_size` rows, for sources larger than memory.
 
-    data_transformation = DataTransformation()
-    train_arr, test_arr, _ = data_transformation.initiate_data_transformation(train_data, test_data)
+        Each chunk is split by row hash (see _is_test_row) and appended to the split files, so memory use is
+        bounded by the chunk size. The split differs from the in-memory train_test_split, but is the same on
+        every run and for any chunk size. Scores are read as floats so every chunk has the same column types.
 
-    modeltrainer = ModelTrainer()
-    print(modeltrainer.initiate_model_trainer(train_arr, test_arr)) # this will give the r2_score
+        Returns:
+            tuple: Paths to the training and testing datasets (Parquet files).
+        """
+        try:
+            config = self.ingestion_config
+            dtype = {column: "float64" for column in NUMERICAL_COLUMNS + [TARGET_COLUMN]}
+            dtype.update({column: "object" for column in CATEGORICAL_COLUMNS})
+
+            paths = [config.raw_data_path, config.train_data_path, config.test_data_path]
+            if config.export_csv:
+                paths += [os.path.splitext(path)[0] + ".csv" for path in paths]
+            writers = [TableWriter(path) for path in paths]
+            try:
+                for chunk in iter_table_chunks(config.source_data_path, config.chunk_size, dtype=dtype):
+                    is_test = self._is_test_row(chunk)
+                    parts = [chunk, chunk[~is_test], chunk[is_test]]
+                    for writer, part in zip(writers, parts * 2):
+                        writer.write(part)
+            finally:
+                for writer in writers:
+                    writer.close()
+
+            self.record_source_state(writers[0].rows)
+            logging.info(f"Chunked ingestion completed: {writers[1].rows} training rows, {writers[2].rows} testing rows")
+
+            return (
+                config.train_data_path,
+                config.test_data_path
+            )
+
+        except Exception as e:
+            logging.error("Error occurred during data ingestion: {}".format(e))
+            raise CustomException(e, sys)
+
+if __name__ == "__main__":
+    # The stages run through TrainPipeline, which skips the ones whose data, config and code have not changed
+    from src.pipeline.train_pipeline import TrainPipeline
 
-# The underscore (_) is often used as a variable name in Python to indicate that the value it holds is temporary or insignificant and will not be used later in the code.
-    
\ No newline at end of file
+    print(TrainPipeline().run()["training"]) # this will give the r2_score
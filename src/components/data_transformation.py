@@ -24,14 +24,19 @@ from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder,StandardScaler
 
 from src.exception import CustomException
+from src.components.data_validaton import TARGET_COLUMN
 from src.logger import logging
 import os
 
-from src.utils import save_object # it is used to store the pickle file
+from src.utils import save_object # it is used to store the preprocessor artifact
+from src.utils import load_table, create_array, load_array, iter_table_chunks
 
 @dataclass
 class DataTransformationConfig:
-    preprocessor_obj_file_path=os.path.join('artifacts',"proprocessor.pkl")
+    preprocessor_obj_file_path=os.path.join('artifacts',"proprocessor")  # artifact directory, see src.artifact_store
+    train_array_file_path=os.path.join('artifacts',"train_array.npy")  # transformed features with the target as last column
+    test_array_file_path=os.path.join('artifacts',"test_array.npy")
+    chunk_size: int = int(os.environ.get("INGESTION_CHUNK_SIZE", 0))  # rows transformed at a time; 0 loads the splits whole
 
 class DataTransformation:
     def __init__(self):
@@ -88,10 +93,40 @@ class DataTransformation:
         except Exception as e:
             raise CustomException(e,sys)
         
+    def _save_array(self, features, target, file_path):
+        """
+        Writes the features and the target as one (n_rows, n_features + 1) .npy file and reopens it memory-mapped.
+
+        The columns are filled in place in a column-major file, so no concatenated copy is ever built in memory,
+        and both the feature block and the target column the trainer slices off are contiguous views of the map.
+        """
+        if hasattr(features, "toarray"):
+            features = features.toarray()
+        array = create_array(file_path, (features.shape[0], features.shape[1] + 1), fortran_order=True)
+        array[:, :-1] = features
+        array[:, -1] = target
+        array.flush()
+        del array
+        return load_array(file_path)
+
     def initiate_data_transformation(self, train_path, test_path):
+        """
+        Fits the preprocessor on the training split and transforms both splits.
+
+        Args:
+            train_path (str): Path of the training split, Parquet or CSV.
+            test_path (str): Path of the testing split, Parquet or CSV.
+
+        Returns:
+            tuple: (train_arr, test_arr, preprocessor path). The arrays are read-only memory maps of
+                artifacts/train_array.npy and artifacts/test_array.npy, with the target as last column.
+        """
         try:
-            train_df = pd.read_csv(train_path)
-            test_df = pd.read_csv(test_path)
+            if self.data_transformation_config.chunk_size:
+                return self.initiate_chunked_data_transformation(train_path, test_path)
+
+            train_df = load_table(train_path)
+            test_df = load_table(test_path)
 
             logging.info("Read train and test data completed")
 
@@ -115,15 +150,19 @@ class DataTransformation:
             input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
             input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
 
-            train_arr = np.c_[
-                input_feature_train_arr, np.array(target_feature_train_df)
-            ]
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]
+            train_arr = self._save_array(
+                input_feature_train_arr, target_feature_train_df.to_numpy(),
+                self.data_transformation_config.train_array_file_path,
+            )
+            test_arr = self._save_array(
+                input_feature_test_arr, target_feature_test_df.to_numpy(),
+                self.data_transformation_config.test_array_file_path,
+            )
 
             logging.info(f"Saved preprocessing object.")
 
             save_object(
-                file_path=self.data_transformation_config.preprocessor_obj_file_path,  # This line specifies the path for the preprocessor.pkl file
+                file_path=self.data_transformation_config.preprocessor_obj_file_path,  # This line specifies the path for the preprocessor artifact
                 obj=preprocessing_obj  # This line saves the preprocessing object to the specified path
             )
 
@@ -135,3 +174,162 @@ class DataTransformation:
         except Exception as e:
             raise CustomException(e, sys)
 
+    def _count_values(self, train_path, columns):
+        """
+        First pass of the chunked fit: counts the non-missing values of every input column.
+
+        Returns:
+            tuple: (number of rows, dict column -> pd.Series of value counts).
+        """
+        chunk_size = self.data_transformation_config.chunk_size
+        n_rows, counts = 0, {column: pd.Series(dtype="int64") for column in columns}
+        for chunk in iter_table_chunks(train_path, chunk_size, columns=columns):
+            n_rows += len(chunk)
+            for column in columns:
+                counts[column] = counts[column].add(chunk[column].value_counts(dropna=True), fill_value=0)
+        return n_rows, counts
+
+    @staticmethod
+    def _imputer_statistic(strategy, counts):
+        """
+        Computes what SimpleImputer.fit would learn for one column from its value counts: the median
+        (the mean of the two middle values for an even count, as np.median does), the mean, or the most
+        frequent value (the smallest one on ties).
+        """
+        if strategy == "most_frequent":
+            top = counts[counts == counts.max()]
+            return min(top.index)
+        counts = counts.sort_index()
+        values, weights = counts.index.to_numpy(dtype=float), counts.to_numpy().astype(np.int64)
+        if strategy == "mean":
+            return float(np.sum(values * weights) / weights.sum())
+        if strategy == "median":
+            ends = np.cumsum(weights)
+            n = ends[-1]
+            low, high = values[np.searchsorted(ends, (n - 1) // 2, side="right")], values[np.searchsorted(ends, n // 2, side="right")]
+            return (low + high) / 2
+        raise ValueError(f"Chunked fit does not support SimpleImputer(strategy='{strategy}')")
+
+    def _fit_in_chunks(self, train_path):
+        """
+        Fits the preprocessor on the training split without loading it whole.
+
+        1. One pass counts every column's values, which gives the exact imputer statistics and the full list of
+           categories the OneHotEncoder would find. Memory grows with the number of distinct values, which is
+           small here: the scores are bounded integers.
+        2. The ColumnTransformer is fitted on a small skeleton frame that contains every category, so all of
+           its structure (columns, encoders, output layout) is fitted by sklearn itself, and the imputer
+           statistics are then replaced with the ones counted over the whole split.
+        3. A second pass fits the StandardScalers incrementally with partial_fit on the imputed/encoded chunks.
+
+        The result transforms like a preprocessor fitted on the whole split, up to floating point rounding in
+        the scaler statistics.
+        """
+        from sklearn.preprocessing import StandardScaler
+
+        chunk_size = self.data_transformation_config.chunk_size
+        preprocessor = self.get_data_transformer_object()
+        columns = [column for _, _, group in preprocessor.transformers for column in group]
+        n_rows, counts = self._count_values(train_path, columns)
+        if n_rows == 0:
+            raise ValueError(f"No rows in {train_path}")
+
+        # Skeleton: every category of every one-hot encoded column appears at least once
+        encoded = [
+            column for _, pipeline, group in preprocessor.transformers
+            if any(isinstance(step, OneHotEncoder) for _, step in pipeline.steps) for column in group
+        ]
+        n_skeleton = max([len(counts[column]) for column in encoded] + [1])
+        skeleton = {}
+        for column in columns:
+            values = sorted(counts[column].index)
+            skeleton[column] = [values[row % len(values)] for row in range(n_skeleton)]
+        preprocessor.fit(pd.DataFrame(skeleton))
+
+        for name, pipeline, group in preprocessor.transformers_:
+            if name == "remainder":
+                continue
+            imputer = pipeline.steps[0][1]
+            if isinstance(imputer, SimpleImputer):
+                imputer.statistics_ = np.array(
+                    [self._imputer_statistic(imputer.strategy, counts[column]) for column in group],
+                    dtype=imputer.statistics_.dtype,
+                )
+
+        # Second pass: scaler statistics, and the output density ColumnTransformer uses to choose a sparse output
+        scalers, nonzero, total = {}, 0, 0
+        for chunk in iter_table_chunks(train_path, chunk_size, columns=columns):
+            for name, pipeline, group in preprocessor.transformers_:
+                if name == "remainder":
+                    continue
+                step_name, scaler = pipeline.steps[-1]
+                if isinstance(scaler, StandardScaler):
+                    features = pipeline[:-1].transform(chunk[group])
+                    scalers.setdefault(name, StandardScaler(**scaler.get_params())).partial_fit(features)
+                else:
+                    features = pipeline.transform(chunk[group])
+                nonzero += features.nnz if hasattr(features, "nnz") else features.size
+                total += features.shape[0] * features.shape[1]
+
+        for name, pipeline, _ in preprocessor.transformers_:
+            if name in scalers:
+                pipeline.steps[-1] = (pipeline.steps[-1][0], scalers[name])
+        preprocessor.sparse_output_ = bool(preprocessor.sparse_output_) and nonzero / total < preprocessor.sparse_threshold
+
+        logging.info(f"Fitted preprocessor on {n_rows} training rows in chunks of {chunk_size}")
+        return preprocessor
+
+    def _transform_in_chunks(self, preprocessor, path, file_path):
+        """
+        Transforms a split chunk by chunk into a memory-mapped .npy file, laid out like _save_array.
+        """
+        chunk_size = self.data_transformation_config.chunk_size
+        n_rows = sum(len(chunk) for chunk in iter_table_chunks(path, chunk_size, columns=[TARGET_COLUMN]))
+
+        array, start = None, 0
+        for chunk in iter_table_chunks(path, chunk_size):
+            features = preprocessor.transform(chunk.drop(columns=[TARGET_COLUMN]))
+            if hasattr(features, "toarray"):
+                features = features.toarray()
+            if array is None:
+                array = create_array(file_path, (n_rows, features.shape[1] + 1), fortran_order=True)
+            array[start:start + len(chunk), :-1] = features
+            array[start:start + len(chunk), -1] = chunk[TARGET_COLUMN].to_numpy()
+            start += len(chunk)
+
+        if array is None:
+            raise ValueError(f"No rows in {path}")
+        array.flush()
+        del array
+        return load_array(file_path)
+
+    def initiate_chunked_data_transformation(self, train_path, test_path):
+        """
+        Fits the preprocessor and transforms both splits `chunk_size` rows at a time, for splits larger
+        than memory. Memory use is bounded by the chunk size; the transformed arrays are written straight
+        into their memory-mapped files.
+
+        Args:
+            train_path (str): Path of the training split, Parquet or CSV.
+            test_path (str): Path of the testing split, Parquet or CSV.
+
+        Returns:
+            tuple: (train_arr, test_arr, preprocessor path), as initiate_data_transformation.
+        """
+        try:
+            config = self.data_transformation_config
+            preprocessing_obj = self._fit_in_chunks(train_path)
+
+            train_arr = self._transform_in_chunks(preprocessing_obj, train_path, config.train_array_file_path)
+            test_arr = self._transform_in_chunks(preprocessing_obj, test_path, config.test_array_file_path)
+
+            save_object(file_path=config.preprocessor_obj_file_path, obj=preprocessing_obj)
+            logging.info("Saved preprocessing object.")
+
+            return (
+                train_arr,
+                test_arr,
+                config.preprocessor_obj_file_path,
+            )
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -1,9 +1,184 @@
 """
-Simulation of real-life project, these files will also be present but for simplicity we are not creating this file in our project.
-
 data_validation.py
 
-This module is part of the 'src/components' package and is used for validating the input data for machine learning models. 
-It contains functions and classes that help in checking the quality, consistency, and completeness of the data. 
+This module is part of the 'src/components' package and is used for validating the input data for machine learning models.
+It contains functions and classes that help in checking the quality, consistency, and completeness of the data.
 The validation results can be used to clean the data, handle missing values, and ensure that the data meets the required standards for training models.
-"""
\ No newline at end of file
+
+Constants:
+    NUMERICAL_COLUMNS: The numeric input features.
+    CATEGORICAL_COLUMNS: The categorical input features.
+    FEATURE_COLUMNS: All input features, in the order CustomData lists them.
+    TARGET_COLUMN: The column the model predicts.
+    SCORE_RANGE: The inclusive range a valid score falls in.
+
+Classes:
+    DataValidation: Checks a block of input records column by column before it is scored.
+
+Functions:
+    get_known_categories: Reads the categories the fitted preprocessor was trained on.
+    check_record_keys: Checks that record dicts have exactly the feature columns as keys.
+    check_records: Checks that every element of a block is a record, and returns the block as dicts.
+"""
+import sys
+
+from src.exception import CustomException, DataValidationError
+
+NUMERICAL_COLUMNS = ["writing_score", "reading_score"]
+CATEGORICAL_COLUMNS = [
+    "gender",
+    "race_ethnicity",
+    "parental_level_of_education",
+    "lunch",
+    "test_preparation_course",
+]
+FEATURE_COLUMNS = CATEGORICAL_COLUMNS + ["reading_score", "writing_score"]
+TARGET_COLUMN = "math_score"
+SCORE_RANGE = (0, 100)
+_FEATURE_KEYS = frozenset(FEATURE_COLUMNS)
+
+
+def get_known_categories(preprocessor):
+    """
+    Reads the categories of each categorical column from the fitted preprocessor.
+
+    Args:
+        preprocessor: The fitted ColumnTransformer built by DataTransformation.
+
+    Returns:
+        dict: Column name -> set of known categories, or None if the preprocessor has a different layout.
+    """
+    try:
+        cat_pipeline = preprocessor.named_transformers_["cat_pipelines"]
+        encoder = cat_pipeline.named_steps["one_hot_encoder"]
+        return {
+            column: set(categories)
+            for column, categories in zip(CATEGORICAL_COLUMNS, encoder.categories_)
+        }
+    except (AttributeError, KeyError):
+        return None
+
+
+def check_record_keys(records):
+    """
+    Checks that every record dict has every feature column as a key and no other key, so a misspelled or
+    forgotten field is reported instead of being imputed. A key holding None still counts as a missing value.
+
+    Args:
+        records (list): Record dicts.
+
+    Raises:
+        DataValidationError: Naming the missing and unknown keys and the rows they occur in.
+    """
+    missing, unknown = {}, {}
+    for row, record in enumerate(records):
+        if record.keys() == _FEATURE_KEYS:
+            continue
+        for column in FEATURE_COLUMNS:
+            if column not in record:
+                missing.setdefault(column, []).append(row)
+        for key in record:
+            if key not in _FEATURE_KEYS:
+                unknown.setdefault(str(key), []).append(row)
+
+    errors = [f"{column} is missing in rows {rows}" for column, rows in missing.items()]
+    errors += [f"Unknown column '{key}' in rows {rows}" for key, rows in unknown.items()]
+    if errors:
+        raise DataValidationError("; ".join(errors), sys, errors=errors)
+
+
+def check_records(records):
+    """
+    Checks that every element of a block is a record: a dict keyed by the feature columns, or a row of
+    len(FEATURE_COLUMNS) values in FEATURE_COLUMNS order. Rows are turned into dicts.
+
+    Args:
+        records (list): The elements of the block, e.g. a parsed JSON array.
+
+    Returns:
+        list: The records, as dicts.
+
+    Raises:
+        DataValidationError: Naming the elements that are not records, or the missing and unknown keys.
+    """
+    dicts, bad_rows = [], []
+    for row, record in enumerate(records):
+        if isinstance(record, dict):
+            dicts.append(record)
+        elif isinstance(record, (list, tuple)) and len(record) == len(FEATURE_COLUMNS):
+            dicts.append(dict(zip(FEATURE_COLUMNS, record)))
+        else:
+            bad_rows.append(row)
+    if bad_rows:
+        error = f"Rows {bad_rows} are not records: expected an object or a list of {len(FEATURE_COLUMNS)} values"
+        raise DataValidationError(error, sys, errors=[error])
+
+    check_record_keys(dicts)
+    return dicts
+
+
+class DataValidation:
+    """
+    Validates a block of input records before it goes through the preprocessor.
+
+    Every check runs on a whole column at once, so validating thousands of records costs
+    about as much as validating one.
+    """
+
+    def validate_features(self, df, known_categories=None):
+        """
+        Checks that the records have every feature column, that the scores are numbers within
+        SCORE_RANGE and that the categorical values were seen during training. Missing values
+        are allowed because the preprocessor imputes them.
+
+        Args:
+            df (pd.DataFrame): The records to validate, one per row.
+            known_categories (dict, optional): Column name -> set of allowed categories.
+
+        Returns:
+            pd.DataFrame: The feature columns with the scores converted to floats, in input order.
+
+        Raises:
+            DataValidationError: If any record is invalid. `errors` lists every problem found.
+        """
+        try:
+            errors = []
+
+            missing_columns = [column for column in FEATURE_COLUMNS if column not in df.columns]
+            if missing_columns:
+                raise DataValidationError(f"Missing columns: {missing_columns}", sys)
+
+            import pandas as pd  # only here, so the serving path can import the column constants without pandas
+
+            features = df[FEATURE_COLUMNS].copy()
+            low, high = SCORE_RANGE
+
+            for column in NUMERICAL_COLUMNS:
+                values = pd.to_numeric(features[column], errors="coerce")
+                not_numeric = values.isna() & features[column].notna()
+                out_of_range = values.notna() & ((values < low) | (values > high))
+                if not_numeric.any():
+                    errors.append(f"{column} is not a number in rows {list(features.index[not_numeric])}")
+                if out_of_range.any():
+                    errors.append(f"{column} is outside {SCORE_RANGE} in rows {list(features.index[out_of_range])}")
+                features[column] = values.astype(float)
+
+            if known_categories is not None:
+                for column in CATEGORICAL_COLUMNS:
+                    values = features[column]
+                    unknown = values.notna() & ~values.isin(known_categories[column])
+                    if unknown.any():
+                        errors.append(
+                            f"{column} has unknown values {sorted(set(values[unknown].astype(str)))} "
+                            f"in rows {list(features.index[unknown])}"
+                        )
+
+            if errors:
+                raise DataValidationError("; ".join(errors), sys, errors=errors)
+
+            return features
+
+        except DataValidationError:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
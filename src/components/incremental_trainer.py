@@ -0,0 +1,467 @@
+"""
+This module contains the IncrementalTrainer class, which folds rows appended to the source data into the trained
+model without a full retrain.
+
+A regular training run refits the preprocessor and grid-searches every model. When the source has only grown by a
+daily drop of rows, IncrementalTrainer instead:
+
+1. Reads only the bytes appended to the source since it was last ingested (see DataIngestion.record_source_state)
+   and splits the new rows between train and test by row hash.
+2. Validates them, transforms them with the preprocessor the model was trained with, and appends them to the
+   split files and the transformed arrays.
+3. Updates running preprocessor statistics (value counts for the imputers, incremental StandardScaler statistics)
+   with the new rows only. The fitted preprocessor itself stays frozen so the model keeps the feature space it was
+   trained on; the running statistics tell when it has drifted far enough to need a refit.
+4. Continues training the selected model: more boosting rounds for XGBoost/CatBoost/Gradient Boosting, more
+   warm-started trees for Random Forest, and an exact update of the least-squares solution from accumulated
+   sufficient statistics for Linear Regression. Other models are refitted with their selected parameters.
+
+It falls back to the full training pipeline when the update cannot be trusted: the source was rewritten rather than
+appended to, new rows have categories the preprocessor does not know, the preprocessor statistics have drifted
+by more than `max_statistics_drift`, or the updated model scores more than `max_score_drop` below the last full
+training run on the test split.
+
+Classes:
+    IncrementalTrainerConfig: Configuration for the state files and the fallback thresholds.
+    IncrementalTrainer: Runs one incremental update.
+
+Usage:
+    python -m src.components.incremental_trainer
+"""
+
+import io
+import os
+import copy
+import sys
+import json
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from src.exception import CustomException, DataValidationError
+from src.logger import logging, bind_log_context, reset_log_context, new_id
+from src.utils import (
+    save_object, load_object, file_checksum, load_table, iter_table_chunks, TableWriter, create_array, load_array,
+)
+from src.components.data_ingestion import DataIngestion, DataIngestionConfig
+from src.components.data_transformation import DataTransformation, DataTransformationConfig
+from src.components.data_validaton import (
+    DataValidation, get_known_categories, CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS, TARGET_COLUMN,
+)
+from src.components.model_trainer import ModelTrainer, ModelTrainerConfig
+
+
+@dataclass
+class IncrementalTrainerConfig:
+    """Configuration class for incremental retraining."""
+    state_file_path: str = os.path.join("artifacts", "incremental_state.json")
+    statistics_file_path: str = os.path.join("artifacts", "preprocessor_statistics.pkl")
+    max_score_drop: float = 0.02  # largest fall in test R2 below the last full training before retraining from scratch
+    max_statistics_drift: float = 0.05  # largest scaler shift, in standard deviations, before refitting the preprocessor
+    min_extra_rounds: int = 10  # boosting rounds / trees added at least per update
+    chunk_size: int = 100_000  # rows read at a time when copying the splits and arrays
+
+
+class IncrementalTrainer:
+    """
+    Folds newly appended source rows into the splits, the preprocessor statistics and the selected model.
+
+    Methods:
+        update(): Runs one incremental update, or the full pipeline when the update cannot be trusted.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or IncrementalTrainerConfig()
+        self.ingestion_config = DataIngestionConfig()
+        self.transformation_config = DataTransformationConfig()
+        self.trainer_config = ModelTrainerConfig()
+
+    # ----------------------------------------------------------------------------------------------- new rows
+
+    def _read_new_rows(self):
+        """
+        Reads the rows appended to the source since it was last ingested.
+
+        Returns:
+            tuple: (new rows as a DataFrame, or None if the source was not simply appended to; the source state).
+        """
+        with open(self.ingestion_config.source_state_path) as file_obj:
+            ingested = json.load(file_obj)
+
+        source_path = ingested["source_path"]
+        offset = ingested["size_bytes"]
+        size = os.path.getsize(source_path)
+        if size < offset or file_checksum(source_path, length=offset) != ingested["checksum"]:
+            return None, ingested
+
+        with open(source_path, "rb") as file_obj:
+            header = file_obj.readline().decode()
+            file_obj.seek(offset - 1)
+            if file_obj.read(1) != b"\n":
+                return None, ingested  # the last ingested row was extended, not followed by new ones
+            appended = file_obj.read(size - offset)
+
+        columns = pd.read_csv(io.StringIO(header)).columns
+        if not appended.strip():
+            return pd.DataFrame(columns=columns), ingested
+        return pd.read_csv(io.BytesIO(appended), header=None, names=columns), ingested
+
+    @staticmethod
+    def _temporary_path(file_path):
+        root, extension = os.path.splitext(file_path)
+        return f"{root}.update{extension}"
+
+    def _append_table(self, file_path, rows):
+        """
+        Writes a copy of a split file with rows appended, keeping the column types of the rows already in it.
+
+        Returns:
+            str: Path of the copy, moved into place once the whole update has succeeded.
+        """
+        temporary_path = self._temporary_path(file_path)
+        dtypes = None
+        with TableWriter(temporary_path) as writer:
+            for chunk in iter_table_chunks(file_path, self.config.chunk_size):
+                writer.write(chunk)
+                dtypes = chunk.dtypes.to_dict()
+            if dtypes is None:
+                # An empty split yields no chunks; reading it whole is cheap and gives the types of its schema
+                dtypes = load_table(file_path).dtypes.to_dict()
+            writer.write(rows.astype(dtypes))
+        return temporary_path
+
+    def _append_array(self, file_path, block):
+        """
+        Writes a copy of a column-major transformed array with rows appended, copying the existing rows a chunk
+        at a time.
+
+        Returns:
+            tuple: (path of the copy, the copy as a read-only memory map).
+        """
+        old = load_array(file_path)
+        n_old = old.shape[0]
+        temporary_path = self._temporary_path(file_path)
+        array = create_array(temporary_path, (n_old + block.shape[0], old.shape[1]), fortran_order=True)
+        for start in range(0, n_old, self.config.chunk_size):
+            end = min(start + self.config.chunk_size, n_old)
+            array[start:end] = old[start:end]
+        array[n_old:] = block
+        array.flush()
+        del array, old
+        return temporary_path, load_array(temporary_path)
+
+    # ---------------------------------------------------------------------------------------------- statistics
+
+    def _load_statistics(self, preprocessor, preprocessor_checksum, train_array):
+        """
+        Loads the running statistics of the frozen preprocessor, or builds them from the training split if they
+        belong to another preprocessor (after a full retrain).
+
+        The statistics are the value counts of every input column, the incremental state of every StandardScaler,
+        and the least-squares sufficient statistics of the training features.
+        """
+        path = self.config.statistics_file_path
+        if os.path.exists(path):
+            statistics = load_object(path)
+            if statistics["preprocessor_checksum"] == preprocessor_checksum:
+                return statistics
+
+        transformation = DataTransformation()
+        transformation.data_transformation_config.chunk_size = self.config.chunk_size
+        columns = [column for _, _, group in preprocessor.transformers_ if group is not None for column in group]
+        _, counts = transformation._count_values(self.ingestion_config.train_data_path, columns)
+
+        statistics = {
+            "preprocessor_checksum": preprocessor_checksum,
+            "counts": counts,
+            "scalers": {},
+            "least_squares": self._least_squares_statistics(train_array[:, :-1], train_array[:, -1]),
+        }
+        for name, pipeline, _ in preprocessor.transformers_:
+            scaler = pipeline.steps[-1][1] if hasattr(pipeline, "steps") else None
+            if isinstance(scaler, StandardScaler):
+                statistics["scalers"][name] = copy.deepcopy(scaler)  # updated with new rows; the fitted one stays frozen
+        return statistics
+
+    @staticmethod
+    def _least_squares_statistics(X, y, statistics=None):
+        """
+        Accumulates the sums a least-squares fit with intercept needs: row count, feature and target sums,
+        X'X and X'y.
+        """
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if statistics is None:
+            n_features = X.shape[1]
+            statistics = {
+                "n": 0, "sum_x": np.zeros(n_features), "sum_y": 0.0,
+                "xtx": np.zeros((n_features, n_features)), "xty": np.zeros(n_features),
+            }
+        statistics["n"] += len(X)
+        statistics["sum_x"] = statistics["sum_x"] + X.sum(axis=0)
+        statistics["sum_y"] += float(y.sum())
+        statistics["xtx"] = statistics["xtx"] + X.T @ X
+        statistics["xty"] = statistics["xty"] + X.T @ y
+        return statistics
+
+    def _update_statistics(self, statistics, preprocessor, new_train):
+        """
+        Adds the new training rows to the running statistics and measures how far they have moved from the
+        frozen preprocessor.
+
+        Returns:
+            tuple: (drift in standard deviations of the largest scaler shift, list of imputer values that changed).
+                Imputer changes only matter for rows with missing values, so they are reported but do not force
+                a retrain on their own; the next full retrain picks them up.
+        """
+        transformation = DataTransformation()
+        for column, counts in statistics["counts"].items():
+            statistics["counts"][column] = counts.add(new_train[column].value_counts(dropna=True), fill_value=0)
+
+        drift, changed = 0.0, []
+        for name, pipeline, group in preprocessor.transformers_:
+            if not hasattr(pipeline, "steps"):
+                continue
+            imputer = pipeline.steps[0][1]
+            if hasattr(imputer, "statistics_"):
+                for column, fitted in zip(group, imputer.statistics_):
+                    updated = transformation._imputer_statistic(imputer.strategy, statistics["counts"][column])
+                    if updated != fitted:
+                        changed.append(f"{column}: {fitted} -> {updated}")
+
+            if name in statistics["scalers"]:
+                fitted = pipeline.steps[-1][1]
+                scaler = statistics["scalers"][name]
+                features = pipeline[:-1].transform(new_train[group])
+                if len(new_train):
+                    scaler.partial_fit(features)
+                if fitted.with_mean:
+                    drift = max(drift, float(np.max(np.abs(scaler.mean_ - fitted.mean_) / fitted.scale_)))
+                drift = max(drift, float(np.max(np.abs(scaler.scale_ / fitted.scale_ - 1.0))))
+        return drift, changed
+
+    # ------------------------------------------------------------------------------------------------ training
+
+    def _continue_training(self, model, statistics, X_train, y_train, n_new):
+        """
+        Continues training the selected model on the updated training split.
+
+        Returns:
+            tuple: (updated model, description of what was done).
+        """
+        name = type(model).__name__
+        share = n_new / max(1, len(X_train) - n_new)
+
+        if name == "LinearRegression":
+            # Exact: the same least-squares solution a refit on every row would find, from the accumulated sums
+            least_squares = statistics["least_squares"]
+            n = least_squares["n"]
+            mean_x, mean_y = least_squares["sum_x"] / n, least_squares["sum_y"] / n
+            centered_xtx = least_squares["xtx"] - n * np.outer(mean_x, mean_x)
+            centered_xty = least_squares["xty"] - n * mean_x * mean_y
+            # The one-hot blocks make X'X singular; forming X'X squares the condition number, so the cutoff for
+            # its null space must be far above the default, or rounding noise there gets inverted into the solution
+            # (rcond rather than rtol, which NumPy 1.x does not accept)
+            model.coef_ = np.linalg.pinv(centered_xtx, rcond=1e-10, hermitian=True) @ centered_xty
+            model.intercept_ = mean_y - mean_x @ model.coef_
+            return model, "least-squares update"
+
+        if name == "XGBRegressor":
+            total = model.get_booster().num_boosted_rounds()
+            extra = max(self.config.min_extra_rounds, math.ceil(total * share))
+            model.set_params(n_estimators=extra)
+            model.fit(X_train, y_train, xgb_model=model.get_booster())
+            model.set_params(n_estimators=total + extra)
+            return model, f"{extra} more boosting rounds"
+
+        if name == "CatBoostRegressor":
+            total = model.tree_count_
+            extra = max(self.config.min_extra_rounds, math.ceil(total * share))
+            # A fitted CatBoost model cannot change its parameters, so the extra rounds go into a new one
+            updated = type(model)(**dict(model.get_params(), iterations=extra))
+            updated.fit(X_train, y_train, init_model=model)
+            return updated, f"{extra} more boosting rounds"
+
+        if name in ("GradientBoostingRegressor", "RandomForestRegressor"):
+            total = model.n_estimators
+            extra = max(self.config.min_extra_rounds, math.ceil(total * share))
+            model.set_params(warm_start=True, n_estimators=total + extra)
+            model.fit(X_train, y_train)
+            model.set_params(warm_start=False)
+            kind = "boosting rounds" if name == "GradientBoostingRegressor" else "trees"
+            return model, f"{extra} more {kind}"
+
+        # No way to continue training: refit with the selected parameters, still without a grid search
+        model.fit(X_train, y_train)
+        return model, "refit with the selected parameters"
+
+    # --------------------------------------------------------------------------------------------------- update
+
+    def _full_retrain(self, reason):
+        """
+        Runs the full training pipeline and starts the incremental state over.
+        """
+        from src.pipeline.train_pipeline import TrainPipeline
+
+        logging.info(f"Falling back to a full retrain: {reason}")
+        started = time.perf_counter()
+        score = TrainPipeline().run()["training"]
+        for path in (self.config.state_file_path, self.config.statistics_file_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return {"mode": "full", "reason": reason, "score": float(score), "duration": time.perf_counter() - started}
+
+    def _read_state(self):
+        """
+        Returns the incremental state, starting it from the last full training run's search trace.
+        """
+        if os.path.exists(self.config.state_file_path):
+            with open(self.config.state_file_path) as file_obj:
+                return json.load(file_obj)
+        with open(self.trainer_config.search_trace_file_path) as file_obj:
+            trace = json.load(file_obj)
+        # The served model differs from the selected one when a student was distilled from it; traces written
+        # before the served fields existed describe the selected model, which was then also the one served
+        return {
+            "selected_model": trace.get("served_model", trace["selected_model"]),
+            "baseline_score": trace.get("served_score", trace["test_scores"][trace["selected_model"]]),
+            "updates": [],
+        }
+
+    def update(self):
+        """
+        Folds the rows appended to the source into the model, or retrains from scratch when needed.
+
+        Returns:
+            dict: What happened: "mode" ("unchanged", "incremental" or "full"), the reason, the test R2 score,
+                the number of new rows and the duration.
+
+        Raises:
+            CustomException: If the update fails.
+        """
+        token = bind_log_context(run_id=new_id())
+        try:
+            started = time.perf_counter()
+            if not os.path.exists(self.ingestion_config.source_state_path):
+                return self._full_retrain("no record of the ingested source")
+
+            new_rows, ingested = self._read_new_rows()
+            if new_rows is None:
+                return self._full_retrain("the source was modified, not appended to")
+            if new_rows.empty:
+                logging.info("No new rows in the source")
+                return {"mode": "unchanged", "reason": "no new rows", "n_new_rows": 0}
+
+            preprocessor_path = self.transformation_config.preprocessor_obj_file_path
+            preprocessor = load_object(preprocessor_path)
+            try:
+                DataValidation().validate_features(new_rows, known_categories=get_known_categories(preprocessor))
+            except DataValidationError as e:
+                return self._full_retrain(f"new rows cannot be scored by the current preprocessor: {e.errors}")
+
+            # Same row-hash split as chunked ingestion, on the same column types
+            typed = new_rows.astype({column: "float64" for column in NUMERICAL_COLUMNS + [TARGET_COLUMN]})
+            is_test = DataIngestion()._is_test_row(typed.astype({column: "object" for column in CATEGORICAL_COLUMNS}))
+            new_train, new_test = new_rows[~is_test], new_rows[is_test]
+
+            state = self._read_state()
+            train_array = load_array(self.transformation_config.train_array_file_path)
+            statistics = self._load_statistics(preprocessor, file_checksum(preprocessor_path), train_array)
+            drift, changed = self._update_statistics(statistics, preprocessor, new_train)
+            if drift > self.config.max_statistics_drift:
+                return self._full_retrain(f"scaler statistics drifted by {drift:.3f} standard deviations")
+            if changed:
+                logging.info(f"Imputer statistics of the new data differ from the frozen preprocessor: {changed}")
+
+            # Transform the new rows with the frozen preprocessor and append them to the splits and arrays
+            blocks = []
+            for rows in (new_train, new_test):
+                features = preprocessor.transform(rows.drop(columns=[TARGET_COLUMN]))
+                if hasattr(features, "toarray"):
+                    features = features.toarray()
+                blocks.append(np.c_[features, rows[TARGET_COLUMN].to_numpy(dtype=float)])
+
+            # Everything is written next to the current artifacts and only moved into place once the update passed
+            pending = {}
+            try:
+                for file_path, rows in (
+                    (self.ingestion_config.raw_data_path, new_rows),
+                    (self.ingestion_config.train_data_path, new_train),
+                    (self.ingestion_config.test_data_path, new_test),
+                ):
+                    pending[file_path] = self._append_table(file_path, rows)
+                del train_array
+                for file_path, block in (
+                    (self.transformation_config.train_array_file_path, blocks[0]),
+                    (self.transformation_config.test_array_file_path, blocks[1]),
+                ):
+                    pending[file_path], _ = self._append_array(file_path, block)
+                train_array = load_array(pending[self.transformation_config.train_array_file_path])
+                test_array = load_array(pending[self.transformation_config.test_array_file_path])
+                statistics["least_squares"] = self._least_squares_statistics(
+                    blocks[0][:, :-1], blocks[0][:, -1], statistics["least_squares"]
+                )
+
+                model = load_object(self.trainer_config.trained_model_file_path)
+                if getattr(model, "distilled_from_", None):
+                    # A student only mimics its teacher; updating it on the new rows would not update the teacher
+                    return self._full_retrain(f"the served model is a student distilled from {model.distilled_from_}")
+                model, action = self._continue_training(
+                    model, statistics, train_array[:, :-1], train_array[:, -1], len(new_train)
+                )
+                score = float(model.score(test_array[:, :-1], test_array[:, -1]))
+                del train_array, test_array
+
+                if state["baseline_score"] - score > self.config.max_score_drop:
+                    return self._full_retrain(
+                        f"test R2 fell to {score:.4f} from {state['baseline_score']:.4f} after the incremental update"
+                    )
+
+                for file_path, temporary_path in pending.items():
+                    os.replace(temporary_path, file_path)
+                pending = {}
+            finally:
+                for temporary_path in pending.values():
+                    if os.path.exists(temporary_path):
+                        os.remove(temporary_path)
+
+            save_object(file_path=self.trainer_config.trained_model_file_path, obj=model)
+            save_object(file_path=self.config.statistics_file_path, obj=statistics)
+            DataIngestion().record_source_state(ingested["n_rows"] + len(new_rows))
+            if self.trainer_config.export_tree_engine:
+                ModelTrainer().export_tree_engine()
+            if self.trainer_config.export_prediction_table:
+                ModelTrainer().export_prediction_table()
+
+            report = {
+                "mode": "incremental",
+                "reason": action,
+                "score": score,
+                "n_new_rows": len(new_rows),
+                "n_new_train_rows": len(new_train),
+                "statistics_drift": drift,
+                "imputer_changes": changed,
+                "duration": time.perf_counter() - started,
+            }
+            state["updates"].append(dict(report, finished_at=time.strftime("%Y-%m-%d %H:%M:%S")))
+            with open(self.config.state_file_path, "w") as file_obj:
+                json.dump(state, file_obj, indent=2)
+
+            logging.info(
+                f"Incremental update of {state['selected_model']} with {len(new_rows)} rows: {action}, test R2 {score:.4f}",
+                extra={"stage": "incremental_update", "rows": len(new_rows), "duration_ms": round(report["duration"] * 1000, 3)},
+            )
+            return report
+
+        except Exception as e:
+            raise CustomException(e, sys)
+        finally:
+            reset_log_context(token)
+
+
+if __name__ == "__main__":
+    print(IncrementalTrainer().update())
@@ -0,0 +1,220 @@
+"""
+This module contains the ModelDistiller class, which replaces a heavy winning model with a small student that
+mimics it.
+
+The model selected by ModelTrainer can be a large ensemble (CatBoost, XGBoost, a 256-tree forest) that costs far more
+CPU per prediction than its accuracy advantage is worth. Distillation fits a small, fast student to the predictions of
+that teacher rather than to the noisy targets:
+
+1. Augmented inputs are generated over the known input space: half uniformly over every category combination and the
+   full score range, half near the training rows (their scores jittered by a few points, and each category swapped
+   for a random one with some probability), so the student learns the teacher both where the data is and around it.
+2. The teacher labels them.
+3. Every configured student is fitted on the labels, in the same transformed feature space as the teacher, so it is
+   a drop-in replacement behind the same preprocessor:
+   - "shallow_tree": a depth-limited DecisionTreeRegressor, served through the flattened tree engine;
+   - "linear_interactions": a ridge regression on the features and their pairwise products.
+4. Each student is scored on held-out augmented inputs (agreement: R2 of the student against the teacher) and on the
+   real test split, and timed with the ModelSelector measurements.
+
+The fastest student whose agreement reaches `min_agreement`, whose test R2 is within `max_score_drop` of the teacher's
+and which is faster than the teacher is shipped as the serving model; the teacher is kept next to it, and the student
+carries a `distilled_from_` attribute naming it. Otherwise the teacher is shipped unchanged. The exact lookup table
+over the input space is already exported for every model (src.components.prediction_table), so it is not a student
+here.
+
+Classes:
+    DistillationConfig: Configuration for the augmentation, the students and the acceptance thresholds.
+    ModelDistiller: Generates the inputs, fits and checks the students, and reports.
+
+Usage:
+    distiller = ModelDistiller()
+    model, report = distiller.distill(teacher, preprocessor, X_train, X_test, y_test)
+    distiller.save(report, teacher)
+"""
+
+import os
+import sys
+import json
+import shutil
+from dataclasses import dataclass
+
+import numpy as np
+from sklearn.linear_model import Ridge
+from sklearn.metrics import r2_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import PolynomialFeatures
+from sklearn.tree import DecisionTreeRegressor
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import save_object
+from src.components.data_validaton import SCORE_RANGE
+from src.components.model_selection import ModelSelector
+from src.pipeline.compiled_preprocessor import compile_preprocessor
+
+
+@dataclass
+class DistillationConfig:
+    """Configuration class for model distillation."""
+    students: tuple = ("linear_interactions", "shallow_tree")  # student models tried, see _student
+    n_augmented: int = 50_000  # augmented inputs generated and labelled by the teacher
+    holdout_fraction: float = 0.2  # augmented inputs kept out of the student fit to measure agreement
+    jitter: int = 5  # largest change, in score points, applied to the scores of training rows
+    swap_probability: float = 0.3  # chance of each category of a training row being replaced by a random one
+    shallow_tree_depth: int = 10
+    min_agreement: float = 0.99  # smallest R2 of the student against the teacher for it to be shipped
+    max_score_drop: float = 0.01  # largest test R2 the student may lose against the teacher
+    random_state: int = 42
+    teacher_model_file_path: str = os.path.join("artifacts", "teacher_model")
+    distillation_report_file_path: str = os.path.join("artifacts", "distillation.json")
+
+
+class ModelDistiller:
+    """
+    Distills a fitted model into a small student and decides which of the two to serve.
+
+    Methods:
+        augment(compiled, X_train): Generates augmented feature rows.
+        distill(teacher, preprocessor, X_train, X_test, y_test): Returns the model to serve and the report.
+        save(report, teacher): Writes the report, and the teacher when a student replaces it.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or DistillationConfig()
+
+    def _student(self, name):
+        if name == "shallow_tree":
+            return DecisionTreeRegressor(max_depth=self.config.shallow_tree_depth, random_state=self.config.random_state)
+        if name == "linear_interactions":
+            return Pipeline([
+                ("interactions", PolynomialFeatures(degree=2, include_bias=False)),
+                ("ridge", Ridge(alpha=1e-3)),
+            ])
+        raise ValueError(f"Unknown student '{name}'")
+
+    def augment(self, compiled, X_train):
+        """
+        Generates augmented inputs: half uniformly over the input space, half around the training rows.
+
+        Args:
+            compiled (CompiledPreprocessor): The compiled preprocessor, which knows the categories and scaling.
+            X_train (np.ndarray): Transformed training features.
+
+        Returns:
+            np.ndarray: Transformed feature rows, in the teacher's feature space.
+        """
+        rng = np.random.default_rng(self.config.random_state)
+        low, high = SCORE_RANGE
+        n_uniform = self.config.n_augmented // 2
+        n_near = self.config.n_augmented - n_uniform
+        sizes = [len(table) for table in compiled.category_index]
+
+        uniform_numeric = rng.integers(low, high + 1, size=(n_uniform, len(compiled.numerical_columns))).astype(float)
+        uniform_codes = np.column_stack([rng.integers(size, size=n_uniform) for size in sizes])
+
+        # Decode the training rows back to scores and category codes, then perturb them
+        rows = np.asarray(X_train)[rng.integers(len(X_train), size=n_near)]
+        index = compiled.numerical_index
+        near_numeric = np.rint(rows[:, index] * compiled.scale[index] + compiled.offset[index])
+        near_numeric = np.clip(near_numeric + rng.integers(-self.config.jitter, self.config.jitter + 1, size=near_numeric.shape), low, high)
+        near_codes = np.column_stack([
+            np.argmax(rows[:, min(table.values()):min(table.values()) + len(table)], axis=1)
+            for table in compiled.category_index
+        ])
+        swap = rng.random(near_codes.shape) < self.config.swap_probability
+        near_codes[swap] = np.column_stack([rng.integers(size, size=n_near) for size in sizes])[swap]
+
+        return compiled.transform_encoded(
+            np.vstack([uniform_numeric, near_numeric]),
+            np.vstack([uniform_codes, near_codes]),
+        )
+
+    def distill(self, teacher, preprocessor, X_train, X_test, y_test):
+        """
+        Fits the students to the teacher and returns the model to serve.
+
+        Args:
+            teacher: The selected, fitted model.
+            preprocessor: The fitted preprocessor the teacher's features come from.
+            X_train (np.ndarray): Transformed training features, around which inputs are generated.
+            X_test (np.ndarray): Transformed test features.
+            y_test (np.ndarray): Test target.
+
+        Returns:
+            tuple: (model to serve, report dict). The model is the accepted student, or the teacher.
+        """
+        try:
+            X_augmented = self.augment(compile_preprocessor(preprocessor), X_train)
+            X_augmented = X_augmented[np.random.default_rng(self.config.random_state).permutation(len(X_augmented))]
+            y_augmented = teacher.predict(X_augmented)
+            n_holdout = int(len(X_augmented) * self.config.holdout_fraction)
+            X_fit, y_fit = X_augmented[n_holdout:], y_augmented[n_holdout:]
+            X_holdout, y_holdout = X_augmented[:n_holdout], y_augmented[:n_holdout]
+
+            teacher_score = float(r2_score(y_test, teacher.predict(X_test)))
+            models, scores, agreement = {"teacher": teacher}, {"teacher": teacher_score}, {"teacher": 1.0}
+            for name in self.config.students:
+                student = self._student(name).fit(X_fit, y_fit)
+                models[name] = student
+                scores[name] = float(r2_score(y_test, student.predict(X_test)))
+                agreement[name] = float(r2_score(y_holdout, student.predict(X_holdout)))
+
+            table = ModelSelector().measure(models, X_test, scores)
+            for name, row in table.items():
+                row["agreement"] = agreement[name]
+                row["test_agreement"] = float(r2_score(teacher.predict(X_test), models[name].predict(X_test)))
+
+            teacher_p99 = table["teacher"]["single_p99_ms"]
+            accepted = [
+                name for name in self.config.students
+                if agreement[name] >= self.config.min_agreement
+                and teacher_score - scores[name] <= self.config.max_score_drop
+                and table[name]["single_p99_ms"] < teacher_p99
+            ]
+            shipped = min(accepted, key=lambda name: table[name]["single_p99_ms"]) if accepted else None
+
+            report = {
+                "teacher": type(teacher).__name__,
+                "shipped": shipped,
+                "n_augmented": len(X_augmented),
+                "min_agreement": self.config.min_agreement,
+                "max_score_drop": self.config.max_score_drop,
+                "latency_gain": None if shipped is None else teacher_p99 / table[shipped]["single_p99_ms"],
+                "candidates": table,
+            }
+            if shipped is None:
+                logging.info(f"No student met the distillation thresholds, serving the teacher {type(teacher).__name__}")
+                return teacher, report
+
+            models[shipped].distilled_from_ = type(teacher).__name__
+            logging.info(
+                f"Serving distilled {shipped} student: agreement {agreement[shipped]:.4f}, test R2 {scores[shipped]:.4f} "
+                f"vs {teacher_score:.4f}, single-row p99 {report['latency_gain']:.1f}x faster"
+            )
+            return models[shipped], report
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def save(self, report, teacher):
+        """
+        Writes the distillation report as JSON and, when a student is shipped, keeps the teacher next to it.
+
+        Args:
+            report (dict): The report returned by distill.
+            teacher: The teacher model.
+        """
+        try:
+            teacher_path = self.config.teacher_model_file_path
+            if report["shipped"] is not None:
+                save_object(file_path=teacher_path, obj=teacher)
+            elif os.path.isdir(teacher_path):
+                shutil.rmtree(teacher_path)  # never leave the teacher of an earlier run behind
+
+            file_path = self.config.distillation_report_file_path
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            with open(file_path, "w") as file_obj:
+                json.dump(report, file_obj, indent=2)
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,604 @@
+"""
+This module contains the ModelSearch class, which runs the hyperparameter search of every candidate model in parallel,
+either exhaustively or with budgeted successive halving.
+
+`evaluate_models` used to run one single-threaded `GridSearchCV(cv=3)` per model, one model after another, so a
+training run kept a single core busy. ModelSearch breaks the whole search into independent (model, parameter
+combination, fold) tasks and spreads them over a process or thread pool:
+
+- The training arrays are shared with the workers instead of copied per task: the thread backend uses them in place,
+  and the process backend memory-maps them once for all workers.
+- Each worker is limited to its share of the cores, including the threads XGBoost/CatBoost/Random Forest and the
+  BLAS libraries would otherwise start, so the pool does not oversubscribe the machine.
+- The scores are aggregated exactly like GridSearchCV (KFold(3), R2, first best candidate wins on ties), so the
+  selected parameters are the same as with the serial search.
+- Candidates that only differ in n_estimators/iterations share one fit at the largest size: boosted models are
+  scored at every smaller size by truncating their predictions, and Random Forest is grown with warm_start.
+- With a SearchCache, every (candidate, fold) result is stored on disk and only the cells missing from the store
+  are fitted, so repeat runs and extended grids do not redo earlier work.
+- When the search of a model is armed in the profiler (target "search:<model name>", see src.profiler), its tasks
+  run under the profiler in the workers and one profile merged from all of them is written.
+
+The exhaustive grid can be replaced by successive halving (see ModelSearch), which spends most of the fits on the
+promising candidates and can be given an overall wall-clock budget.
+
+Classes:
+    ModelSearchConfig: Configuration for the search strategy, time budget, pool size and backend.
+    ModelSearch: Runs the search and returns the best parameters of every model.
+
+Usage:
+    search = ModelSearch(ModelSearchConfig(strategy="halving", time_budget=60), cache=SearchCache())
+    best_params = search.run(models, params, X_train, y_train)
+    search.save_trace(os.path.join("artifacts", "search_trace.json"))
+"""
+
+import os
+import sys
+import json
+import time
+import warnings
+from contextlib import nullcontext
+from dataclasses import dataclass
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold, ParameterGrid
+from threadpoolctl import threadpool_limits
+
+from src.exception import CustomException
+from src.logger import logging
+from src.profiler import get_profiler, profile_call
+
+
+# Parameters that set the number of trees/boosting rounds; halving can grow these instead of the training rows
+ENSEMBLE_SIZE_PARAMS = ("n_estimators", "iterations")
+
+
+@dataclass
+class ModelSearchConfig:
+    """Configuration class for the parallel model search."""
+    strategy: str = "grid"  # "grid" to evaluate every candidate, "halving" for successive halving
+    time_budget: float = None  # seconds the whole search may take; None for no limit
+    halving_factor: int = 3  # halving keeps the best 1/factor of the candidates and gives them factor times the rows
+    halving_resource: str = "auto"  # "auto" grows the ensemble size where the grid has one, "n_samples" always grows rows
+    min_resources: int = 60  # fewest training rows a candidate is fitted on in the first halving round
+    random_state: int = 42  # seed for the row samples of the halving rounds
+    n_jobs: int = -1  # number of workers; -1 uses every core
+    backend: str = "loky"  # "loky" for processes, "threading" for threads
+    cv: int = 3  # number of cross-validation folds, as in GridSearchCV(cv=3)
+    max_nbytes: str = "1M"  # arrays larger than this are memory-mapped for process workers instead of copied
+    reuse_ensembles: bool = True  # fit once at the largest ensemble size and score every smaller one from it
+
+
+def limit_estimator_threads(estimator, n_threads):
+    """
+    Caps the threads an estimator starts by itself, so that several of them can run side by side.
+
+    Args:
+        estimator: An unfitted estimator.
+        n_threads (int): Threads it may use.
+
+    Returns:
+        The same estimator, with its thread parameters set.
+    """
+    if type(estimator).__module__.startswith("catboost"):
+        # CatBoost also writes training logs to catboost_info/, which concurrent fits would fight over
+        estimator.set_params(thread_count=n_threads, allow_writing_files=False)
+    elif "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=n_threads)
+    return estimator
+
+
+def staging_param(estimator, params):
+    """
+    Returns the ensemble-size parameter whose smaller values can be scored from one fit at the largest value,
+    or None if the estimator does not support that.
+
+    Boosted models can predict with only their first k rounds. A Random Forest is grown with warm_start,
+    which sklearn guarantees builds the same trees as a fresh fit with the same random_state. CatBoost picks
+    its learning rate from the number of iterations unless one is given, so it is only staged with an
+    explicit learning_rate.
+    """
+    name = type(estimator).__name__
+    if name in ("GradientBoostingRegressor", "AdaBoostRegressor", "RandomForestRegressor", "XGBRegressor"):
+        return "n_estimators"
+    if name == "CatBoostRegressor" and ("learning_rate" in params or "learning_rate" in estimator.get_params()):
+        return "iterations"
+    return None
+
+
+def _staged_predictions(model, X, sizes):
+    """
+    Yields the predictions of a fitted boosted model truncated to each ensemble size, smallest first.
+    """
+    name = type(model).__name__
+    if name == "XGBRegressor":
+        for size in sizes:
+            yield model.predict(X, iteration_range=(0, size))
+    elif name == "CatBoostRegressor":
+        for size in sizes:
+            yield model.predict(X, ntree_end=size)
+    elif name == "AdaBoostRegressor":
+        # staged_predict recomputes the weighted median over all estimators at every stage, which is quadratic;
+        # predict with each estimator once and take the median of the first k, the way AdaBoost itself does
+        predictions = np.array([estimator.predict(X) for estimator in model.estimators_]).T
+        rows = np.arange(len(X))
+        for size in sizes:
+            limit = min(size, len(model.estimators_))  # AdaBoost may stop before n_estimators
+            sorted_index = np.argsort(predictions[:, :limit], axis=1)
+            weight_cdf = np.cumsum(model.estimator_weights_[sorted_index], axis=1, dtype=np.float64)
+            median_index = (weight_cdf >= 0.5 * weight_cdf[:, -1][:, np.newaxis]).argmax(axis=1)
+            yield predictions[rows, sorted_index[rows, median_index]]
+    else:
+        # staged_predict yields one prediction per boosting stage
+        wanted = iter(sizes)
+        size = next(wanted, None)
+        last = None
+        for stage, last in enumerate(model.staged_predict(X), start=1):
+            while size is not None and stage == size:
+                yield last
+                size = next(wanted, None)
+        while size is not None:
+            yield last
+            size = next(wanted, None)
+
+
+def _fit_and_score(estimator, params, X, y, train_index, test_index, n_threads, stage_param=None, stage_values=()):
+    """
+    Fits one parameter combination on one fold and scores it on the held-out part.
+
+    With a `stage_param`, the model is fitted once at the largest of `stage_values` and scored at every one
+    of them, which gives the same scores as one fit per value.
+
+    Returns:
+        list: One (R2 score on the held-out part, fit time in seconds) per stage value, or a single one without
+            staging. Scores are NaN if the fit failed, as with GridSearchCV's default error_score. Staged
+            candidates share the time of their common fit, except Random Forest whose trees are timed as they grow.
+    """
+    sizes = sorted(stage_values) if stage_param else [None]
+    if stage_param:
+        params = dict(params, **{stage_param: sizes[-1]})
+    model = limit_estimator_threads(clone(estimator).set_params(**params), n_threads)
+    X_fit, y_fit, X_held, y_held = X[train_index], y[train_index], X[test_index], y[test_index]
+
+    # Inspecting the loaded BLAS/OpenMP pools is not free, so only do it when there is something to limit
+    limits = threadpool_limits(limits=n_threads) if n_threads < (os.cpu_count() or 1) else nullcontext()
+    with limits:
+        start = time.perf_counter()
+        try:
+            if stage_param is None:
+                model.fit(X_fit, y_fit)
+                return [(model.score(X_held, y_held), time.perf_counter() - start)]
+
+            if type(model).__name__ == "RandomForestRegressor":
+                results = []
+                model.set_params(warm_start=True)
+                for size in sizes:
+                    model.set_params(n_estimators=size)
+                    model.fit(X_fit, y_fit)  # only adds the trees beyond the previous size
+                    results.append((r2_score(y_held, model.predict(X_held)), time.perf_counter() - start))
+                return results
+
+            model.fit(X_fit, y_fit)
+            fit_time = time.perf_counter() - start
+            return [(r2_score(y_held, preds), fit_time) for preds in _staged_predictions(model, X_held, sizes)]
+
+        except Exception as e:
+            warnings.warn(f"Fit failed for {type(estimator).__name__} with {params}: {e}")
+            return [(np.nan, time.perf_counter() - start)] * len(sizes)
+
+
+class ModelSearch:
+    """
+    Cross-validated hyperparameter search over several models at once, on a pool of workers.
+
+    Two strategies are available:
+    - "grid" evaluates every parameter combination on every fold, like GridSearchCV.
+    - "halving" runs successive halving: every combination is first evaluated with a small budget, then only
+      the best 1/`halving_factor` of them move on to a budget `halving_factor` times larger, until the last
+      round evaluates the few survivors in full. The budget grown is the ensemble size for models whose grid
+      lists several n_estimators/iterations values, and the number of training rows for the others.
+
+    With a `time_budget`, no new fits start once the budget has run out, and every model gets the best
+    parameters among the candidates fully evaluated so far (for halving, the best of its last complete round).
+    Fits already running are allowed to finish, so the budget can be overrun by the length of one fit.
+
+    Methods:
+        run(models, param, X_train, y_train): Returns the best parameters of every model.
+        save_trace(file_path, **extra): Writes the search trace and the winning parameters as JSON.
+    """
+
+    def __init__(self, config=None, cache=None):
+        """
+        Args:
+            config (ModelSearchConfig, optional): Search settings.
+            cache (SearchCache, optional): Store of earlier results; cells found there are not fitted again.
+        """
+        self.config = config or ModelSearchConfig()
+        self.cache = cache
+        self.cv_results = {}  # model name -> list of {"params", "mean_test_score", "fold_scores", "fit_times"}
+        self.best_params = {}
+        self.refit_times = {}  # model name -> seconds the final fit on the whole training split took
+        self.trace = []  # one entry per evaluated (model, round, parameter combination)
+        self.budget_exhausted = False
+        self.elapsed = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._profiles = {}  # model name -> (mode, data from every task) for the models whose search is profiled
+
+    def _n_workers(self):
+        n_cpus = os.cpu_count() or 1
+        n_jobs = self.config.n_jobs or 1
+        if n_jobs < 0:
+            n_jobs = max(1, n_cpus + 1 + n_jobs)  # -1 means every core, -2 all but one, as in joblib
+        return min(n_jobs, n_cpus)
+
+    def _run_tasks(self, tasks, X, y, deadline, task_models=None):
+        """
+        Runs fit-and-score tasks on the pool, stopping early when the deadline passes.
+
+        Args:
+            tasks (list): (estimator, params, train_index, test_index, stage_param, stage_values) tuples.
+            X (np.ndarray): Training features.
+            y (np.ndarray): Training target.
+            deadline (float): time.monotonic() value after which no more tasks are started, or None.
+            task_models (list, optional): The model name of each task. Tasks of models whose search is being
+                profiled run under the profiler, and their profile data is gathered in `_profiles`.
+
+        Returns:
+            list: The list of (score, fit time) of each task, or None for the tasks that were not run.
+        """
+        n_workers = self._n_workers()
+        n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+        results = [None] * len(tasks)
+        profiled = [self._profiles.get(model_name) for model_name in task_models or [None] * len(tasks)]
+        interval = get_profiler().config.sample_interval
+
+        outputs = Parallel(
+            n_jobs=n_workers, backend=self.config.backend, max_nbytes=self.config.max_nbytes,
+            return_as="generator",
+        )(
+            delayed(_fit_and_score)(
+                estimator, params, X, y, train_index, test_index, n_threads, stage_param, stage_values
+            ) if profile is None else delayed(profile_call)(
+                profile[0], interval, _fit_and_score,
+                estimator, params, X, y, train_index, test_index, n_threads, stage_param, stage_values,
+            )
+            for (estimator, params, train_index, test_index, stage_param, stage_values), profile in zip(tasks, profiled)
+        )
+        for position, output in enumerate(outputs):
+            if profiled[position] is not None:
+                output, data = output
+                profiled[position][1].append(data)
+            results[position] = output
+            if deadline is not None and time.monotonic() > deadline:
+                self.budget_exhausted = True
+                outputs.close()  # cancels the tasks that have not started yet
+                break
+
+        return results
+
+    def _record(self, model_name, rung, n_samples, params, fold_results, n_cached=0):
+        """
+        Adds one fully evaluated candidate to the trace and returns its summary.
+        """
+        entry = {
+            "model": model_name,
+            "rung": rung,
+            "n_samples": n_samples,
+            "params": params,
+            "mean_test_score": float(np.mean([score for score, _ in fold_results])),
+            "fold_scores": [float(score) for score, _ in fold_results],
+            "fit_times": [fit_time for _, fit_time in fold_results],
+            "cached_folds": n_cached,
+            "elapsed": time.monotonic() - self._started,
+        }
+        self.trace.append(entry)
+        return entry
+
+    def _evaluate(self, rung_plan, X, y, folds, deadline):
+        """
+        Evaluates one round of candidates for every model in a single pool run.
+
+        Args:
+            rung_plan (dict): Model name -> (estimator, rung, n_samples, list of (candidate, params)).
+
+        Returns:
+            dict: Model name -> list of (candidate, summary) for the candidates evaluated on every fold.
+        """
+        fold_results, n_cached = {}, {}
+        tasks, owners = [], []
+        for model_name, (estimator, rung, n_samples, candidates) in rung_plan.items():
+            for fold, (train_index, test_index) in enumerate(folds):
+                train_index = train_index[:n_samples]
+                keys = {}
+                if self.cache is not None:
+                    keys = {
+                        candidate: self.cache.cell_key(self._data_hash, estimator, params, train_index, test_index)
+                        for candidate, params in candidates
+                    }
+                    cached = self.cache.get_many(keys.values())
+                else:
+                    cached = {}
+
+                missing = []
+                for candidate, params in candidates:
+                    result = cached.get(keys.get(candidate))
+                    if result is None:
+                        missing.append((candidate, params))
+                        continue
+                    fold_results.setdefault((model_name, candidate), [None] * len(folds))[fold] = result
+                    n_cached[(model_name, candidate)] = n_cached.get((model_name, candidate), 0) + 1
+                self.cache_hits += len(candidates) - len(missing)
+                self.cache_misses += len(missing)
+
+                for group, stage_param, stage_values in self._group_candidates(estimator, missing):
+                    tasks.append((estimator, group[0][1], train_index, test_index, stage_param, stage_values))
+                    # A staged task returns one result per stage value, in increasing order
+                    if stage_param:
+                        group = sorted(group, key=lambda item: item[1][stage_param])
+                    owners.append([
+                        (model_name, candidate, fold, estimator, params, len(train_index), keys.get(candidate))
+                        for candidate, params in group
+                    ])
+
+        results = self._run_tasks(tasks, X, y, deadline, task_models=[task_owners[0][0] for task_owners in owners])
+
+        new_cells = []
+        for task_owners, task_results in zip(owners, results):
+            if task_results is None:
+                continue
+            for (model_name, candidate, fold, estimator, params, n_train, key), result in zip(task_owners, task_results):
+                fold_results.setdefault((model_name, candidate), [None] * len(folds))[fold] = result
+                if key is not None:
+                    new_cells.append((key, self._data_hash, estimator, params, n_train) + tuple(result))
+        if new_cells:
+            self.cache.put_many(new_cells)
+
+        evaluated = {}
+        for model_name, (_, rung, n_samples, candidates) in rung_plan.items():
+            evaluated[model_name] = []
+            for candidate, params in candidates:
+                per_fold = fold_results.get((model_name, candidate), [None] * len(folds))
+                if all(result is not None for result in per_fold):
+                    summary = self._record(
+                        model_name, rung, n_samples, params, per_fold, n_cached.get((model_name, candidate), 0)
+                    )
+                    evaluated[model_name].append((candidate, summary))
+        return evaluated
+
+    def _group_candidates(self, estimator, candidates):
+        """
+        Groups the candidates that only differ in ensemble size, so each group is fitted once per fold.
+
+        Args:
+            estimator: The unfitted estimator.
+            candidates (list): (candidate, params) pairs.
+
+        Returns:
+            list: (group of (candidate, params) pairs, stage parameter or None, stage values) per fit.
+        """
+        groups = {}
+        for candidate, params in candidates:
+            stage_param = staging_param(estimator, params) if self.config.reuse_ensembles else None
+            if stage_param not in params:
+                stage_param = None
+            key = (stage_param, tuple(sorted(
+                (name, repr(value)) for name, value in params.items() if name != stage_param
+            )))
+            groups.setdefault(key, []).append((candidate, params))
+
+        fits = []
+        for (stage_param, _), group in groups.items():
+            values = sorted(params[stage_param] for _, params in group) if stage_param else []
+            if stage_param is None or len(set(values)) < len(values):
+                # Nothing to share, or duplicate sizes: fit every candidate on its own
+                fits.extend(([member], None, ()) for member in group)
+            elif len(group) == 1:
+                fits.append((group, None, ()))
+            else:
+                fits.append((group, stage_param, values))
+        return fits
+
+    def _grid(self, models, candidates, X, y, folds, deadline):
+        """
+        Evaluates every candidate of every model on the full folds.
+        """
+        n_samples = len(folds[0][0])
+        rung_plan = {
+            model_name: (models[model_name], 0, n_samples, list(enumerate(candidates[model_name])))
+            for model_name in models
+        }
+        evaluated = self._evaluate(rung_plan, X, y, folds, deadline)
+        return {model_name: [summary for _, summary in evaluated[model_name]] for model_name in models}
+
+    def _halving_resource(self, param_grid):
+        """
+        Chooses what a model's halving rounds grow: its ensemble size when the grid lists several values
+        of it, otherwise the number of training rows.
+
+        Returns:
+            tuple: (resource parameter name or None for rows, sorted resource values, base candidates without it).
+        """
+        if self.config.halving_resource == "auto":
+            for name in ENSEMBLE_SIZE_PARAMS:
+                if len(param_grid.get(name, [])) > 1:
+                    base_grid = {key: values for key, values in param_grid.items() if key != name}
+                    return name, sorted(param_grid[name]), list(ParameterGrid(base_grid))
+        return None, [], list(ParameterGrid(param_grid))
+
+    def _halving(self, models, param, X, y, folds, deadline):
+        """
+        Runs successive halving for all models side by side.
+
+        Models whose grid lists several ensemble sizes (n_estimators / iterations) are halved over that size:
+        the other parameters are compared with small ensembles first, and the few survivors are evaluated
+        with every ensemble size of the grid in the last round. The other models are halved over the number
+        of training rows, ending on the full folds.
+        """
+        factor = self.config.halving_factor
+        n_samples_full = min(len(train_index) for train_index, _ in folds)
+
+        plans, n_rungs, alive = {}, {}, {}
+        for model_name in models:
+            plans[model_name] = self._halving_resource(param[model_name])
+            n_base = len(plans[model_name][2])
+            # Enough rounds to narrow the candidates down to at most `factor` in the last one
+            n_rungs[model_name] = max(1, int(np.ceil(np.log(n_base) / np.log(factor)))) if n_base > 1 else 1
+            alive[model_name] = plans[model_name][2]
+        last_complete = {model_name: [] for model_name in models}
+
+        for rung in range(max(n_rungs.values())):
+            rung_plan = {}
+            for model_name in models:
+                resource, values, _ = plans[model_name]
+                if rung >= n_rungs[model_name]:
+                    continue
+                last_rung = rung == n_rungs[model_name] - 1
+                shrink = factor ** (n_rungs[model_name] - 1 - rung)
+
+                if resource is None:
+                    if len(alive[model_name]) == 1 and not last_complete[model_name]:
+                        continue  # a single candidate with nothing to choose: no need to cross-validate
+                    n_samples = min(n_samples_full, max(self.config.min_resources, n_samples_full // shrink))
+                    round_candidates = alive[model_name]
+                elif last_rung:
+                    n_samples = n_samples_full
+                    round_candidates = [dict(base, **{resource: value}) for base in alive[model_name] for value in values]
+                else:
+                    n_samples = n_samples_full
+                    fitting = [value for value in values if value <= values[-1] / shrink] or values[:1]
+                    round_candidates = [dict(base, **{resource: fitting[-1]}) for base in alive[model_name]]
+
+                rung_plan[model_name] = (models[model_name], rung, n_samples, list(enumerate(round_candidates)))
+
+            if not rung_plan:
+                break
+
+            evaluated = self._evaluate(rung_plan, X, y, folds, deadline)
+            for model_name, (_, _, _, round_candidates) in rung_plan.items():
+                if len(evaluated[model_name]) < len(round_candidates):
+                    continue  # the budget ran out during this round; keep the previous round's ranking
+                summaries = [summary for _, summary in evaluated[model_name]]
+                last_complete[model_name] = summaries
+
+                order = np.argsort(-np.nan_to_num(
+                    np.array([summary["mean_test_score"] for summary in summaries]), nan=-np.inf
+                ), kind="stable")
+                n_keep = int(np.ceil(len(order) / factor))
+                resource = plans[model_name][0]
+                alive[model_name] = [
+                    {key: value for key, value in summaries[position]["params"].items() if key != resource}
+                    for position in order[:n_keep]
+                ]
+
+            if self.budget_exhausted:
+                break
+
+        return last_complete
+
+    def run(self, models, param, X_train, y_train):
+        """
+        Runs the cross-validated search of every model.
+
+        Args:
+            models (dict): Model name -> unfitted estimator.
+            param (dict): Model name -> parameter grid, as given to GridSearchCV.
+            X_train (np.ndarray): Training features.
+            y_train (np.ndarray): Training target.
+
+        Returns:
+            dict: Model name -> best parameter combination.
+
+        Raises:
+            CustomException: If the search fails.
+        """
+        try:
+            self._started = time.monotonic()
+            profiler = get_profiler()
+            self._profiles = {}
+            for model_name in models:
+                mode = profiler.take(f"search:{model_name}")
+                if mode is not None:
+                    self._profiles[model_name] = (mode, [])
+            self._data_hash = self.cache.fingerprint(X_train, y_train) if self.cache is not None else None
+            deadline = None if self.config.time_budget is None else self._started + self.config.time_budget
+
+            # Shuffle each fold's training rows once, so every halving round trains on a random sample of them
+            rng = np.random.RandomState(self.config.random_state)
+            folds = [
+                (rng.permutation(train_index) if self.config.strategy == "halving" else train_index, test_index)
+                for train_index, test_index in KFold(n_splits=self.config.cv).split(X_train)
+            ]
+            candidates = {model_name: list(ParameterGrid(param[model_name])) for model_name in models}
+            logging.info(
+                f"Running {self.config.strategy} search of {sum(map(len, candidates.values()))} candidates "
+                f"on {self._n_workers()} workers"
+            )
+
+            if self.config.strategy == "grid":
+                self.cv_results = self._grid(models, candidates, X_train, y_train, folds, deadline)
+            elif self.config.strategy == "halving":
+                self.cv_results = self._halving(models, param, X_train, y_train, folds, deadline)
+            else:
+                raise ValueError(f"Unknown search strategy '{self.config.strategy}'")
+
+            for model_name in models:
+                if self.cv_results[model_name]:
+                    self.best_params[model_name] = self._best(self.cv_results[model_name])["params"]
+                else:
+                    # Never evaluated: either a single candidate, or the budget ran out before its first round
+                    self.best_params[model_name] = candidates[model_name][0]
+                    if len(candidates[model_name]) > 1:
+                        logging.info(f"No complete evaluation of {model_name} within the budget, using its first candidate")
+
+            self.elapsed = time.monotonic() - self._started
+            for model_name, (mode, pieces) in self._profiles.items():
+                profiler.save(f"search:{model_name}", mode, pieces)
+            logging.info(f"Search finished in {self.elapsed:.1f}s, budget exhausted: {self.budget_exhausted}")
+            if self.cache is not None:
+                logging.info(f"Search cache: {self.cache_hits} cells reused, {self.cache_misses} fitted")
+            return self.best_params
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _best(cv_results):
+        """
+        Picks the candidate with the highest mean score; the first one wins a tie and NaN scores rank last,
+        as in GridSearchCV.
+        """
+        mean_scores = np.array([result["mean_test_score"] for result in cv_results])
+        mean_scores = np.where(np.isnan(mean_scores), -np.inf, mean_scores)
+        return cv_results[int(np.argmax(mean_scores))]
+
+    def save_trace(self, file_path, **extra):
+        """
+        Writes the search settings, the best parameters of every model and every evaluation as JSON.
+
+        Args:
+            file_path (str): Where to write the trace.
+            **extra: Additional top-level fields, such as the selected model.
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            trace = {
+                "strategy": self.config.strategy,
+                "time_budget": self.config.time_budget,
+                "halving_factor": self.config.halving_factor,
+                "elapsed": self.elapsed,
+                "budget_exhausted": self.budget_exhausted,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                **extra,
+                "best_params": self.best_params,
+                "refit_times": self.refit_times,
+                "evaluations": self.trace,
+            }
+            with open(file_path, "w") as file_obj:
+                json.dump(trace, file_obj, indent=2, default=str)
+        except Exception as e:
+            raise CustomException(e, sys)
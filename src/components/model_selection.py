@@ -0,0 +1,258 @@
+"""
+This module contains the ModelSelector class, which picks the model to ship from the evaluated candidates by weighing
+their test R2 against what they cost to serve.
+
+Picking purely by test R2 ships a model that is 50 times slower for a 0.001 gain. The selector measures every fitted
+candidate the way it would be served:
+- single-row latency (p50 and p99 of one-row predict calls) and batch latency (p50 and p99 of `batch_size`-row
+  calls). Tree models are timed both through model.predict and through the flattened tree engine the trainer
+  exports for them, and the faster of the two is recorded, as serving picks it;
+- the size of the saved artifact;
+- the time the final fit took.
+
+and then chooses by a policy:
+- "best_score": the highest test R2, as before.
+- "latency_budget": the highest test R2 among the candidates whose single-row p99 (and, if set, batch p99) is within
+  budget. If none is, the fastest candidate.
+- "pareto": among the candidates no other candidate beats on both R2 and single-row p99 (the Pareto front), the
+  fastest one whose R2 is within `score_tolerance` of the best.
+
+The measured table and the decision are written to artifacts/model_selection.json, next to the model.
+
+Classes:
+    ModelSelectionConfig: Configuration for the policy, the budgets and the measurements.
+    ModelSelector: Measures the candidates, applies the policy and saves the table.
+
+Usage:
+    selector = ModelSelector()
+    table = selector.measure(models, X_test, test_scores, fit_times)
+    best_model_name, reason = selector.select(table)
+    selector.save_report(table, best_model_name, reason)
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import save_object
+from src.components.tree_engine import compile_tree_model
+
+
+@dataclass
+class ModelSelectionConfig:
+    """Configuration class for latency-aware model selection."""
+    policy: str = os.environ.get("MODEL_SELECTION_POLICY", "pareto")  # "best_score", "latency_budget" or "pareto"
+    score_tolerance: float = 0.001  # "pareto": R2 a faster model may give up against the best one
+    max_latency_ms: float = None  # "latency_budget": largest single-row p99, in milliseconds
+    max_batch_latency_ms: float = None  # "latency_budget": largest batch p99, in milliseconds; None for no limit
+    batch_size: int = 256  # rows per call for the batch latency
+    n_single_calls: int = 200  # single-row calls timed per candidate
+    n_batch_calls: int = 30  # batch calls timed per candidate
+    max_measure_seconds: float = 1.0  # time spent timing each candidate and mode at most; fewer calls are made beyond it
+    selection_report_file_path: str = os.path.join("artifacts", "model_selection.json")
+
+
+class ModelSelector:
+    """
+    Measures the serving cost of fitted candidates and picks one by a configurable policy.
+
+    Methods:
+        measure(models, X_test, test_scores, fit_times): Returns the measured table, one row per candidate.
+        select(table): Returns the name of the selected candidate and the reason.
+        save_report(table, selected, reason): Writes the table and the decision as JSON.
+    """
+
+    policies = ("best_score", "latency_budget", "pareto")
+
+    def __init__(self, config=None):
+        self.config = config or ModelSelectionConfig()
+        if self.config.policy not in self.policies:
+            raise CustomException(f"Unknown model selection policy '{self.config.policy}', expected one of {self.policies}", sys)
+
+    def _latencies(self, predict, X, batch_size, n_calls):
+        """
+        Times `n_calls` predict calls on consecutive `batch_size`-row slices of X, within `max_measure_seconds`.
+
+        Returns:
+            np.ndarray: The duration of every call, in milliseconds.
+        """
+        predict(X[:batch_size])  # warm up
+        timings, deadline = [], time.perf_counter() + self.config.max_measure_seconds
+        for call in range(n_calls):
+            start = (call * batch_size) % max(1, len(X) - batch_size + 1)
+            batch = X[start:start + batch_size]
+            started = time.perf_counter()
+            predict(batch)
+            timings.append(time.perf_counter() - started)
+            if started > deadline:
+                break
+        return np.array(timings) * 1e3
+
+    def _latency_stats(self, model, X, batch_size, n_calls):
+        """
+        Returns the p50 and p99 latency of the model and whether the tree engine served them.
+        """
+        timings = self._latencies(model.predict, X, batch_size, n_calls)
+        via_engine = False
+        engine = compile_tree_model(model)
+        if engine is not None:
+            engine_timings = self._latencies(engine.predict, X, batch_size, n_calls)
+            if np.median(engine_timings) < np.median(timings):
+                timings, via_engine = engine_timings, True
+        return float(np.percentile(timings, 50)), float(np.percentile(timings, 99)), via_engine
+
+    @staticmethod
+    def _artifact_size(model):
+        """
+        Returns the size in bytes of the model saved as it would be shipped.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model")
+            save_object(file_path=path, obj=model)
+            return sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, names in os.walk(path) for name in names
+            )
+
+    def measure(self, models, X_test, test_scores, fit_times=None):
+        """
+        Measures every fitted candidate.
+
+        Args:
+            models (dict): Candidate name -> fitted model.
+            X_test (np.ndarray): Transformed test features, used as serving inputs.
+            test_scores (dict): Candidate name -> test R2.
+            fit_times (dict, optional): Candidate name -> seconds the final fit took.
+
+        Returns:
+            dict: Candidate name -> {"test_score", "single_p50_ms", "single_p99_ms", "batch_p50_ms", "batch_p99_ms",
+                "tree_engine", "artifact_size_bytes", "fit_time"}.
+        """
+        try:
+            X_test = np.ascontiguousarray(X_test)
+            batch_size = min(self.config.batch_size, len(X_test))
+            table = {}
+            for name, model in models.items():
+                single_p50, single_p99, single_engine = self._latency_stats(model, X_test, 1, self.config.n_single_calls)
+                batch_p50, batch_p99, batch_engine = self._latency_stats(model, X_test, batch_size, self.config.n_batch_calls)
+                table[name] = {
+                    "test_score": float(test_scores[name]),
+                    "single_p50_ms": single_p50,
+                    "single_p99_ms": single_p99,
+                    "batch_size": batch_size,
+                    "batch_p50_ms": batch_p50,
+                    "batch_p99_ms": batch_p99,
+                    "tree_engine": {"single": single_engine, "batch": batch_engine},
+                    "artifact_size_bytes": self._artifact_size(model),
+                    "fit_time": None if fit_times is None else fit_times.get(name),
+                }
+                logging.info(
+                    f"{name}: R2 {table[name]['test_score']:.4f}, single-row p99 {single_p99:.3f}ms, "
+                    f"batch p99 {batch_p99:.3f}ms, {table[name]['artifact_size_bytes']} bytes"
+                )
+            return table
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def pareto_front(table):
+        """
+        Returns the candidates no other candidate beats on both test R2 and single-row p99 latency.
+
+        Args:
+            table (dict): The measured table.
+
+        Returns:
+            list: Candidate names, fastest first.
+        """
+        scored = {name: row for name, row in table.items() if not np.isnan(row["test_score"])}
+        front = [
+            name for name, row in scored.items()
+            if not any(
+                other["test_score"] >= row["test_score"] and other["single_p99_ms"] <= row["single_p99_ms"]
+                and (other["test_score"] > row["test_score"] or other["single_p99_ms"] < row["single_p99_ms"])
+                for other_name, other in scored.items() if other_name != name
+            )
+        ]
+        return sorted(front, key=lambda name: scored[name]["single_p99_ms"])
+
+    def select(self, table):
+        """
+        Picks a candidate by the configured policy.
+
+        Args:
+            table (dict): The measured table, as returned by measure.
+
+        Returns:
+            tuple: (selected candidate name, reason).
+        """
+        scores = {name: row["test_score"] for name, row in table.items() if not np.isnan(row["test_score"])}
+        if not scores:
+            raise CustomException("No candidate has a test score", sys)
+        best_score_name = max(scores, key=scores.get)  # the first one wins a tie, as the original selection
+        policy = self.config.policy
+
+        if policy == "best_score":
+            return best_score_name, "highest test R2"
+
+        if policy == "latency_budget":
+            if self.config.max_latency_ms is None:
+                raise CustomException("The latency_budget policy needs max_latency_ms", sys)
+            within = [
+                name for name in scores
+                if table[name]["single_p99_ms"] <= self.config.max_latency_ms
+                and (self.config.max_batch_latency_ms is None or table[name]["batch_p99_ms"] <= self.config.max_batch_latency_ms)
+            ]
+            if not within:
+                fastest = min(scores, key=lambda name: table[name]["single_p99_ms"])
+                logging.warning(f"No model is within the latency budget, selecting the fastest one, {fastest}")
+                return fastest, "no candidate within the latency budget; fastest single-row p99"
+            selected = max(within, key=scores.get)
+            return selected, f"highest test R2 among {len(within)} candidates within the latency budget"
+
+        best_score = scores[best_score_name]
+        for name in self.pareto_front(table):
+            if scores[name] >= best_score - self.config.score_tolerance:
+                if name == best_score_name:
+                    return name, "highest test R2, and no faster candidate within the score tolerance"
+                return name, (
+                    f"fastest Pareto-optimal candidate within {self.config.score_tolerance} R2 of {best_score_name} "
+                    f"({scores[name]:.4f} vs {best_score:.4f}, single-row p99 {table[name]['single_p99_ms']:.3f}ms "
+                    f"vs {table[best_score_name]['single_p99_ms']:.3f}ms)"
+                )
+        return best_score_name, "highest test R2"
+
+    def save_report(self, table, selected, reason):
+        """
+        Writes the measured table, the policy and the decision as JSON.
+
+        Args:
+            table (dict): The measured table.
+            selected (str): The selected candidate.
+            reason (str): Why it was selected.
+        """
+        try:
+            file_path = self.config.selection_report_file_path
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            report = {
+                "policy": self.config.policy,
+                "score_tolerance": self.config.score_tolerance,
+                "max_latency_ms": self.config.max_latency_ms,
+                "max_batch_latency_ms": self.config.max_batch_latency_ms,
+                "selected_model": selected,
+                "reason": reason,
+                "pareto_front": self.pareto_front(table),
+                "candidates": table,
+            }
+            with open(file_path, "w") as file_obj:
+                json.dump(report, file_obj, indent=2)
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -15,28 +15,36 @@ import os
 import sys
 from dataclasses import dataclass
 
-from catboost import CatBoostRegressor
-from sklearn.ensemble import (
-    AdaBoostRegressor,
-    GradientBoostingRegressor,
-    RandomForestRegressor,
-)
-from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score
-from sklearn.neighbors import KNeighborsRegressor
-from sklearn.tree import DecisionTreeRegressor
-from xgboost import XGBRegressor
 
 from src.exception import CustomException
 from src.logger import logging
 
-from src.utils import save_object
+from src.utils import save_object, load_object
 from src.utils import evaluate_models
+from src.components.model_search import ModelSearch, ModelSearchConfig
+from src.components.search_cache import SearchCache
+from src.components.data_transformation import DataTransformationConfig
+from src.components.prediction_table import PredictionTableExporter
+from src.components.tree_engine import TreeEngineExporter
+from src.components.model_selection import ModelSelector
+from src.components.model_distillation import ModelDistiller
 
 @dataclass
 class ModelTrainerConfig:  # this will give whatever input we require w.r.t model training
     """Configuration class for model training."""
-    trained_model_file_path=os.path.join("artifacts","model.pkl")
+    trained_model_file_path=os.path.join("artifacts","model")  # artifact directory, see src.artifact_store
+    export_prediction_table: bool = True  # precompute predictions over the categorical input space for serving
+    export_tree_engine: bool = True  # flatten a selected tree model into arrays for fast small-batch serving
+    search_trace_file_path=os.path.join("artifacts","search_trace.json")
+    search_strategy: str = "grid"  # "grid" for the exhaustive search, "halving" for successive halving
+    search_time_budget: float = None  # seconds the hyperparameter search may take; None for no limit
+    search_n_jobs: int = -1  # workers used by the hyperparameter search; -1 uses every core
+    search_backend: str = "loky"  # "loky" for worker processes, "threading" for threads
+    model_families: list = None  # names of the models to search, e.g. ["Random Forest"]; None searches every one
+    search_cache: bool = True  # reuse the cross-validation results of earlier runs stored in artifacts/search_cache.sqlite
+    # The selection policy and latency budgets are set in ModelSelectionConfig (src.components.model_selection)
+    distill: bool = os.environ.get("MODEL_DISTILLATION", "0") == "1"  # serve a small student fitted to the selected model when it agrees closely
 
 class ModelTrainer:   # responsible for training the model
     """Class responsible for training machine learning models."""
@@ -57,12 +65,21 @@ class ModelTrainer:   # responsible for training the model
         """
         try:
             logging.info("Split training and test input data")
+            # The arrays DataTransformation returns are column-major memory maps, so these slices are views, not copies
             X_train, y_train, X_test, y_test = (
                 train_array[:, :-1],
                 train_array[:, -1],
                 test_array[:, :-1],
                 test_array[:, -1]
             )
+            # The model libraries are imported only when a training run needs them: CatBoost and XGBoost alone
+            # take seconds to import, which a pipeline run that reuses the trained model should not pay
+            from catboost import CatBoostRegressor
+            from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+            from sklearn.linear_model import LinearRegression
+            from sklearn.tree import DecisionTreeRegressor
+            from xgboost import XGBRegressor
+
             models = {
                 "Random Forest": RandomForestRegressor(),
                 "Decision Tree": DecisionTreeRegressor(),
@@ -72,6 +89,8 @@ class ModelTrainer:   # responsible for training the model
                 "CatBoosting Regressor": CatBoostRegressor(verbose=False),
                 "AdaBoost Regressor": AdaBoostRegressor(),
             }
+            if self.model_trainer_config.model_families is not None:
+                models = {name: models[name] for name in self.model_trainer_config.model_families}
            
            # params can be created over here or it can be in some other config file and we can import it here
             params={
@@ -112,33 +131,64 @@ class ModelTrainer:   # responsible for training the model
                 
             }
 
-            model_report: dict = evaluate_models(X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test, models=models, param=params)
-            
-            # To get best model score from dict
-            best_model_score = max(sorted(model_report.values()))
-            
+            search = ModelSearch(ModelSearchConfig(
+                strategy=self.model_trainer_config.search_strategy,
+                time_budget=self.model_trainer_config.search_time_budget,
+                n_jobs=self.model_trainer_config.search_n_jobs,
+                backend=self.model_trainer_config.search_backend,
+            ), cache=SearchCache() if self.model_trainer_config.search_cache else None)
+            model_report: dict = evaluate_models(X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test, models=models, param=params, search=search)
 
-            ## To get best model name from dict
-
-            best_model_name = list(model_report.keys())[
-                list(model_report.values()).index(best_model_score)
-            ]
-            # Alternative:
-            # best_model_name = next(key for key, value in model_report.items() if value == best_model_score)
-            # Used a generator expression (next) to find the best model name more efficiently.
+            # Weigh the test R2 of every candidate against its serving latency, size and fit time
+            selector = ModelSelector()
+            selection_table = selector.measure(models, X_test, model_report, search.refit_times)
+            best_model_name, selection_reason = selector.select(selection_table)
+            best_model_score = model_report[best_model_name]
 
             best_model = models[best_model_name]
 
             if best_model_score < 0.6:
                 raise CustomException("No best model found with sufficient R2 score.")
-            logging.info(f"Best model found: {best_model_name} with R2 score: {best_model_score}")
+            logging.info(f"Best model found: {best_model_name} with R2 score: {best_model_score} ({selection_reason})")
+            logging.info(f"Winning parameters: {search.best_params[best_model_name]}")
+            selector.save_report(selection_table, best_model_name, selection_reason)
+
+            # What is saved to artifacts/model: the selected model, or the student distilled from it
+            served = {"served_model": best_model_name, "distilled_from": None, "served_score": best_model_score}
+            if self.model_trainer_config.distill:
+                distiller = ModelDistiller()
+                preprocessor = load_object(DataTransformationConfig().preprocessor_obj_file_path)
+                served_model, distillation_report = distiller.distill(best_model, preprocessor, X_train, X_test, y_test)
+                distiller.save(distillation_report, teacher=best_model)
+                best_model = served_model
+                shipped = distillation_report["shipped"]
+                if shipped is not None:
+                    served = {
+                        "served_model": shipped,
+                        "distilled_from": best_model_name,
+                        "served_score": distillation_report["candidates"][shipped]["test_score"],
+                    }
+
+            # The search trace is kept next to the model so the selection can be audited later
+            search.save_trace(
+                self.model_trainer_config.search_trace_file_path,
+                selected_model=best_model_name,
+                selected_params=search.best_params[best_model_name],
+                test_scores=model_report,
+                **served,
+            )
 
-# save_object is responsible for saving the model.pkl to designated path
+# save_object is responsible for saving the model artifact to designated path
             save_object( 
                 file_path=self.model_trainer_config.trained_model_file_path,
                 obj=best_model
             )
 
+            if self.model_trainer_config.export_tree_engine:
+                self.export_tree_engine()
+            if self.model_trainer_config.export_prediction_table:
+                self.export_prediction_table()
+
             predicted=best_model.predict(X_test)
 
             r2_square = r2_score(y_test, predicted)
@@ -147,3 +197,28 @@ class ModelTrainer:   # responsible for training the model
 
         except Exception as e:
             raise CustomException(e,sys)
+
+    def export_prediction_table(self):
+        """
+        Exports the saved model as a prediction lookup table for serving.
+
+        The table is an optimization only, so a failure here is logged and does not fail training.
+        """
+        try:
+            PredictionTableExporter().export(
+                model_file_path=self.model_trainer_config.trained_model_file_path,
+                preprocessor_file_path=DataTransformationConfig().preprocessor_obj_file_path,
+            )
+        except Exception as e:
+            logging.warning(f"Prediction table export failed: {e}")
+
+    def export_tree_engine(self):
+        """
+        Exports the saved model as a flattened tree engine for serving, if it is a supported tree model.
+
+        The engine is an optimization only, so a failure here is logged and does not fail training.
+        """
+        try:
+            TreeEngineExporter().export(model_file_path=self.model_trainer_config.trained_model_file_path)
+        except Exception as e:
+            logging.warning(f"Tree engine export failed: {e}")
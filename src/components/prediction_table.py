@@ -0,0 +1,232 @@
+"""
+This module exports the trained model as an exact prediction lookup table.
+
+The five categorical inputs only have a few hundred combinations between them, and the two scores are bounded
+integers, so the model's whole input space is small enough to precompute:
+
+- For models that are additive in the numeric features (such as LinearRegression), a prediction is a per-combination
+  constant plus a dot product with the scores. The table stores one constant per category combination and one weight
+  per score, and serves any score, integer or not.
+- For any other model (the tree ensembles), the table stores the prediction for every category combination and every
+  pair of integer scores. Scores that are not on the grid (fractions, missing values filled with a median) are sent
+  back to the real model.
+
+Either way, serving a prediction costs an array lookup instead of a full sklearn pipeline call. Before it is saved,
+the table is checked against the model on random inputs, and it records the checksums of the model and preprocessor
+files it was built from, so it is never served with a different model.
+
+Classes:
+    PredictionTableConfig: Configuration for the table path and the size of the score grid.
+    PredictionTable: The exported table and its lookup.
+    PredictionTableExporter: Builds, checks and saves the table for a trained model.
+
+Usage:
+    PredictionTableExporter().export(model_file_path, preprocessor_file_path)
+"""
+
+import os
+import sys
+import shutil
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import save_object, load_object, file_checksum
+from src.components.data_validaton import SCORE_RANGE
+from src.pipeline.compiled_preprocessor import compile_preprocessor
+
+
+@dataclass
+class PredictionTableConfig:
+    """Configuration class for the prediction lookup table."""
+    prediction_table_file_path: str = os.path.join("artifacts", "prediction_table")
+    max_grid_cells: int = 5_000_000  # largest full grid exported for models that are not additive
+    n_check_samples: int = 2000  # random inputs the table is checked against the model on
+    tolerance: float = 1e-6  # largest difference allowed between the table and the model
+
+
+class PredictionTable:
+    """
+    Precomputed predictions over the categorical input space.
+
+    Attributes:
+        kind (str): "additive" or "grid".
+        model_checksum (str): Checksum of the model file the table was built from.
+        preprocessor_checksum (str): Checksum of the preprocessor file the table was built from.
+        base (np.ndarray): For "additive", the constant per category combination, one axis per categorical column.
+        weights (np.ndarray): For "additive", the weight of each score.
+        grid (np.ndarray): For "grid", the prediction per category combination and pair of integer scores.
+        score_low (int): For "grid", the lowest score on the grid.
+
+    Methods:
+        lookup(numeric, codes): Returns the predictions and which rows the table could not answer.
+    """
+
+    def __init__(self, kind, model_checksum, preprocessor_checksum, base=None, weights=None, grid=None, score_low=0):
+        self.kind = kind
+        self.model_checksum = model_checksum
+        self.preprocessor_checksum = preprocessor_checksum
+        self.base = base
+        self.weights = weights
+        self.grid = grid
+        self.score_low = score_low
+
+    def lookup(self, numeric, codes):
+        """
+        Looks up the predictions for encoded records.
+
+        Args:
+            numeric (np.ndarray): Scores, as returned by CompiledPreprocessor.encode.
+            codes (np.ndarray): Category codes, as returned by CompiledPreprocessor.encode.
+
+        Returns:
+            tuple: (preds, missed), where preds holds the predictions and missed is a boolean mask of the rows the
+                table cannot answer, which must be scored by the model instead.
+        """
+        if self.kind == "additive":
+            preds = self.base[tuple(codes.T)] + numeric @ self.weights
+            return preds, np.zeros(len(preds), dtype=bool)
+
+        n_scores = self.grid.shape[-1]
+        score_index = numeric - self.score_low
+        on_grid = np.all((score_index == np.round(score_index)) & (score_index >= 0) & (score_index < n_scores), axis=1)
+
+        preds = np.full(len(numeric), np.nan)
+        score_index = score_index[on_grid].astype(np.intp)
+        preds[on_grid] = self.grid[tuple(codes[on_grid].T) + tuple(score_index.T)]
+        return preds, ~on_grid
+
+
+class PredictionTableExporter:
+    """
+    Builds the prediction lookup table for a trained model, checks it, and saves it next to the model.
+
+    Methods:
+        export(model_file_path, preprocessor_file_path): Builds and saves the table.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or PredictionTableConfig()
+
+    def _combinations(self, compiled):
+        """
+        Returns the category codes of every category combination, in table order.
+        """
+        shape = tuple(len(table) for table in compiled.category_index)
+        return np.indices(shape).reshape(len(shape), -1).T, shape
+
+    def _build_additive(self, model, compiled):
+        """
+        Builds the table of a model that is additive in the scores, or returns None if the model is not.
+        """
+        codes, shape = self._combinations(compiled)
+        n_numeric = len(compiled.numerical_columns)
+
+        base = model.predict(compiled.transform_encoded(np.zeros((len(codes), n_numeric)), codes))
+
+        weights = np.empty(n_numeric)
+        for position in range(n_numeric):
+            unit = np.zeros((len(codes), n_numeric))
+            unit[:, position] = 1.0
+            slope = model.predict(compiled.transform_encoded(unit, codes)) - base
+            # An additive model moves by the same amount for every category combination
+            if np.ptp(slope) > self.config.tolerance:
+                return None
+            weights[position] = slope.mean()
+
+        return PredictionTable("additive", None, None, base=base.reshape(shape), weights=weights)
+
+    def _build_grid(self, model, compiled):
+        """
+        Builds the full grid of predictions over every category combination and pair of integer scores.
+        """
+        codes, shape = self._combinations(compiled)
+        low, high = SCORE_RANGE
+        scores = np.arange(low, high + 1, dtype=float)
+        n_numeric = len(compiled.numerical_columns)
+
+        n_cells = len(codes) * len(scores) ** n_numeric
+        if n_cells > self.config.max_grid_cells:
+            logging.info(f"Prediction grid of {n_cells} cells is larger than {self.config.max_grid_cells}, not exported")
+            return None
+
+        score_grid = np.stack(np.meshgrid(*[scores] * n_numeric, indexing="ij"), axis=-1).reshape(-1, n_numeric)
+        grid = np.empty((len(codes), len(score_grid)))
+        for combination, combination_codes in enumerate(codes):
+            repeated = np.repeat(combination_codes[None, :], len(score_grid), axis=0)
+            grid[combination] = model.predict(compiled.transform_encoded(score_grid, repeated))
+
+        grid = grid.reshape(shape + (len(scores),) * n_numeric)
+        return PredictionTable("grid", None, None, grid=grid, score_low=low)
+
+    def _check(self, table, model, compiled):
+        """
+        Compares the table with the model on random inputs, both on and off the score grid.
+
+        Returns:
+            float: The largest difference between the table and the model.
+        """
+        rng = np.random.default_rng(0)
+        codes, _ = self._combinations(compiled)
+        codes = codes[rng.integers(len(codes), size=self.config.n_check_samples)]
+        low, high = SCORE_RANGE
+        numeric = rng.integers(low, high + 1, size=(len(codes), len(compiled.numerical_columns))).astype(float)
+        numeric[::2] += rng.random((len(numeric[::2]), numeric.shape[1])).round(2)
+
+        expected = model.predict(compiled.transform_encoded(numeric, codes))
+        preds, missed = table.lookup(numeric, codes)
+        if missed.all():
+            return 0.0
+        return float(np.max(np.abs(preds[~missed] - expected[~missed])))
+
+    def export(self, model_file_path, preprocessor_file_path):
+        """
+        Builds the lookup table for the saved model and preprocessor and saves it.
+
+        Args:
+            model_file_path (str): Path of the saved model.
+            preprocessor_file_path (str): Path of the saved preprocessor.
+
+        Returns:
+            str: Path of the saved table, or None if no table was exported.
+
+        Raises:
+            CustomException: If the artifacts cannot be read or the table cannot be saved.
+        """
+        try:
+            table_path = self.config.prediction_table_file_path
+            # never leave a table for the previous model behind, nor one in the old single-pickle format
+            if os.path.isdir(table_path):
+                shutil.rmtree(table_path)
+            if os.path.isfile(table_path + ".pkl"):
+                os.remove(table_path + ".pkl")
+
+            model = load_object(file_path=model_file_path)
+            compiled = compile_preprocessor(load_object(file_path=preprocessor_file_path))
+
+            # Prefer the compact additive table, and fall back to the full grid when the model is not additive
+            for build in (self._build_additive, self._build_grid):
+                table = build(model, compiled)
+                if table is None:
+                    continue
+                difference = self._check(table, model, compiled)
+                if difference <= self.config.tolerance:
+                    break
+                logging.info(f"{table.kind} prediction table differs from the model by {difference}")
+                table = None
+
+            if table is None:
+                logging.info("No prediction table exported")
+                return None
+
+            table.model_checksum = file_checksum(model_file_path)
+            table.preprocessor_checksum = file_checksum(preprocessor_file_path)
+            save_object(file_path=table_path, obj=table)
+
+            logging.info(f"Exported {table.kind} prediction table to {table_path}")
+            return table_path
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,340 @@
+"""
+This module contains the SearchCache class, a persistent on-disk store of hyperparameter search results.
+
+Every training run used to cross-validate the whole grid again, even when the data, the preprocessing and the grid
+had not changed. ModelSearch now looks every (candidate, fold) cell up in this store first and only fits the
+missing ones, so a repeat run costs almost nothing and a run with an extended grid only pays for the new cells.
+
+A cell is keyed on:
+- the fingerprint of the training arrays the search runs on. They are the preprocessor's output, so the fingerprint
+  changes with the dataset content and with any preprocessing change that affects the features;
+- the estimator class, its base parameters and the version of the library it comes from;
+- the candidate's parameters;
+- the exact training and held-out rows of the fold (which covers the number of folds, the fold seed and the
+  halving sample size).
+
+The store is a SQLite file next to the other artifacts. It is bounded by `max_entries`: the least recently used cells
+are evicted first.
+
+Classes:
+    SearchCacheConfig: Configuration for the store path and size.
+    SearchCache: Looks up, stores, inspects and prunes cached cells.
+
+Functions:
+    main(argv): Command line entry point to inspect and prune the store.
+
+Usage:
+    search = ModelSearch(ModelSearchConfig(), cache=SearchCache())
+
+    python -m src.components.search_cache stats
+    python -m src.components.search_cache prune --older-than-days 30
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+@dataclass
+class SearchCacheConfig:
+    """Configuration class for the search result store."""
+    search_cache_file_path: str = os.path.join("artifacts", "search_cache.sqlite")
+    max_entries: int = 200_000  # cells kept at most; the least recently used are evicted beyond this
+
+
+def _hash_arrays(*arrays):
+    """
+    Returns the sha256 hex digest of the shapes, dtypes and contents of arrays.
+    """
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.shape}{array.dtype.str}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class SearchCache:
+    """
+    A persistent store of per-fold cross-validation results.
+
+    Methods:
+        fingerprint(X, y): Returns the fingerprint of the training arrays.
+        cell_key(data_hash, estimator, params, train_index, test_index): Returns the key of one cell.
+        get_many(keys): Returns the cached (score, fit time) of the keys found.
+        put_many(cells): Stores results and evicts the least recently used beyond `max_entries`.
+        stats(): Returns the size of the store and its contents per estimator.
+        prune(older_than_days, estimator, data_hash, max_entries): Deletes cells.
+    """
+
+    _schema = """
+        CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY,
+            data_hash TEXT NOT NULL,
+            estimator TEXT NOT NULL,
+            params TEXT NOT NULL,
+            n_train INTEGER NOT NULL,
+            score REAL NOT NULL,
+            fit_time REAL NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, config=None):
+        self.config = config or SearchCacheConfig()
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        """
+        Opens the store on first use. Must be called with the lock held.
+        """
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.config.search_cache_file_path) or ".", exist_ok=True)
+            self._connection = sqlite3.connect(self.config.search_cache_file_path, check_same_thread=False)
+            self._connection.execute(self._schema)
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used_at)")
+        return self._connection
+
+    @staticmethod
+    def fingerprint(X, y):
+        """
+        Returns the fingerprint of the training arrays.
+
+        Args:
+            X (np.ndarray): Training features.
+            y (np.ndarray): Training target.
+
+        Returns:
+            str: A sha256 hex digest.
+        """
+        return _hash_arrays(X, y)
+
+    @staticmethod
+    def estimator_name(estimator):
+        """
+        Returns the name an estimator's cells are listed under, such as "xgboost.sklearn.XGBRegressor".
+        """
+        return f"{type(estimator).__module__}.{type(estimator).__name__}"
+
+    @classmethod
+    def cell_key(cls, data_hash, estimator, params, train_index, test_index):
+        """
+        Returns the key of one (candidate, fold) cell.
+
+        Args:
+            data_hash (str): Fingerprint of the training arrays.
+            estimator: The unfitted estimator.
+            params (dict): The candidate's parameters.
+            train_index (np.ndarray): Training rows of the fold.
+            test_index (np.ndarray): Held-out rows of the fold.
+
+        Returns:
+            str: A sha256 hex digest.
+        """
+        package = sys.modules.get(type(estimator).__module__.split(".")[0])
+        base_params = {name: value for name, value in estimator.get_params(deep=False).items() if name not in params}
+        description = json.dumps([
+            cls.estimator_name(estimator),
+            getattr(package, "__version__", None),
+            sorted((name, repr(value)) for name, value in base_params.items()),
+            sorted((name, repr(value)) for name, value in params.items()),
+        ])
+        digest = hashlib.sha256(f"{data_hash}{description}".encode())
+        digest.update(_hash_arrays(train_index, test_index).encode())
+        return digest.hexdigest()
+
+    def get_many(self, keys):
+        """
+        Looks cells up and marks the ones found as recently used.
+
+        Args:
+            keys (list): Keys built with cell_key.
+
+        Returns:
+            dict: Key -> (score, fit time) for the keys found.
+        """
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        try:
+            with self._lock:
+                connection = self._connect()
+                found = {}
+                for start in range(0, len(keys), 500):  # SQLite limits the number of bound parameters
+                    chunk = keys[start:start + 500]
+                    rows = connection.execute(
+                        f"SELECT key, score, fit_time FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    )
+                    found.update((key, (score, fit_time)) for key, score, fit_time in rows)
+                if found:
+                    now = time.time()
+                    connection.executemany("UPDATE results SET last_used_at = ? WHERE key = ?", [(now, key) for key in found])
+                    connection.commit()
+                return found
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def put_many(self, cells):
+        """
+        Stores results, then evicts the least recently used cells beyond `max_entries`.
+
+        Failed fits (NaN scores) are not stored, so they are retried on the next run.
+
+        Args:
+            cells (list): (key, data_hash, estimator, params, n_train, score, fit_time) tuples.
+        """
+        now = time.time()
+        rows = [
+            (key, data_hash, self.estimator_name(estimator), json.dumps(params, sort_keys=True, default=str),
+             int(n_train), float(score), float(fit_time), now, now)
+            for key, data_hash, estimator, params, n_train, score, fit_time in cells
+            if not np.isnan(score)
+        ]
+        if not rows:
+            return
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                evicted = self._evict(connection, self.config.max_entries)
+                connection.commit()
+            if evicted:
+                logging.info(f"Evicted {evicted} search cache entries beyond {self.config.max_entries}")
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _evict(connection, max_entries):
+        """
+        Deletes the least recently used cells beyond `max_entries` and returns how many were deleted.
+        """
+        (count,) = connection.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count <= max_entries:
+            return 0
+        connection.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used_at LIMIT ?)",
+            (count - max_entries,),
+        )
+        return count - max_entries
+
+    def stats(self):
+        """
+        Describes the store.
+
+        Returns:
+            dict: Path, size on disk, number of cells, number of datasets, and cells and last use per estimator.
+        """
+        try:
+            with self._lock:
+                connection = self._connect()
+                (n_entries, n_datasets) = connection.execute(
+                    "SELECT COUNT(*), COUNT(DISTINCT data_hash) FROM results"
+                ).fetchone()
+                estimators = {
+                    estimator: {"entries": entries, "last_used_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_used))}
+                    for estimator, entries, last_used in connection.execute(
+                        "SELECT estimator, COUNT(*), MAX(last_used_at) FROM results GROUP BY estimator ORDER BY estimator"
+                    )
+                }
+            return {
+                "path": self.config.search_cache_file_path,
+                "size_bytes": os.path.getsize(self.config.search_cache_file_path),
+                "entries": n_entries,
+                "max_entries": self.config.max_entries,
+                "datasets": n_datasets,
+                "estimators": estimators,
+            }
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def prune(self, older_than_days=None, estimator=None, data_hash=None, max_entries=None):
+        """
+        Deletes cells. With no argument, deletes every cell.
+
+        Args:
+            older_than_days (float, optional): Delete the cells not used for this many days.
+            estimator (str, optional): Delete the cells of the estimators whose name contains this text.
+            data_hash (str, optional): Delete the cells of the datasets whose fingerprint starts with this text.
+            max_entries (int, optional): Then keep at most this many cells, evicting the least recently used.
+
+        Returns:
+            int: Number of cells deleted.
+        """
+        conditions, values = [], []
+        if older_than_days is not None:
+            conditions.append("last_used_at < ?")
+            values.append(time.time() - older_than_days * 86400)
+        if estimator is not None:
+            conditions.append("estimator LIKE ?")
+            values.append(f"%{estimator}%")
+        if data_hash is not None:
+            conditions.append("data_hash LIKE ?")
+            values.append(f"{data_hash}%")
+        try:
+            with self._lock:
+                connection = self._connect()
+                deleted = 0
+                if conditions or max_entries is None:
+                    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+                    deleted = connection.execute(f"DELETE FROM results{where}", values).rowcount
+                if max_entries is not None:
+                    deleted += self._evict(connection, max_entries)
+                connection.commit()
+                connection.execute("VACUUM")
+            logging.info(f"Pruned {deleted} search cache entries")
+            return deleted
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def main(argv=None):
+    """
+    Inspects or prunes the search result store from the command line.
+
+    Args:
+        argv (list, optional): Arguments, defaulting to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.components.search_cache", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--path", default=SearchCacheConfig.search_cache_file_path, help="store file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="show the size and contents of the store")
+    prune = commands.add_parser("prune", help="delete cells; with no filter, delete every cell")
+    prune.add_argument("--older-than-days", type=float, help="delete the cells not used for this many days")
+    prune.add_argument("--estimator", help="delete the cells of estimators whose name contains this text")
+    prune.add_argument("--data-hash", help="delete the cells of datasets whose fingerprint starts with this text")
+    prune.add_argument("--max-entries", type=int, help="then keep at most this many cells")
+    args = parser.parse_args(argv)
+
+    cache = SearchCache(SearchCacheConfig(search_cache_file_path=args.path))
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    else:
+        deleted = cache.prune(
+            older_than_days=args.older_than_days, estimator=args.estimator,
+            data_hash=args.data_hash, max_entries=args.max_entries,
+        )
+        print(f"Deleted {deleted} entries")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Module: synthetic_data
+
+This module generates synthetic student records with the schema of `notebook/data/stud.csv`, in any number, so the
+training pipeline can be run on datasets far larger than the real one.
+
+The generator is fitted on the real data and keeps what the models learn from:
+- the categorical columns are drawn together from the observed combinations and their frequencies, so
+  correlations between them (e.g. lunch and test preparation) are kept;
+- the three scores are drawn from a multivariate normal whose mean depends linearly on the categories (a least
+  squares fit on their one-hot encoding) and whose covariance is that of the fit's residuals, so each score
+  depends on the categories and on the other two scores as it does in the real data. Scores are rounded and
+  clipped to SCORE_RANGE, like real ones.
+
+Rows are produced in chunks, so memory use is bounded by the chunk size whatever the number of rows, and the
+same seed and chunk size always give the same rows.
+
+Classes:
+    SyntheticDataConfig: Source data, chunk size and seed of the generator.
+    SyntheticDataGenerator: Fits the distributions and streams or writes synthetic rows.
+
+Usage:
+    generator = SyntheticDataGenerator().fit()
+    generator.write(os.path.join("artifacts", "synthetic.csv"), n_rows=10_000_000)
+    for chunk in generator.iter_chunks(n_rows=1_000_000):
+        ...
+
+    python -m src.components.synthetic_data --rows 1000000 --output artifacts/synthetic.parquet
+    python -m src.components.synthetic_data --rows 1000000 --output - | ...   # CSV on stdout
+"""
+
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import TableWriter
+from src.components.data_validaton import CATEGORICAL_COLUMNS, TARGET_COLUMN, SCORE_RANGE
+
+SCORE_COLUMNS = [TARGET_COLUMN, "reading_score", "writing_score"]
+
+
+@dataclass
+class SyntheticDataConfig:
+    """Configuration class for the synthetic data generator."""
+    source_data_path: str = os.path.join('notebook', 'data', 'stud.csv')  # real data the distributions are fitted on
+    chunk_size: int = int(os.environ.get("SYNTHETIC_CHUNK_SIZE", 100_000))  # rows generated at a time
+    random_state: int = 42
+
+
+class SyntheticDataGenerator:
+    """
+    Generates synthetic student records with the schema and distributions of the real data.
+
+    Methods:
+        fit(df): Learns the category combinations and the score model.
+        sample(n_rows, rng): Draws one block of rows.
+        iter_chunks(n_rows): Yields the rows in chunks of `chunk_size`.
+        write(file_path, n_rows): Writes the rows to a Parquet or CSV file, chunk by chunk.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or SyntheticDataConfig()
+        self.columns = None
+        self.combinations = None
+        self.probabilities = None
+        self.coefficients = None
+        self.cholesky = None
+
+    def fit(self, df=None):
+        """
+        Learns the distributions from the real data.
+
+        Args:
+            df (pd.DataFrame, optional): The real data. Defaults to the file at `source_data_path`.
+
+        Returns:
+            SyntheticDataGenerator: The fitted generator.
+        """
+        try:
+            if df is None:
+                df = pd.read_csv(self.config.source_data_path)
+            self.columns = list(df.columns)
+
+            counts = df.groupby(CATEGORICAL_COLUMNS).size()
+            self.combinations = counts.index.to_frame(index=False)
+            self.probabilities = (counts / counts.sum()).to_numpy()
+
+            design = self._design(df[CATEGORICAL_COLUMNS])
+            scores = df[SCORE_COLUMNS].to_numpy(dtype=float)
+            self.coefficients, *_ = np.linalg.lstsq(design, scores, rcond=None)
+            residuals = scores - design @ self.coefficients
+            self.cholesky = np.linalg.cholesky(np.cov(residuals, rowvar=False))
+
+            logging.info(f"Fitted the synthetic data generator on {len(df)} rows, {len(counts)} category combinations")
+            return self
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _design(self, categories):
+        """
+        One-hot encodes the categorical columns, plus an intercept column, against the fitted combinations.
+        """
+        blocks = [np.ones((len(categories), 1))]
+        for column in CATEGORICAL_COLUMNS:
+            levels = np.sort(self.combinations[column].unique())
+            codes = np.searchsorted(levels, categories[column].to_numpy())
+            blocks.append(np.eye(len(levels))[codes, 1:])  # the first level is absorbed by the intercept
+        return np.hstack(blocks)
+
+    def sample(self, n_rows, rng):
+        """
+        Draws one block of rows.
+
+        Args:
+            n_rows (int): Number of rows.
+            rng (np.random.Generator): Source of randomness.
+
+        Returns:
+            pd.DataFrame: The rows, with the columns of the real data in the same order.
+        """
+        picks = rng.choice(len(self.probabilities), size=n_rows, p=self.probabilities)
+        categories = self.combinations.iloc[picks].reset_index(drop=True)
+
+        scores = self._design(categories) @ self.coefficients
+        scores += rng.standard_normal((n_rows, len(SCORE_COLUMNS))) @ self.cholesky.T
+        scores = np.clip(np.rint(scores), *SCORE_RANGE).astype(np.int64)
+
+        df = categories.assign(**{column: scores[:, i] for i, column in enumerate(SCORE_COLUMNS)})
+        return df[self.columns]
+
+    def iter_chunks(self, n_rows):
+        """
+        Yields `n_rows` synthetic rows in chunks of at most `chunk_size` rows.
+
+        Args:
+            n_rows (int): Total number of rows.
+
+        Yields:
+            pd.DataFrame: The next chunk.
+        """
+        if self.coefficients is None:
+            self.fit()
+        rng = np.random.default_rng(self.config.random_state)
+        for start in range(0, n_rows, self.config.chunk_size):
+            yield self.sample(min(self.config.chunk_size, n_rows - start), rng)
+
+    def write(self, file_path, n_rows):
+        """
+        Writes `n_rows` synthetic rows to a Parquet or CSV file, one chunk at a time.
+
+        Args:
+            file_path (str): Path ending in ".parquet" or ".csv".
+            n_rows (int): Number of rows.
+
+        Returns:
+            str: The path written.
+        """
+        try:
+            with TableWriter(file_path) as writer:
+                for chunk in self.iter_chunks(n_rows):
+                    writer.write(chunk)
+            logging.info(f"Wrote {writer.rows} synthetic rows to {file_path}")
+            return file_path
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic student records.")
+    parser.add_argument("--rows", type=int, required=True, help="number of rows")
+    parser.add_argument("--output", required=True, help="Parquet or CSV file, or - for CSV on stdout")
+    parser.add_argument("--seed", type=int, default=SyntheticDataConfig.random_state)
+    parser.add_argument("--chunk-size", type=int, default=SyntheticDataConfig.chunk_size)
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(SyntheticDataConfig(chunk_size=args.chunk_size, random_state=args.seed))
+    if args.output == "-":
+        for index, chunk in enumerate(generator.iter_chunks(args.rows)):
+            chunk.to_csv(sys.stdout, index=False, header=index == 0)
+    else:
+        generator.write(args.output, args.rows)
@@ -0,0 +1,383 @@
+"""
+This module exports the trained tree model (Decision Tree, Random Forest, Gradient Boosting or AdaBoost) as flat
+NumPy arrays, and evaluates it with a vectorized traversal instead of sklearn's predict.
+
+sklearn's predict has a high fixed cost per call: input validation, then one Cython call per tree (and a joblib
+dispatch for the forests), so a single-row request to a 256-tree forest pays for 256 separate traversals. Here every
+node of every tree is stored in the same few contiguous arrays:
+
+    feature[node]      input column tested at the node (0 at leaves)
+    threshold[node]    go left when x[feature] <= threshold
+    missing_left[node] where a missing value goes
+    children[node]     (left, right) node ids; a leaf points to itself on both sides
+    value[node]        prediction at the node
+
+A batch is evaluated for all trees at once, one tree level per step: a (trees, rows) array holds the current node of
+every row in every tree, and each step gathers the tested feature and threshold and moves every row one level down.
+The array is tree-major, so consecutive gathers hit the nodes of the same tree and stay in cache.
+After `max_depth` steps every row sits on a leaf (leaves point to themselves), and the leaf values are combined the
+way the model does: a weighted sum (the forest mean, or the boosting base score plus the learning-rate scaled sum),
+or AdaBoost's weighted median.
+
+Inputs are compared in float32, as sklearn's trees do, so the engine takes the same branch on every threshold. The
+engine is saved as an artifact directory, so its arrays are memory-mapped and shared by every serving process.
+
+The engine wins on small batches, where sklearn's fixed cost dominates: a single row through a 256-tree forest takes
+about 0.4ms instead of 25ms. On large batches sklearn's compiled traversal is faster per (row, tree) cell than NumPy
+gathers. Where the two cross depends on the model (AdaBoost, which sklearn predicts one tree at a time, never
+crosses), so the exporter times both on growing batches and records in `max_batch_rows` the largest batch on which
+the engine was faster; serving sends larger batches to the model (see `handles`). `benchmarks/tree_engine.py`
+compares both across batch sizes.
+
+Classes:
+    TreeEngineConfig: Configuration for the engine path and the parity check.
+    TreeEngine: The flattened trees and the vectorized predict.
+    TreeEngineExporter: Builds, checks and saves the engine for a trained model.
+
+Functions:
+    compile_tree_model(model): Flattens a fitted tree model into a TreeEngine, or returns None.
+    check_parity(engine, model, X, atol): Compares the engine with model.predict.
+
+Usage:
+    TreeEngineExporter().export(model_file_path)
+    preds = load_object(TreeEngineConfig().tree_engine_file_path).predict(features)
+"""
+
+import os
+import sys
+import time
+import shutil
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import save_object, load_object, file_checksum
+
+
+@dataclass
+class TreeEngineConfig:
+    """Configuration class for the tree inference engine."""
+    tree_engine_file_path: str = os.path.join("artifacts", "tree_engine")
+    n_check_samples: int = 2000  # inputs the engine is checked against model.predict on before it is saved
+    tolerance: float = 1e-9  # largest difference allowed between the engine and the model
+    max_calibration_rows: int = 4096  # largest batch timed when finding where model.predict becomes faster
+
+
+class TreeEngine:
+    """
+    Tree ensemble flattened into contiguous arrays, evaluated level by level for a whole batch.
+
+    Attributes:
+        kind (str): "sum" (the prediction is base + the weighted sum of the tree values) or "median" (the
+            weighted median of the tree values, as AdaBoost).
+        model_checksum (str): Checksum of the model artifact the engine was built from.
+        n_features (int): Number of input columns.
+        max_depth (int): Depth of the deepest tree, which is the number of traversal steps.
+        roots (np.ndarray): Node id of the root of each tree.
+        feature, threshold, missing_left, children, value (np.ndarray): The node arrays, see the module docstring.
+        weights (np.ndarray): Weight of each tree.
+        base (float): Constant added to the weighted sum.
+        max_batch_rows (int): Largest batch on which the engine is faster than model.predict, or None if unknown.
+
+    Methods:
+        predict(X): Predicts a batch of feature rows.
+        handles(n_rows): Tells whether a batch of this size is faster through the engine than through the model.
+        probe(n_rows, seed): Builds rows that land on and around every threshold, for checking the engine.
+    """
+
+    block_size = 1 << 20  # (row, tree) cells traversed at once, which bounds the memory used by large batches
+
+    def __init__(self, kind, n_features, roots, feature, threshold, missing_left, children, value,
+                 weights, base=0.0, max_depth=0, model_checksum=None, max_batch_rows=None):
+        self.kind = kind
+        self.model_checksum = model_checksum
+        self.max_batch_rows = max_batch_rows
+        self.n_features = int(n_features)
+        self.max_depth = int(max_depth)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.missing_left = np.ascontiguousarray(missing_left, dtype=bool)
+        self.children = np.ascontiguousarray(children, dtype=np.intp).reshape(-1)  # left at 2 * node, right at 2 * node + 1
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.base = float(base)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def handles(self, n_rows):
+        return self.max_batch_rows is None or n_rows <= self.max_batch_rows
+
+    def _leaves(self, X):
+        """
+        Returns the leaf each row reaches in each tree, as a (trees, rows) array of node ids.
+        """
+        flat = X.reshape(-1)
+        row_start = (np.arange(len(X), dtype=np.intp) * X.shape[1])[np.newaxis, :]
+        node = np.repeat(self.roots[:, np.newaxis], len(X), axis=1)
+        has_missing = bool(np.isnan(flat).any())
+
+        for _ in range(self.max_depth):
+            values = flat[row_start + self.feature[node]]
+            go_right = ~(values <= self.threshold[node])
+            if has_missing:
+                go_right &= ~(np.isnan(values) & self.missing_left[node])
+            node = self.children[2 * node + go_right]
+        return node
+
+    def _combine(self, leaf_values):
+        """
+        Combines the (trees, rows) leaf values into one prediction per row.
+        """
+        if self.kind == "sum":
+            return self.base + self.weights @ leaf_values
+
+        leaf_values = leaf_values.T
+        # Weighted median, computed exactly as AdaBoostRegressor._get_median_predict
+        sorted_index = np.argsort(leaf_values, axis=1)
+        weight_cdf = np.cumsum(self.weights[sorted_index], axis=1)
+        median_or_above = weight_cdf >= 0.5 * weight_cdf[:, -1][:, np.newaxis]
+        median_index = median_or_above.argmax(axis=1)
+        rows = np.arange(len(leaf_values))
+        return leaf_values[rows, sorted_index[rows, median_index]]
+
+    def predict(self, X):
+        """
+        Predicts a batch of feature rows.
+
+        Args:
+            X: Features, as a 2D array, a sparse matrix, or a single 1D row.
+
+        Returns:
+            np.ndarray: One prediction per row.
+
+        Raises:
+            ValueError: If X does not have the number of columns the model was trained on.
+        """
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        X = np.ascontiguousarray(X, dtype=np.float32)  # sklearn's trees compare float32 inputs
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but the tree engine expects {self.n_features}")
+
+        rows_per_block = max(1, self.block_size // max(1, self.n_trees))
+        if len(X) <= rows_per_block:
+            return self._combine(self.value[self._leaves(X)])
+
+        preds = np.empty(len(X))
+        for start in range(0, len(X), rows_per_block):
+            block = X[start:start + rows_per_block]
+            preds[start:start + len(block)] = self._combine(self.value[self._leaves(block)])
+        return preds
+
+    def probe(self, n_rows, seed=0):
+        """
+        Builds rows whose values sit exactly on, just below and just above the thresholds of the trees, so a
+        comparison against the model exercises both branches of as many splits as possible, ties included.
+
+        Args:
+            n_rows (int): Number of rows.
+            seed (int): Random seed.
+
+        Returns:
+            np.ndarray: A (n_rows, n_features) array.
+        """
+        rng = np.random.default_rng(seed)
+        X = rng.normal(size=(n_rows, self.n_features))
+        internal = self.children[0::2] != np.arange(len(self.feature))
+        for column in range(self.n_features):
+            thresholds = self.threshold[internal & (self.feature == column)]
+            if len(thresholds):
+                picked = rng.choice(thresholds, size=n_rows)
+                X[:, column] = picked + rng.choice([-1e-3, 0.0, 1e-3], size=n_rows)
+        return X
+
+
+def _flatten(trees, n_features):
+    """
+    Concatenates sklearn Tree objects into the node arrays of a TreeEngine.
+
+    Returns:
+        dict: The TreeEngine arguments describing the nodes.
+    """
+    roots, feature, threshold, missing_left, children, value = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for tree in trees:
+        if tree.n_outputs != 1:
+            raise ValueError("Only single-output trees can be flattened")
+        node_ids = np.arange(tree.node_count)
+        leaf = tree.children_left == -1
+        roots.append(offset)
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(np.where(leaf, np.inf, tree.threshold))
+        missing = getattr(tree, "missing_go_to_left", None)
+        missing_left.append(np.zeros(tree.node_count, dtype=bool) if missing is None else missing.astype(bool))
+        children.append(np.stack([
+            np.where(leaf, node_ids, tree.children_left) + offset,
+            np.where(leaf, node_ids, tree.children_right) + offset,
+        ], axis=1))
+        value.append(tree.value[:, 0, 0])
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return dict(
+        n_features=n_features,
+        roots=np.array(roots),
+        feature=np.concatenate(feature),
+        threshold=np.concatenate(threshold),
+        missing_left=np.concatenate(missing_left),
+        children=np.concatenate(children),
+        value=np.concatenate(value),
+        max_depth=max_depth,
+    )
+
+
+def compile_tree_model(model):
+    """
+    Flattens a fitted tree model into a TreeEngine.
+
+    Supported: DecisionTreeRegressor, RandomForestRegressor, GradientBoostingRegressor (with the default
+    constant or zero init) and AdaBoostRegressor over decision trees.
+
+    Args:
+        model: The fitted model.
+
+    Returns:
+        TreeEngine: The flattened model, or None if the model is not a supported tree model.
+    """
+    from sklearn.dummy import DummyRegressor
+    from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.tree import DecisionTreeRegressor
+
+    if isinstance(model, DecisionTreeRegressor):
+        nodes = _flatten([model.tree_], model.n_features_in_)
+        return TreeEngine("sum", weights=[1.0], **nodes)
+
+    if isinstance(model, RandomForestRegressor):
+        nodes = _flatten([tree.tree_ for tree in model.estimators_], model.n_features_in_)
+        return TreeEngine("sum", weights=np.full(len(model.estimators_), 1.0 / len(model.estimators_)), **nodes)
+
+    if isinstance(model, GradientBoostingRegressor):
+        if model.init_ == "zero":
+            base = 0.0
+        elif isinstance(model.init_, DummyRegressor):
+            base = float(np.ravel(model.init_.constant_)[0])
+        else:
+            return None  # a fitted init estimator makes the base score depend on the row
+        trees = [stage[0].tree_ for stage in model.estimators_]
+        nodes = _flatten(trees, model.n_features_in_)
+        return TreeEngine("sum", weights=np.full(len(trees), model.learning_rate), base=base, **nodes)
+
+    if isinstance(model, AdaBoostRegressor):
+        if not all(isinstance(estimator, DecisionTreeRegressor) for estimator in model.estimators_):
+            return None
+        nodes = _flatten([estimator.tree_ for estimator in model.estimators_], model.n_features_in_)
+        return TreeEngine("median", weights=model.estimator_weights_[:len(model.estimators_)], **nodes)
+
+    return None
+
+
+def check_parity(engine, model, X, atol=1e-9):
+    """
+    Checks that the engine predicts the same numbers as `model.predict`.
+
+    Args:
+        engine (TreeEngine): The engine.
+        model: The fitted model it was built from.
+        X (np.ndarray): Feature rows to predict both ways.
+        atol (float): Largest difference allowed.
+
+    Returns:
+        float: The largest absolute difference found.
+
+    Raises:
+        CustomException: If the predictions differ by more than `atol`.
+    """
+    expected = np.asarray(model.predict(X), dtype=float)
+    difference = float(np.max(np.abs(engine.predict(X) - expected))) if len(expected) else 0.0
+    if difference > atol:
+        raise CustomException(f"Tree engine differs from model.predict by up to {difference}", sys)
+    return difference
+
+
+class TreeEngineExporter:
+    """
+    Builds the tree engine for a trained model, checks it against the model, and saves it next to the model.
+
+    Methods:
+        export(model_file_path): Builds and saves the engine.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or TreeEngineConfig()
+
+    @staticmethod
+    def _best_time(predict, X, repeat=3):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            predict(X)
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def _calibrate(self, engine, model, X):
+        """
+        Times the engine and the model on batches of 1, 4, 16, ... rows and returns the largest batch on which the
+        engine was faster, or None if it was faster on every batch up to `max_calibration_rows`.
+        """
+        engine.predict(X[:1]), model.predict(X[:1])  # warm up
+        fastest, n_rows = 0, 1
+        while n_rows <= self.config.max_calibration_rows:
+            batch = np.resize(X, (n_rows, X.shape[1]))
+            if self._best_time(engine.predict, batch) >= self._best_time(model.predict, batch):
+                return fastest
+            fastest, n_rows = n_rows, n_rows * 4
+        return None
+
+    def export(self, model_file_path):
+        """
+        Builds the engine for the saved model and saves it. The engine is only saved if it matches
+        `model.predict` on inputs placed around every threshold, and records the batch size up to which it
+        is faster than the model.
+
+        Args:
+            model_file_path (str): Path of the saved model.
+
+        Returns:
+            str: Path of the saved engine, or None if the model is not a supported tree model.
+
+        Raises:
+            CustomException: If the model cannot be read, the engine does not match it, or it cannot be saved.
+        """
+        try:
+            engine_path = self.config.tree_engine_file_path
+            if os.path.isdir(engine_path):
+                shutil.rmtree(engine_path)  # never leave an engine for the previous model behind
+
+            model = load_object(file_path=model_file_path)
+            engine = compile_tree_model(model)
+            if engine is None:
+                logging.info(f"No tree engine exported for {type(model).__name__}")
+                return None
+
+            probe = engine.probe(self.config.n_check_samples)
+            difference = check_parity(engine, model, probe, atol=self.config.tolerance)
+            engine.max_batch_rows = self._calibrate(engine, model, probe)
+            engine.model_checksum = file_checksum(model_file_path)
+            save_object(file_path=engine_path, obj=engine)
+
+            logging.info(
+                f"Exported tree engine for {type(model).__name__} ({engine.n_trees} trees, {len(engine.value)} nodes, "
+                f"depth {engine.max_depth}, max difference {difference}, used up to {engine.max_batch_rows} rows) "
+                f"to {engine_path}"
+            )
+            return engine_path
+
+        except Exception as e:
+            raise CustomException(e, sys)
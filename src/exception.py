@@ -29,12 +29,20 @@ def error_message_detail(error, error_detail:sys):
 
     Args:
         error: The exception object.
-        error_detail (tuple): The traceback information from sys.exc_info().
+        error_detail (tuple): The traceback information from sys.exc_info(), or the sys module itself.
 
     Returns:
         str: A formatted error message with file name, line number, and error details.
     """
+    # Callers pass the sys module itself; take the exception currently being handled from it
+    if hasattr(error_detail, "exc_info"):
+        error_detail = error_detail.exc_info()
+
     exc_type, exc_obj, exc_tb = error_detail  # Correctly unpack the error detail
+
+    # Raised outside an except block there is no traceback to point at
+    if exc_tb is None:
+        return f"Error occurred - {str(error)}"
     
     # Get the filename where the error occurred
     file_name = exc_tb.tb_frame.f_code.co_filename
@@ -73,4 +81,15 @@ class CustomException(Exception):
 
     def __str__(self):
         # Return the formatted error message when the exception is converted to a string
-        return f"{self.error_message}\nTraceback:\n{self.traceback}"
\ No newline at end of file
+        return f"{self.error_message}\nTraceback:\n{self.traceback}"
+
+class DataValidationError(CustomException):
+    """
+    Raised when input data fails validation.
+
+    Attributes:
+        errors (list): One message per problem found, suitable for returning to the caller.
+    """
+    def __init__(self, error_message, error_detail:sys, errors=None):
+        super().__init__(error_message, error_detail)
+        self.errors = errors or [str(error_message)]
@@ -1,42 +1,378 @@
 """
 logger.py
 
-This module provides a logging utility for the machine learning project. It is used to configure and manage logging 
-throughout the project, ensuring that all logs are consistently formatted and directed to appropriate outputs 
-(e.g., console, file). The logger helps in tracking the flow of execution, debugging, and monitoring the performance 
+This module provides a logging utility for the machine learning project. It is used to configure and manage logging
+throughout the project, ensuring that all logs are consistently formatted and directed to appropriate outputs
+(e.g., console, file). The logger helps in tracking the flow of execution, debugging, and monitoring the performance
 and behavior of the application.
 
+Logging never blocks the caller on file I/O. `logging.info(...)` only builds the record and puts it on a bounded
+in-memory queue; a background writer thread takes records off the queue in batches, writes them and flushes the
+file once per batch. If the queue is full the record is dropped and counted rather than waited for, and the writer
+reports how many were dropped.
+
 Key functionalities:
-- Setting up a logger with a specific configuration (e.g., log level, format).
-- Writing log messages of various severity levels (e.g., DEBUG, INFO, WARNING, ERROR, CRITICAL).
-- Directing log messages to different handlers (e.g., console, file).
-- Ensuring that logs are timestamped and contain relevant context information.
+- One log directory (`logs/`) and one log file per name (`logs/app.log`), rotated by size instead of a new
+  directory and file for every process start.
+- Structured records: one JSON object per line with the time, level, module, line and message, the context IDs
+  bound with `log_context` (run_id, request_id, ...) and any fields passed with `extra=` (stage, duration_ms, ...).
+  Set LOG_FORMAT=text for the previous plain-text lines.
+- Sampling of DEBUG/INFO records from hot paths, per module (LOG_SAMPLE_RATES="model_search=0.1,utils=0.5")
+  or per call (`extra={"sample_rate": 0.01}`). Warnings and errors are always kept.
 
 Usage:
 - Import the logger module in other parts of the project to log messages.
-- Use the logger to record important events, errors, and other information that can help in debugging and monitoring 
+- Use the logger to record important events, errors, and other information that can help in debugging and monitoring
     the application.
+
+    from src.logger import logging, log_context, log_duration, new_id
+
+    with log_context(run_id=new_id()):
+        with log_duration("data_transformation"):
+            ...
+        logging.info("Saved preprocessing object.", extra={"rows": n_rows})
 """
+import atexit
+import json
 import logging  # Import the logging module to enable logging functionality
+import logging.handlers
 import os  # Import the os module to interact with the operating system
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from datetime import datetime  # Import datetime to work with date and time
 
-# Create a log file name based on the current date and time
-LOG_FILE = f"{datetime.now().strftime('%d_%m_%Y_%H_%M_%S')}.log"
 
-# Define the path where the log file will be stored
-logs_path = os.path.join(os.getcwd(), 'logs', LOG_FILE)
+def _parse_sample_rates(text):
+    rates = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        module, _, rate = item.partition("=")
+        rates[module.strip()] = float(rate)
+    return rates
+
+
+@dataclass
+class LoggingConfig:
+    """Configuration class for the logging backend."""
+    log_dir: str = os.path.join(os.getcwd(), 'logs')
+    file_name: str = os.environ.get("LOG_FILE_NAME", "app.log")
+    log_format: str = os.environ.get("LOG_FORMAT", "json")  # "json" or "text"
+    level: int = logging.getLevelName(os.environ.get("LOG_LEVEL", "INFO"))
+    max_bytes: int = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))  # size at which the file is rotated
+    backup_count: int = int(os.environ.get("LOG_BACKUP_COUNT", 5))  # rotated files kept
+    queue_size: int = int(os.environ.get("LOG_QUEUE_SIZE", 10000))  # records waiting to be written at most
+    batch_size: int = 256  # records written between two flushes at most
+    sample_rates: dict = field(default_factory=lambda: _parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", "")))
+
+
+# Context IDs attached to every record logged in the current thread or task, see log_context
+_context = ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; any other attribute came from `extra=` and is written as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "log_context"}
+
+
+def new_id():
+    """
+    Returns a new random ID for a run or a request.
+
+    Returns:
+        str: 16 hexadecimal characters.
+    """
+    return uuid.uuid4().hex[:16]
+
+
+def bind_log_context(**fields):
+    """
+    Adds fields to the context attached to every record logged from now on in this thread or task.
+
+    Args:
+        **fields: The IDs to attach, e.g. run_id or request_id.
+
+    Returns:
+        Token: Pass it to reset_log_context to restore the previous context.
+    """
+    return _context.set({**_context.get(), **fields})
+
+
+def reset_log_context(token):
+    """
+    Restores the context that was in place before the bind_log_context call that returned the token.
+    """
+    _context.reset(token)
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Attaches fields, such as run_id or request_id, to every record logged inside the block.
+    """
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        reset_log_context(token)
+
+
+@contextmanager
+def log_duration(stage, level=logging.INFO, **fields):
+    """
+    Logs how long the block took, as a record with `stage` and `duration_ms` fields.
+
+    Args:
+        stage (str): Name of the stage.
+        level (int): Level of the record.
+        **fields: More fields for the record.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        logging.log(
+            level, f"{stage} finished in {duration_ms}ms",
+            extra={"stage": stage, "duration_ms": duration_ms, **fields},
+            stacklevel=3,  # report the line of the `with` block, not this generator or contextlib
+        )
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object: time, level, logger, module, line, message, context IDs and extra fields.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "log_context", None) or {})
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and name != "sample_rate":
+                entry[name] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class _BatchedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    A size-rotated file handler that leaves flushing to the writer thread, which flushes once per batch.
+
+    The file, and its directory, are only created by the writer thread when the first record is written, so
+    importing the logger touches no files.
+    """
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class _SamplingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the queue without ever waiting, after sampling the low-level ones.
+
+    The work done in the caller's thread is kept to what cannot be deferred: the message is merged with its
+    arguments (which may change after the call) and an exception is formatted while its traceback is current.
+    """
+
+    def __init__(self, log_queue, sample_rates):
+        super().__init__(log_queue)
+        self.sample_rates = sample_rates
+        self.sampled_out = 0
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            rate = getattr(record, "sample_rate", None)
+            if rate is None:
+                rate = self.sample_rates.get(record.module)
+            if rate is not None and random.random() >= rate:
+                self.sampled_out += 1
+                return False
+        return super().filter(record)
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.log_context = _context.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _LogWriter:
+    """
+    Background thread that writes queued records in batches and flushes the file after each batch.
+    """
+
+    def __init__(self, log_queue, handler, queue_handler, config):
+        self.queue = log_queue
+        self.handler = handler
+        self.queue_handler = queue_handler
+        self.config = config
+        self._reported_drops = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _write(self, batch):
+        # The handler lock is held for the whole batch, so a fork never copies a half-flushed file buffer
+        self.handler.acquire()
+        try:
+            for record in batch:
+                self.handler.handle(record)
+            dropped = self.queue_handler.dropped
+            if dropped != self._reported_drops:
+                record = logging.LogRecord(
+                    "src.logger", logging.WARNING, __file__, 0,
+                    f"Dropped {dropped - self._reported_drops} log records because the log queue was full", None, None,
+                )
+                self._reported_drops = dropped
+                self.handler.handle(record)
+            self.handler.flush_batch()
+        finally:
+            self.handler.release()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.config.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if any(record is None for record in batch):  # the stop marker
+                stopping = True
+                batch = [record for record in batch if record is not None]
+            try:
+                self._write(batch)
+            except Exception:
+                logging.lastResort.handle(logging.LogRecord(
+                    "src.logger", logging.ERROR, __file__, 0, "Writing log records failed", None, None,
+                ))
+
+    def stop(self):
+        """
+        Writes every record still queued, then stops the thread.
+        """
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+
+
+_writer = None
+
+
+def configure_logging(config=None):
+    """
+    Routes the root logger through the queue and starts the writer thread, replacing an earlier configuration.
+
+    Args:
+        config (LoggingConfig, optional): Where and how to write. Defaults to the environment settings.
+
+    Returns:
+        LoggingConfig: The configuration in use.
+    """
+    global _writer, LOGS_FILE_PATH
+    config = config or LoggingConfig()
+    if _writer is not None:
+        stop_logging()
+
+    LOGS_FILE_PATH = os.path.join(config.log_dir, config.file_name)
+
+    handler = _BatchedRotatingFileHandler(
+        LOGS_FILE_PATH, mode="a", maxBytes=config.max_bytes, backupCount=config.backup_count, encoding="utf-8",
+        delay=True,  # the directory and file are created with the first record
+    )
+    if config.log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('[ %(asctime)s ]  %(lineno)d %(name)s - %(levelname)s: %(message)s'))
+
+    log_queue = queue.Queue(maxsize=config.queue_size)
+    queue_handler = _SamplingQueueHandler(log_queue, config.sample_rates)
+    root = logging.getLogger()
+    for old_handler in list(root.handlers):
+        root.removeHandler(old_handler)
+    root.addHandler(queue_handler)
+    root.setLevel(config.level)
+
+    _writer = _LogWriter(log_queue, handler, queue_handler, config)
+    return config
+
+
+def stop_logging():
+    """
+    Writes every queued record and closes the log file. Called at interpreter exit.
+    """
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer.handler.close()
+        logging.getLogger().removeHandler(_writer.queue_handler)
+        _writer = None
+
+
+def logging_stats():
+    """
+    Returns the counters of the logging backend.
+
+    Returns:
+        dict: Records waiting in the queue, dropped because it was full, and left out by sampling.
+    """
+    if _writer is None:
+        return {}
+    return {
+        "queued": _writer.queue.qsize(),
+        "dropped": _writer.queue_handler.dropped,
+        "sampled_out": _writer.queue_handler.sampled_out,
+    }
+
+
+def _before_fork():
+    if _writer is not None:
+        _writer.handler.acquire()
+
+
+def _after_fork_in_parent():
+    if _writer is not None:
+        _writer.handler.release()
+
 
-# Create the directory for logs if it doesn't exist
-os.makedirs(logs_path, exist_ok=True)
+def _after_fork_in_child():
+    # The writer thread does not survive a fork: start a new one, writing to the same file, in the child
+    if _writer is not None:
+        configure_logging(_writer.config)
 
-# Define the full path for the log file
-LOGS_FILE_PATH = os.path.join(logs_path, LOG_FILE)
 
 # Configure the logging system
-logging.basicConfig(
-    filename=LOGS_FILE_PATH,  # Set the log file path
-    format='[ %(asctime)s ]  %(lineno)d %(name)s - %(levelname)s: %(message)s',  # Define the log message format
-    level=logging.INFO,  # Set the logging level to INFO
-    filemode='a'  # Append to the log file if it exists
-)
\ No newline at end of file
+LOGS_FILE_PATH = None
+configure_logging()
+atexit.register(stop_logging)
+os.register_at_fork(before=_before_fork, after_in_parent=_after_fork_in_parent, after_in_child=_after_fork_in_child)
@@ -0,0 +1,328 @@
+"""
+This module compiles the fitted preprocessor into flat NumPy tables, so raw records can be turned into model features
+without building a pandas DataFrame or walking the ColumnTransformer.
+
+The preprocessor built by DataTransformation is a ColumnTransformer with
+    SimpleImputer(median) -> StandardScaler                               for the numeric columns, and
+    SimpleImputer(most_frequent) -> OneHotEncoder -> StandardScaler(with_mean=False)   for the categorical columns.
+Once fitted, all of that reduces to a fill value per input column, a category -> output index table per categorical
+column, and an offset and scale per output column: every output value is (raw value - offset) / scale, where the raw
+value of a one-hot column is 1 or 0.
+
+Classes:
+    CompiledPreprocessor: The flat representation, with a transform that takes dicts or arrays.
+
+Functions:
+    compile_preprocessor: Builds a CompiledPreprocessor from the fitted ColumnTransformer.
+    check_parity: Compares a CompiledPreprocessor with the sklearn preprocessor on a block of records.
+    build_probe_frame: Builds records covering every category, used for the parity check.
+
+Usage:
+    compiled = compile_preprocessor(preprocessor)
+    check_parity(compiled, preprocessor, build_probe_frame(compiled))
+    features = compiled.transform([custom_data.get_data_as_dict()])
+"""
+
+import sys
+
+import numpy as np
+
+from src.exception import CustomException, DataValidationError
+from src.components.data_validaton import FEATURE_COLUMNS, check_record_keys
+
+
+class CompiledPreprocessor:
+    """
+    A fitted preprocessor flattened into NumPy arrays.
+
+    Attributes:
+        numerical_columns (list): Numeric input columns, in output order.
+        numerical_fill (np.ndarray): Value used for a missing numeric input.
+        numerical_index (np.ndarray): Output column of each numeric input.
+        categorical_columns (list): Categorical input columns, in output order.
+        categorical_fill (list): Category used for a missing categorical input.
+        category_index (list): One dict per categorical column, mapping category -> output column.
+        offset (np.ndarray): Value subtracted from each output column.
+        scale (np.ndarray): Value each output column is divided by.
+        n_features (int): Number of output columns.
+
+    Methods:
+        encode(records, value_range): Validates records and returns their numeric values and category codes.
+        transform_encoded(numeric, codes): Builds the feature matrix from encoded records.
+        transform(records, value_range): Turns dicts or rows into the feature matrix.
+    """
+
+    def __init__(self, numerical_columns, numerical_fill, numerical_index, categorical_columns,
+                 categorical_fill, category_index, offset, scale):
+        self.numerical_columns = list(numerical_columns)
+        self.numerical_fill = np.asarray(numerical_fill, dtype=float)
+        self.numerical_index = np.asarray(numerical_index, dtype=np.intp)
+        self.categorical_columns = list(categorical_columns)
+        self.categorical_fill = list(categorical_fill)
+        self.category_index = list(category_index)
+        self.offset = np.asarray(offset, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.n_features = len(self.offset)
+
+        # First output column of each categorical column's one-hot block
+        self._category_start = [min(table.values()) for table in self.category_index]
+
+        # Output of every one-hot column when its category is absent / present
+        self._cold = (0.0 - self.offset) / self.scale
+        self._hot = (1.0 - self.offset) / self.scale
+
+    def _columns(self, records):
+        """
+        Splits records into one list of values per input column.
+        """
+        if isinstance(records, dict):
+            records = [records]
+        if len(records) and isinstance(records[0], dict):
+            check_record_keys(records)
+            return {column: [record.get(column) for record in records] for column in FEATURE_COLUMNS}
+
+        # Rows given as sequences are in FEATURE_COLUMNS order
+        return {column: [row[i] for row in records] for i, column in enumerate(FEATURE_COLUMNS)}
+
+    def encode(self, records, value_range=None):
+        """
+        Validates raw records and splits them into numeric values and category codes, with missing
+        values already filled in.
+
+        Args:
+            records: A dict, a list of dicts, or a list of rows with values in FEATURE_COLUMNS order.
+            value_range (tuple, optional): Inclusive (low, high) bounds every numeric value must fall in.
+
+        Returns:
+            tuple: (numeric, codes), where numeric is an (n_records, n_numerical) float array in
+                `numerical_columns` order and codes is an (n_records, n_categorical) int array holding each
+                value's position among its column's categories, in `categorical_columns` order.
+
+        Raises:
+            DataValidationError: If a record lacks a feature column or has an unknown one, or a value is not a
+                number, is out of range, or is an unknown category.
+        """
+        columns = self._columns(records)
+        n_rows = len(next(iter(columns.values())))
+        errors = []
+
+        numeric = np.empty((n_rows, len(self.numerical_columns)))
+        for position, (column, fill) in enumerate(zip(self.numerical_columns, self.numerical_fill)):
+            values = numeric[:, position]
+            bad_rows = []
+            for row, value in enumerate(columns[column]):
+                try:
+                    values[row] = np.nan if value is None or value == "" else float(value)
+                except (TypeError, ValueError):
+                    bad_rows.append(row)
+                    values[row] = np.nan
+            if bad_rows:
+                errors.append(f"{column} is not a number in rows {bad_rows}")
+
+            values[np.isnan(values)] = fill
+            if value_range is not None:
+                out_of_range = np.flatnonzero((values < value_range[0]) | (values > value_range[1]))
+                if len(out_of_range):
+                    errors.append(f"{column} is outside {tuple(value_range)} in rows {out_of_range.tolist()}")
+
+        codes = np.empty((n_rows, len(self.categorical_columns)), dtype=np.intp)
+        for position, (column, fill, table) in enumerate(
+                zip(self.categorical_columns, self.categorical_fill, self.category_index)):
+            start = self._category_start[position]
+            unknown = {}
+            for row, value in enumerate(columns[column]):
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    value = fill
+                index = table.get(value)
+                if index is None:
+                    unknown.setdefault(str(value), []).append(row)
+                    index = start
+                codes[row, position] = index - start
+            if unknown:
+                rows = sorted(row for rows in unknown.values() for row in rows)
+                errors.append(f"{column} has unknown values {sorted(unknown)} in rows {rows}")
+
+        if errors:
+            raise DataValidationError("; ".join(errors), sys, errors=errors)
+
+        return numeric, codes
+
+    def transform_encoded(self, numeric, codes):
+        """
+        Builds the feature matrix from the output of `encode`.
+
+        Args:
+            numeric (np.ndarray): Numeric values, one column per entry of `numerical_columns`.
+            codes (np.ndarray): Category codes, one column per entry of `categorical_columns`.
+
+        Returns:
+            np.ndarray: The feature matrix, one row per record.
+        """
+        n_rows = len(numeric)
+        features = np.empty((n_rows, self.n_features))
+        features[:] = self._cold
+
+        index = self.numerical_index
+        features[:, index] = (numeric - self.offset[index]) / self.scale[index]
+
+        rows = np.arange(n_rows)
+        for position, start in enumerate(self._category_start):
+            index = start + codes[:, position]
+            features[rows, index] = self._hot[index]
+
+        return features
+
+    def transform(self, records, value_range=None):
+        """
+        Turns raw records into the feature matrix, with the same numbers as `preprocessor.transform`.
+
+        Args:
+            records: A dict, a list of dicts, or a list of rows with values in FEATURE_COLUMNS order.
+            value_range (tuple, optional): Inclusive (low, high) bounds every numeric value must fall in.
+
+        Returns:
+            np.ndarray: The feature matrix, one row per record.
+
+        Raises:
+            DataValidationError: If a record lacks a feature column or has an unknown one, or a value is not a
+                number, is out of range, or is an unknown category.
+        """
+        return self.transform_encoded(*self.encode(records, value_range=value_range))
+
+
+def _steps(transformer):
+    """
+    Returns the (name, step) pairs of a Pipeline, or the transformer itself as a single step.
+    """
+    return list(getattr(transformer, "steps", [("", transformer)]))
+
+
+def compile_preprocessor(preprocessor):
+    """
+    Flattens a fitted ColumnTransformer into a CompiledPreprocessor.
+
+    Only the layouts DataTransformation builds are supported: per column group an optional
+    SimpleImputer, an optional OneHotEncoder (without `drop`), and an optional StandardScaler.
+
+    Args:
+        preprocessor: The fitted ColumnTransformer.
+
+    Returns:
+        CompiledPreprocessor: The flat representation.
+
+    Raises:
+        CustomException: If the preprocessor has a layout that cannot be compiled.
+    """
+    try:
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        numerical_columns, numerical_fill, numerical_index = [], [], []
+        categorical_columns, categorical_fill, category_index = [], [], []
+        offset, scale = [], []
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if name == "remainder" and transformer == "drop":
+                continue
+
+            imputer = encoder = scaler = None
+            for _, step in _steps(transformer):
+                if isinstance(step, SimpleImputer) and encoder is None and scaler is None:
+                    imputer = step
+                elif isinstance(step, OneHotEncoder) and scaler is None:
+                    encoder = step
+                elif isinstance(step, StandardScaler):
+                    scaler = step
+                else:
+                    raise ValueError(f"Cannot compile step {step!r} in '{name}'")
+
+            start = len(offset)
+            if encoder is None:
+                fills = imputer.statistics_ if imputer is not None else [np.nan] * len(columns)
+                numerical_columns.extend(columns)
+                numerical_fill.extend(float(fill) for fill in fills)
+                numerical_index.extend(range(start, start + len(columns)))
+                width = len(columns)
+            else:
+                if encoder.drop_idx_ is not None:
+                    raise ValueError(f"Cannot compile OneHotEncoder with drop in '{name}'")
+                fills = imputer.statistics_ if imputer is not None else [None] * len(columns)
+                position = start
+                for column, fill, categories in zip(columns, fills, encoder.categories_):
+                    categorical_columns.append(column)
+                    categorical_fill.append(fill)
+                    category_index.append({category: position + i for i, category in enumerate(categories)})
+                    position += len(categories)
+                width = position - start
+
+            if scaler is not None:
+                offset.extend(scaler.mean_ if scaler.mean_ is not None and scaler.with_mean else np.zeros(width))
+                scale.extend(scaler.scale_ if scaler.scale_ is not None else np.ones(width))
+            else:
+                offset.extend(np.zeros(width))
+                scale.extend(np.ones(width))
+
+        return CompiledPreprocessor(
+            numerical_columns, numerical_fill, numerical_index,
+            categorical_columns, categorical_fill, category_index,
+            offset, scale,
+        )
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def build_probe_frame(compiled):
+    """
+    Builds records that use every known category at least once, with a spread of scores and
+    some missing values, for comparing the compiled and sklearn transforms.
+
+    Args:
+        compiled (CompiledPreprocessor): The compiled preprocessor whose categories to cover.
+
+    Returns:
+        pd.DataFrame: The probe records.
+    """
+    import pandas as pd
+
+    n_rows = max(len(table) for table in compiled.category_index) + 2
+    probe = {}
+    for column, table in zip(compiled.categorical_columns, compiled.category_index):
+        categories = list(table)
+        probe[column] = [categories[row % len(categories)] for row in range(n_rows)]
+        probe[column][-1] = np.nan
+    for i, column in enumerate(compiled.numerical_columns):
+        probe[column] = np.linspace(0, 100, n_rows) + i
+        probe[column][-2] = np.nan
+    return pd.DataFrame(probe)[FEATURE_COLUMNS]
+
+
+def check_parity(compiled, preprocessor, frame, atol=1e-9):
+    """
+    Checks that the compiled transform produces the same numbers as `preprocessor.transform`.
+
+    Args:
+        compiled (CompiledPreprocessor): The compiled preprocessor.
+        preprocessor: The fitted sklearn preprocessor it was compiled from.
+        frame (pd.DataFrame): Records to transform both ways.
+        atol (float): Largest difference allowed between the two results.
+
+    Returns:
+        float: The largest absolute difference found.
+
+    Raises:
+        CustomException: If the results differ by more than `atol`.
+    """
+    expected = preprocessor.transform(frame)
+    if hasattr(expected, "toarray"):
+        expected = expected.toarray()
+    records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    actual = compiled.transform(records)
+
+    if expected.shape != actual.shape:
+        raise CustomException(f"Compiled preprocessor output shape {actual.shape} differs from sklearn {expected.shape}", sys)
+
+    difference = float(np.max(np.abs(actual - expected))) if expected.size else 0.0
+    if difference > atol:
+        raise CustomException(f"Compiled preprocessor differs from sklearn by up to {difference}", sys)
+    return difference
@@ -0,0 +1,204 @@
+"""
+This module contains the MicroBatcher class, which groups concurrent single-record predictions into small batches.
+
+Scoring one row through the preprocessor and model costs almost as much as scoring a hundred, because the fixed
+per-call overhead in pandas and sklearn/XGBoost/CatBoost dominates. Under concurrent load the batcher holds each
+incoming record for at most a few milliseconds, scores everything that arrived in that window with one
+`predict_batch` call, and hands every caller its own result.
+
+Classes:
+    MicroBatcherConfig: Configuration for the batch size and waiting time limits.
+    MicroBatcher: Queues single records and scores them in batches on a background thread.
+
+Usage:
+    batcher = MicroBatcher(PredictPipeline().predict_batch)
+    prediction = batcher.predict(custom_data.get_data_as_dict())
+    print(batcher.stats())
+"""
+
+import os
+import sys
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+@dataclass
+class MicroBatcherConfig:
+    """Configuration class for the micro-batcher."""
+    max_batch_size: int = int(os.environ.get("MICRO_BATCH_MAX_SIZE", 64))  # records scored together at most
+    max_wait_ms: float = float(os.environ.get("MICRO_BATCH_MAX_WAIT_MS", 5))  # longest a record waits for company
+    stats_window: int = 10000  # number of recent queue waits kept for the percentile statistics
+
+
+class MicroBatcher:
+    """
+    Scores concurrent single-record requests together in small batches.
+
+    A background thread takes the first waiting record, keeps collecting until either
+    `max_batch_size` records are in hand or `max_wait_ms` has passed since that record
+    arrived, and scores the batch with one call to `predict_fn`. If the batch fails (for
+    example because one record is invalid), each record is scored on its own so that only
+    the bad record's caller sees the error.
+
+    Methods:
+        submit(record): Queues a record and returns a Future for its prediction.
+        predict(record, timeout): Queues a record and waits for its prediction.
+        stats(): Returns batch-size and queue-wait statistics.
+        close(): Stops the background thread.
+    """
+
+    def __init__(self, predict_fn, config=None):
+        """
+        Initializes the MicroBatcher and starts its background thread.
+
+        Args:
+            predict_fn (callable): Scores a list of record dicts and returns one prediction per record,
+                in order, such as PredictPipeline.predict_batch.
+            config (MicroBatcherConfig, optional): Batch size and waiting time limits.
+        """
+        self.predict_fn = predict_fn
+        self.config = config or MicroBatcherConfig()
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = {}  # batch size -> number of batches of that size
+        self._queue_waits = deque(maxlen=self.config.stats_window)
+        self._requests = 0
+        self._fallbacks = 0
+
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, record):
+        """
+        Queues a record for scoring.
+
+        Args:
+            record (dict): One record with every feature column.
+
+        Returns:
+            Future: Resolves to the prediction for this record.
+        """
+        if self._closed:
+            raise CustomException("MicroBatcher is closed", sys)
+        future = Future()
+        self._queue.put((record, future, time.perf_counter()))
+        return future
+
+    def predict(self, record, timeout=None):
+        """
+        Queues a record and waits for its prediction.
+
+        Args:
+            record (dict): One record with every feature column.
+            timeout (float, optional): Seconds to wait before giving up.
+
+        Returns:
+            float: The prediction for this record.
+        """
+        return self.submit(record).result(timeout=timeout)
+
+    def _collect(self):
+        """
+        Blocks for the first record, then gathers more until the batch is full or the wait is over.
+        """
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first[2] + self.config.max_wait_ms / 1000.0
+
+        while len(batch) < self.config.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop marker back so the loop ends once this batch is scored
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _score(self, batch):
+        """
+        Scores a batch and resolves every caller's future with its own result or error.
+        """
+        records = [record for record, _, _ in batch]
+        try:
+            preds = self.predict_fn(records)
+            for (_, future, _), pred in zip(batch, preds):
+                future.set_result(pred)
+            return
+        except Exception:
+            self._fallbacks += 1
+
+        # Score records one at a time so a single bad record does not fail its neighbours
+        for record, future, _ in batch:
+            try:
+                future.set_result(self.predict_fn([record])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            with self._stats_lock:
+                self._requests += len(batch)
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+                self._queue_waits.extend(started - enqueued for _, _, enqueued in batch)
+
+            try:
+                self._score(batch)
+            except Exception as e:
+                logging.error(f"Micro-batch of {len(batch)} records failed: {e}")
+
+    def stats(self):
+        """
+        Returns batch-size and queue-wait statistics since the batcher started.
+
+        Returns:
+            dict: Request and batch counts, the batch-size distribution, the mean batch size,
+                and queue-wait percentiles in milliseconds over the most recent requests.
+        """
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            waits_ms = np.array(self._queue_waits) * 1000.0
+            report = {
+                "requests": self._requests,
+                "batches": batches,
+                "fallback_batches": self._fallbacks,
+                "mean_batch_size": self._requests / batches if batches else 0.0,
+                "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+                "queue_depth": self._queue.qsize(),
+            }
+
+        if len(waits_ms):
+            p50, p95, p99 = np.percentile(waits_ms, [50, 95, 99])
+            report["queue_wait_ms"] = {"p50": p50, "p95": p95, "p99": p99, "max": waits_ms.max()}
+        return report
+
+    def close(self):
+        """
+        Stops the background thread after the records already queued have been scored.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._worker.join()
@@ -0,0 +1,299 @@
+"""
+This module contains the ModelRegistry class, which keeps the trained model and preprocessor loaded in memory for the
+lifetime of the serving process.
+
+Loading the `model` and `proprocessor` artifacts from disk on every prediction means every request pays for file I/O and
+unpickling. The registry loads both artifacts once, hands the same objects to every request and thread, and swaps in
+a fresh model/preprocessor pair when the files in `artifacts/` change.
+
+Classes:
+    ModelRegistryConfig: Configuration for the artifact paths and the reload check interval.
+    LoadedModel: An immutable snapshot of a model/preprocessor pair and its version.
+    ModelRegistry: A thread-safe holder of the current LoadedModel.
+
+Functions:
+    get_model_registry(): Returns the process-wide ModelRegistry instance.
+
+Usage:
+    registry = get_model_registry()
+    loaded = registry.get()
+    preds = loaded.predict(loaded.preprocessor.transform(features))
+"""
+
+import os
+import sys
+import time
+import threading
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object, file_checksum, file_stamp
+from src.pipeline.compiled_preprocessor import compile_preprocessor, check_parity, build_probe_frame
+
+
+@dataclass
+class ModelRegistryConfig:
+    """Configuration class for the model registry."""
+    model_file_path: str = os.path.join("artifacts", "model")
+    preprocessor_file_path: str = os.path.join("artifacts", "proprocessor")
+    prediction_table_file_path: str = os.path.join("artifacts", "prediction_table")
+    tree_engine_file_path: str = os.path.join("artifacts", "tree_engine")
+    reload_check_interval: float = 2.0  # seconds between checks of the artifact files for changes
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """
+    An immutable snapshot of the artifacts used to serve predictions.
+
+    A request takes one snapshot and uses it from start to finish, so a reload that happens in the middle of the
+    request can never pair the old preprocessor with the new model.
+
+    Attributes:
+        model: The fitted model.
+        preprocessor: The fitted preprocessor matching the model.
+        version (str): Short content hash identifying this model/preprocessor pair.
+        loaded_at (float): Unix time at which the pair was loaded.
+        compiled_preprocessor (CompiledPreprocessor): NumPy version of the preprocessor, or None if it
+            could not be compiled or did not match the sklearn output.
+        prediction_table (PredictionTable): Precomputed predictions for this exact pair, or None.
+        tree_engine (TreeEngine): Flattened version of a tree model, used for small batches, or None.
+
+    Methods:
+        predict(features): Predicts transformed features with the tree engine when it is faster, else the model.
+    """
+    model: object
+    preprocessor: object
+    version: str
+    loaded_at: float
+    compiled_preprocessor: object = None
+    prediction_table: object = None
+    tree_engine: object = None
+
+    def predict(self, features):
+        if self.tree_engine is not None and self.tree_engine.handles(features.shape[0]):
+            return self.tree_engine.predict(features)
+        return self.model.predict(features)
+
+
+class ModelRegistry:
+    """
+    Loads the model and preprocessor once and shares them across requests and threads.
+
+    The registry checks the artifact files at most once every `reload_check_interval` seconds. When they have
+    changed, the new pair is fully loaded before it replaces the current one, so requests keep being served by the
+    old pair during the load and nothing is dropped. If the new files cannot be loaded (for example, because the
+    trainer is still writing them), the old pair stays in service and the load is retried at the next check.
+
+    Methods:
+        get(): Returns the current LoadedModel, reloading it first if the artifacts have changed.
+        reload(force): Checks the artifacts and swaps in a new LoadedModel if they have changed.
+        pin(): Stops the automatic checks, so the current LoadedModel stays in service until reload() is called.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or ModelRegistryConfig()
+        self._current = None
+        self._stamp = None
+        self._next_check = 0.0
+        self._pinned = False
+        self._lock = threading.Lock()
+
+    def _artifact_stamp(self):
+        """
+        Returns the modification time and size of the artifact files, used to detect that they have changed.
+        The prediction table and tree engine are optional, so a missing one is part of the stamp rather than an error.
+        """
+        stamp = [file_stamp(self.config.model_file_path), file_stamp(self.config.preprocessor_file_path)]
+        for file_path in (self.config.prediction_table_file_path, self.config.tree_engine_file_path):
+            try:
+                stamp.append(file_stamp(file_path))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _load(self, stamp):
+        """
+        Loads both artifacts and builds a new LoadedModel from them.
+
+        Args:
+            stamp (tuple): The artifact stamp observed before loading.
+
+        Returns:
+            LoadedModel: The new snapshot, or None if the files changed while they were being read.
+        """
+        model = load_object(file_path=self.config.model_file_path)
+        preprocessor = load_object(file_path=self.config.preprocessor_file_path)
+
+        model_checksum = file_checksum(self.config.model_file_path)
+        preprocessor_checksum = file_checksum(self.config.preprocessor_file_path)
+        version = model_checksum[:6] + preprocessor_checksum[:6]
+
+        prediction_table = self._load_prediction_table(model_checksum, preprocessor_checksum)
+        tree_engine = self._load_tree_engine(model_checksum)
+
+        # The trainer may still be writing the files; only accept the pair if nothing moved while we read it
+        if self._artifact_stamp() != stamp:
+            return None
+
+        return LoadedModel(
+            model=model,
+            preprocessor=preprocessor,
+            version=version,
+            loaded_at=time.time(),
+            compiled_preprocessor=self._compile(preprocessor),
+            prediction_table=prediction_table,
+            tree_engine=tree_engine,
+        )
+
+    def _load_prediction_table(self, model_checksum, preprocessor_checksum):
+        """
+        Loads the prediction table if there is one and it was built from exactly this model and preprocessor.
+
+        Returns:
+            PredictionTable: The table, or None to always use the model.
+        """
+        try:
+            file_stamp(self.config.prediction_table_file_path)
+        except FileNotFoundError:
+            return None
+        try:
+            table = load_object(file_path=self.config.prediction_table_file_path)
+        except Exception as e:
+            logging.warning(f"Serving without the prediction table: {e}")
+            return None
+        if (table.model_checksum, table.preprocessor_checksum) != (model_checksum, preprocessor_checksum):
+            logging.info("Prediction table belongs to a different model, ignoring it")
+            return None
+        return table
+
+    def _load_tree_engine(self, model_checksum):
+        """
+        Loads the tree engine if there is one and it was built from exactly this model.
+
+        Returns:
+            TreeEngine: The engine, or None to always use the model.
+        """
+        try:
+            file_stamp(self.config.tree_engine_file_path)
+        except FileNotFoundError:
+            return None
+        try:
+            engine = load_object(file_path=self.config.tree_engine_file_path)
+        except Exception as e:
+            logging.warning(f"Serving without the tree engine: {e}")
+            return None
+        if engine.model_checksum != model_checksum:
+            logging.info("Tree engine belongs to a different model, ignoring it")
+            return None
+        return engine
+
+    def _compile(self, preprocessor):
+        """
+        Compiles the preprocessor and checks it against sklearn, so the fast path is only used when it gives the
+        same numbers.
+
+        Returns:
+            CompiledPreprocessor: The compiled preprocessor, or None to always use sklearn.
+        """
+        try:
+            compiled = compile_preprocessor(preprocessor)
+            check_parity(compiled, preprocessor, build_probe_frame(compiled))
+            return compiled
+        except Exception as e:
+            logging.warning(f"Serving without the compiled preprocessor: {e}")
+            return None
+
+    def _check(self, force=False):
+        """
+        Checks the artifact files and swaps in a new pair if they have changed. Must be called with the lock held.
+        """
+        self._next_check = time.monotonic() + self.config.reload_check_interval
+        try:
+            stamp = self._artifact_stamp()
+            if force or stamp != self._stamp or self._current is None:
+                loaded = self._load(stamp)
+                if loaded is not None:
+                    # Swapping a single reference is atomic, so readers see either the old pair or the new one
+                    self._current = loaded
+                    self._stamp = stamp
+                    logging.info(f"Loaded model version {loaded.version}")
+        except Exception as e:
+            if self._current is None:
+                raise CustomException(e, sys)
+            logging.error(f"Reloading model artifacts failed, keeping version {self._current.version}: {e}")
+
+        if self._current is None:
+            raise CustomException("Model artifacts changed while they were being loaded", sys)
+        return self._current
+
+    def reload(self, force=False):
+        """
+        Checks the artifact files and swaps in a new model/preprocessor pair if they have changed.
+
+        Args:
+            force (bool): Reload even if the artifact files look unchanged.
+
+        Returns:
+            LoadedModel: The snapshot in service after the check.
+
+        Raises:
+            CustomException: If no model has been loaded yet and the artifacts cannot be loaded.
+        """
+        with self._lock:
+            return self._check(force=force)
+
+    def pin(self):
+        """
+        Stops checking the artifact files on get(). Used by pre-forked workers, whose model is loaded and
+        reloaded by the parent process so that every worker shares its memory.
+
+        Returns:
+            LoadedModel: The snapshot that stays in service.
+        """
+        current = self._current or self.reload()
+        self._pinned = True
+        return current
+
+    def get(self):
+        """
+        Returns the model/preprocessor pair currently in service.
+
+        Returns:
+            LoadedModel: The current snapshot.
+        """
+        current = self._current
+        if current is None:
+            return self.reload()
+
+        if self._pinned:
+            return current
+
+        # Only one thread checks the files; the others carry on with the snapshot they already have
+        if time.monotonic() >= self._next_check and self._lock.acquire(blocking=False):
+            try:
+                return self._check()
+            finally:
+                self._lock.release()
+
+        return current
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """
+    Returns the process-wide ModelRegistry, creating it on first use.
+
+    Returns:
+        ModelRegistry: The shared registry.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -5,33 +5,65 @@ Classes:
     PredictPipeline: A class that encapsulates the logic for loading a trained model, preprocessing input data, making predictions, and postprocessing the results.
 
 Methods:
-    __init__(self, model_path): Initializes the PredictPipeline with the path to the trained model.
-    load_model(self): Loads the trained model from the specified file path.
+    __init__(self, registry): Initializes the PredictPipeline with the registry holding the loaded model.
     preprocess_input(self, input_data): Preprocesses the input data before making predictions.
     predict(self, input_data): Makes predictions using the preprocessed input data.
+    predict_batch(self, records): Validates and scores a whole block of records in one call.
     postprocess_output(self, predictions): Postprocesses the predictions before returning them.
 """
 
+import io
 import sys
 import os
-import pandas as pd
-from src.exception import CustomException
-from src.utils import load_object
+import time
+import numpy as np
+from src.exception import CustomException, DataValidationError
+from src.components.data_validaton import DataValidation, check_records, get_known_categories, SCORE_RANGE
+from src.pipeline.model_registry import get_model_registry
+from src.pipeline.prediction_cache import get_prediction_cache, normalize_record
+from src.pipeline.serving_metrics import get_serving_metrics
 
 
 class PredictPipeline:
     """
     A class to handle the prediction pipeline.
 
-    This class loads the pre-trained model and preprocessor, scales the input features,
-    and makes predictions using the model.
+    This class takes the pre-trained model and preprocessor from the process-wide model registry,
+    scales the input features, and makes predictions using the model. The artifacts are loaded
+    once per process, so creating a PredictPipeline for every request is cheap. Every stage (artifact
+    load, validation, preprocessing, model predict, cache and table lookups) is timed into the
+    serving metrics, per model version.
 
     Methods:
         predict(features): Predicts the target variable for the given input features.
+        predict_batch(records): Validates and predicts a block of records in a single model call.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, registry=None, cache=None, metrics=None):
+        """
+        Initializes the PredictPipeline.
+
+        Args:
+            registry (ModelRegistry, optional): Registry to take the model from. Defaults to the shared registry.
+            cache (PredictionCache, optional): Cache of earlier results. Defaults to the shared cache.
+            metrics (ServingMetrics, optional): Where stage timings are recorded. Defaults to the shared metrics.
+        """
+        self.registry = registry or get_model_registry()
+        self.cache = cache or get_prediction_cache()
+        self.metrics = metrics or get_serving_metrics()
+
+    def _load(self):
+        """
+        Takes the snapshot in service from the registry, timed as the artifact_load stage.
+        """
+        started = time.perf_counter()
+        try:
+            loaded = self.registry.get()
+        except Exception:
+            self.metrics.count_error("artifact_load")
+            raise
+        self.metrics.observe("artifact_load", time.perf_counter() - started, loaded.version)
+        return loaded
 
     def predict(self, features):
         """
@@ -47,19 +79,124 @@ class PredictPipeline:
             CustomException: If an error occurs during prediction.
         """
         try:
-            model_path = 'artifacts\model.pkl'
-            preprocessor_path = 'artifacts\proprocessor.pkl'
-            print("Before Loading")
-            model = load_object(file_path=model_path)
-            preprocessor = load_object(file_path=preprocessor_path)
-            print("After Loading")
-            data_scaled = preprocessor.transform(features)
-            preds = model.predict(data_scaled)
+            loaded = self._load()  # one snapshot per call, so a reload cannot mix model versions
+            with self.metrics.stage("preprocess", loaded.version):
+                data_scaled = loaded.preprocessor.transform(features)
+            with self.metrics.stage("model_predict", loaded.version):
+                preds = loaded.predict(data_scaled)
+            return preds
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def predict_batch(self, records):
+        """
+        Predicts the target variable for a whole block of records at once.
+
+        The records are validated column by column, then scaled with a single `preprocessor.transform`
+        and scored with a single `model.predict`, instead of once per record. Lists of dicts skip pandas
+        entirely and go through the compiled preprocessor when the loaded model has one, and are answered
+        from the precomputed prediction table when one was exported for the model.
+
+        Args:
+            records: A pd.DataFrame, a list of dicts (one per record) or of rows with values in FEATURE_COLUMNS
+                order, or CSV text/bytes with a header row.
+
+        Returns:
+            preds (numpy.ndarray): Predicted values, in the same order as the input records.
+
+        Raises:
+            DataValidationError: If any record is invalid.
+            CustomException: If an error occurs during prediction.
+        """
+        try:
+            loaded = self._load()
+
+            if isinstance(records, (list, tuple)):
+                # Checked before anything else: a missing key would share the cache entry of a None value
+                records = check_records(records)
+                if loaded.compiled_preprocessor is not None and records:
+                    return self._predict_records(loaded, records)
+
+            # Imported here: the record path above, which serving uses, never needs pandas
+            import pandas as pd
+
+            if isinstance(records, pd.DataFrame):
+                df = records.reset_index(drop=True)
+            elif isinstance(records, (str, bytes)):
+                text = records.decode("utf-8") if isinstance(records, bytes) else records
+                df = pd.read_csv(io.StringIO(text))
+            else:
+                df = pd.DataFrame.from_records(list(records))
+
+            if df.empty:
+                raise DataValidationError("No records to predict", sys)
+
+            with self.metrics.stage("validate", loaded.version):
+                features = DataValidation().validate_features(
+                    df, known_categories=get_known_categories(loaded.preprocessor)
+                )
+            with self.metrics.stage("preprocess", loaded.version):
+                data_scaled = loaded.preprocessor.transform(features)
+            with self.metrics.stage("model_predict", loaded.version):
+                preds = loaded.predict(data_scaled)
             return preds
 
+        except DataValidationError:
+            raise
         except Exception as e:
             raise CustomException(e, sys)
 
+    def _score_records(self, loaded, records):
+        """
+        Scores record dicts through the compiled preprocessor, answering from the prediction table where possible.
+        """
+        compiled, stage = loaded.compiled_preprocessor, self.metrics.stage
+        with stage("validate", loaded.version):
+            numeric, codes = compiled.encode(records, value_range=SCORE_RANGE)
+        if loaded.prediction_table is not None:
+            # Answer from the precomputed table, and only send rows it does not cover to the model
+            with stage("table_lookup", loaded.version):
+                preds, missed = loaded.prediction_table.lookup(numeric, codes)
+            if not missed.any():
+                return preds
+            numeric, codes = numeric[missed], codes[missed]
+
+        with stage("preprocess", loaded.version):
+            data_scaled = compiled.transform_encoded(numeric, codes)
+        with stage("model_predict", loaded.version):
+            scored = loaded.predict(data_scaled)
+        if loaded.prediction_table is None:
+            return scored
+        preds[missed] = scored
+        return preds
+
+    def _predict_records(self, loaded, records):
+        """
+        Scores record dicts, serving repeated inputs from the prediction cache and scoring only the rest.
+        """
+        if not self.cache.enabled:
+            return self._score_records(loaded, records)
+
+        with self.metrics.stage("cache_lookup", loaded.version):
+            keys = [normalize_record(record) for record in records]
+            cached = self.cache.get_many(loaded.version, keys)
+        missing = [row for row, value in enumerate(cached) if value is None]
+        if not missing:
+            return np.array(cached, dtype=float)
+
+        try:
+            scored = self._score_records(loaded, [records[row] for row in missing])
+        except DataValidationError:
+            # Validate the whole block again so the errors name rows of the caller's input
+            loaded.compiled_preprocessor.encode(records, value_range=SCORE_RANGE)
+            raise
+
+        self.cache.put_many(loaded.version, [keys[row] for row in missing], scored.tolist())
+        preds = np.array([0.0 if value is None else value for value in cached], dtype=float)
+        preds[missing] = scored
+        return preds
+
 
 class CustomData:
     """
@@ -78,6 +215,7 @@ class CustomData:
         writing_score (int): Writing score of the student.
 
     Methods:
+        get_data_as_dict(): Returns the input data as a single record dict.
         get_data_as_data_frame(): Converts the input data into a pandas DataFrame.
     """
 
@@ -111,6 +249,23 @@ class CustomData:
         self.reading_score = reading_score
         self.writing_score = writing_score
 
+    def get_data_as_dict(self):
+        """
+        Returns the input data as one record, keyed by feature column.
+
+        Returns:
+            dict: The input data, in the form accepted by PredictPipeline.predict_batch.
+        """
+        return {
+            "gender": self.gender,
+            "race_ethnicity": self.race_ethnicity,
+            "parental_level_of_education": self.parental_level_of_education,
+            "lunch": self.lunch,
+            "test_preparation_course": self.test_preparation_course,
+            "reading_score": self.reading_score,
+            "writing_score": self.writing_score,
+        }
+
     def get_data_as_data_frame(self):
         """
         Converts the input data into a pandas DataFrame.
@@ -122,6 +277,8 @@ class CustomData:
             CustomException: If an error occurs during DataFrame creation.
         """
         try:
+            import pandas as pd
+
             custom_data_input_dict = {
                 "gender": [self.gender],
                 "race_ethnicity": [self.race_ethnicity],
@@ -0,0 +1,202 @@
+"""
+This module contains the PredictionCache class, a bounded, thread-safe cache of prediction results.
+
+Real traffic repeats inputs heavily: the categorical fields have only a handful of values each and the scores are
+integers from 0 to 100. The cache keys each result on the normalized feature values and the version of the model that
+produced it, so repeated requests skip preprocessing and model evaluation entirely, and a model reload can never
+serve a stale result.
+
+Classes:
+    PredictionCacheConfig: Configuration for the cache size and entry lifetime.
+    PredictionCache: An LRU cache with a time-to-live and hit/miss/eviction counters.
+
+Functions:
+    normalize_record(record): Builds the cache key of a record.
+    get_prediction_cache(): Returns the process-wide PredictionCache instance.
+
+Usage:
+    cache = get_prediction_cache()
+    keys = [normalize_record(record) for record in records]
+    cached = cache.get_many(loaded.version, keys)
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from src.components.data_validaton import FEATURE_COLUMNS, NUMERICAL_COLUMNS
+
+
+@dataclass
+class PredictionCacheConfig:
+    """Configuration class for the prediction cache."""
+    max_size: int = int(os.environ.get("PREDICTION_CACHE_SIZE", 10000))  # entries kept at most; 0 disables the cache
+    ttl_seconds: float = float(os.environ.get("PREDICTION_CACHE_TTL", 3600))  # lifetime of an entry
+
+
+def normalize_record(record):
+    """
+    Builds the cache key of a record: its feature values in FEATURE_COLUMNS order, with scores converted to floats
+    so that 72, 72.0 and "72" share an entry. Categories are kept exactly as given, because a value that differs
+    only in spacing or case is a different (and possibly invalid) input to the model.
+
+    Args:
+        record (dict): One record.
+
+    Returns:
+        tuple: The key.
+    """
+    key = []
+    for column in FEATURE_COLUMNS:
+        value = record.get(column)
+        if value is None or value == "":
+            value = None
+        elif not isinstance(value, (str, int, float)):
+            value = repr(value)  # lists and dicts are invalid anyway, but must still make a hashable key
+        elif column in NUMERICAL_COLUMNS:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                pass
+            else:
+                value = None if value != value else value  # NaN is missing, like None
+        key.append(value)
+    return tuple(key)
+
+
+class PredictionCache:
+    """
+    A bounded LRU cache of predictions, tied to the model version that produced them.
+
+    All entries belong to one model version. Asking for a different version drops every entry, so results
+    from a model that has been reloaded away are never returned.
+
+    Methods:
+        get_many(version, keys): Returns the cached prediction for each key, or None for a miss.
+        put_many(version, keys, values): Stores predictions.
+        stats(): Returns the hit/miss/eviction counters.
+        clear(): Drops every entry.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or PredictionCacheConfig()
+        self._entries = OrderedDict()  # key -> (prediction, expiry time)
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.config.max_size > 0
+
+    def _switch_version(self, version):
+        """
+        Drops every entry if they belong to another model version. Must be called with the lock held.
+        """
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get_many(self, version, keys):
+        """
+        Looks up predictions.
+
+        Args:
+            version (str): Version of the model in service.
+            keys (list): Keys built with normalize_record.
+
+        Returns:
+            list: The cached prediction for each key, or None where there is none.
+        """
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            self._switch_version(version)
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[0])
+        return results
+
+    def put_many(self, version, keys, values):
+        """
+        Stores predictions, evicting the least recently used entries beyond `max_size`.
+
+        Args:
+            version (str): Version of the model that made the predictions.
+            keys (list): Keys built with normalize_record.
+            values: One prediction per key.
+        """
+        expires = time.monotonic() + self.config.ttl_seconds
+        with self._lock:
+            self._switch_version(version)
+            for key, value in zip(keys, values):
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.config.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Size, capacity, hits, misses, hit rate, evictions, expirations and version invalidations.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.config.max_size,
+                "model_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def clear(self):
+        """
+        Drops every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """
+    Returns the process-wide PredictionCache, creating it on first use.
+
+    Returns:
+        PredictionCache: The shared cache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+    return _cache
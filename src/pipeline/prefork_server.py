@@ -0,0 +1,439 @@
+"""
+This module contains the PreforkServer class, which serves the Flask app from several worker processes that share
+one copy of the loaded model.
+
+`app.run()` is a single process, so serving uses one core however many the machine has. Running N independent
+processes would use N cores but also load N copies of the model. The pre-fork server instead:
+
+1. binds the listening socket and loads the model, preprocessor and their compiled forms in the parent process,
+   warms them up with one prediction, and freezes the garbage collector so it never writes to the objects it has
+   seen (which would copy their pages);
+2. forks N workers, which inherit the socket and the loaded model. Their pages are shared copy-on-write with the
+   parent, and the arrays of memory-mapped artifacts are shared through the page cache, so each worker adds little
+   more than its own interpreter state. Every worker accepts connections from the same socket;
+3. watches the workers: a worker that dies is replaced, a worker whose heartbeat stops (a stuck request) is killed
+   and replaced, and a worker that has served `max_requests` requests exits and is replaced, which bounds the
+   memory that leaks or slowly copied pages can take;
+4. checks the artifact files every `reload_check_interval` seconds. When they change, the parent loads the new
+   model once and replaces the workers one at a time, so every worker is forked from the new model and capacity
+   never drops by more than one worker. The workers never reload on their own (their registry is pinned).
+
+Each worker writes its health to a table in shared memory (pid, model version, requests, errors, heartbeat, busy
+time), which any worker reports on GET /workers, along with the resident and proportional memory of each process.
+
+Signals to the parent: SIGTERM or SIGINT stop the server after the requests in progress, SIGHUP replaces every
+worker with a freshly loaded model, SIGTTIN / SIGTTOU add or remove a worker, and SIGUSR2 is forwarded to every
+worker to profile its next requests (see src.profiler).
+
+Classes:
+    PreforkServerConfig: Configuration for the address, the number of workers and the recycling limits.
+    PreforkServer: Loads the model, forks and supervises the workers.
+
+Usage:
+    from app import app
+    PreforkServer(app).run()
+"""
+
+import os
+import gc
+import sys
+import mmap
+import time
+import random
+import signal
+import socket
+from dataclasses import dataclass
+
+import numpy as np
+from flask import jsonify
+from werkzeug.serving import make_server
+
+from src.exception import CustomException
+from src.logger import logging, configure_logging, stop_logging, LoggingConfig
+from src.profiler import install_signal_handler
+from src.pipeline.model_registry import get_model_registry
+from src.pipeline.predict_pipeline import PredictPipeline
+from src.pipeline.compiled_preprocessor import build_probe_frame
+
+
+@dataclass
+class PreforkServerConfig:
+    """Configuration class for the pre-fork server."""
+    host: str = os.environ.get("HOST", "0.0.0.0")
+    port: int = int(os.environ.get("PORT", 5000))
+    workers: int = int(os.environ.get("WEB_WORKERS", min(os.cpu_count() or 1, 64)))
+    max_workers: int = 64  # size of the health table, the most workers SIGTTIN can add
+    backlog: int = 1024  # connections waiting to be accepted at most
+    max_requests: int = int(os.environ.get("WORKER_MAX_REQUESTS", 10000))  # requests a worker serves before it is replaced; 0 for no limit
+    max_requests_jitter: float = 0.1  # random extra fraction of max_requests, so workers are not all replaced at once
+    worker_timeout: float = float(os.environ.get("WORKER_TIMEOUT", 30))  # seconds without a heartbeat before a worker is killed
+    graceful_timeout: float = 30.0  # seconds a stopping worker may take to finish its request
+    reload_check_interval: float = 2.0  # seconds between checks of the artifact files for changes
+    poll_interval: float = 0.2  # seconds between two rounds of supervision in the parent
+
+
+# One row per worker, written only by that worker (the parent clears it)
+WORKER_SLOT = np.dtype([
+    ("pid", "i8"),
+    ("generation", "i8"),  # model generation the worker was forked with
+    ("model_version", "S16"),
+    ("started_at", "f8"),
+    ("heartbeat", "f8"),  # last time the worker was seen idle or finishing a request
+    ("busy_since", "f8"),  # start of the request in progress, 0 when idle
+    ("requests", "i8"),
+    ("errors", "i8"),  # responses with a 5xx status
+])
+
+# One row for the parent, written only by the parent
+SERVER_SLOT = np.dtype([
+    ("pid", "i8"),
+    ("generation", "i8"),
+    ("model_version", "S16"),
+    ("started_at", "f8"),
+    ("workers", "i8"),
+    ("spawned", "i8"),
+    ("recycled", "i8"),
+    ("killed", "i8"),
+    ("died", "i8"),
+    ("reloads", "i8"),
+])
+
+
+def _memory(pid):
+    """
+    Returns the resident, proportional and shared memory of a process in megabytes, from /proc (Linux only).
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as file_obj:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in file_obj if line.endswith("kB\n")}
+    except OSError:
+        return {}
+    return {
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+        "shared_mb": round((fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)) / 1024, 1),
+    }
+
+
+class _TrackedApp:
+    """
+    WSGI middleware that records the requests, errors and busy time of a worker in its health slot.
+    """
+
+    def __init__(self, app, slot):
+        self.app = app
+        self.slot = slot
+
+    def __call__(self, environ, start_response):
+        slot = self.slot
+        slot["busy_since"] = time.time()
+
+        def tracked_start_response(status, headers, exc_info=None):
+            if status.startswith("5"):
+                slot["errors"] += 1
+            return start_response(status, headers, exc_info)
+
+        try:
+            return self.app(environ, tracked_start_response)
+        finally:
+            slot["requests"] += 1
+            slot["busy_since"] = 0.0
+            slot["heartbeat"] = time.time()
+
+
+class PreforkServer:
+    """
+    Serves a WSGI app from pre-forked worker processes that share the parent's loaded model.
+
+    Methods:
+        run(): Loads the model, starts the workers and supervises them until SIGTERM or SIGINT.
+        health(): Returns the state of the server and of every worker.
+    """
+
+    def __init__(self, app, config=None, registry=None):
+        """
+        Initializes the PreforkServer and adds the GET /workers health route to the app.
+
+        Args:
+            app (Flask): The app to serve.
+            config (PreforkServerConfig, optional): Address, workers and limits.
+            registry (ModelRegistry, optional): Registry holding the model. Defaults to the shared registry.
+        """
+        self.app = app
+        self.config = config or PreforkServerConfig()
+        self.registry = registry or get_model_registry()
+        if not 1 <= self.config.workers <= self.config.max_workers:
+            raise CustomException(f"The number of workers must be between 1 and {self.config.max_workers}", sys)
+
+        # Anonymous shared memory, inherited by every worker: the server row, then one row per worker
+        self._memory = mmap.mmap(-1, SERVER_SLOT.itemsize + WORKER_SLOT.itemsize * self.config.max_workers)
+        self.server = np.ndarray(1, dtype=SERVER_SLOT, buffer=self._memory)[0]
+        self.slots = np.ndarray(self.config.max_workers, dtype=WORKER_SLOT, buffer=self._memory, offset=SERVER_SLOT.itemsize)
+
+        self._socket = None
+        self._workers = {}  # pid -> slot index, in the parent
+        self._retiring = {}  # pid -> time by which a worker sent SIGTERM must have exited, in the parent
+        self._target = self.config.workers
+        self._stopping = False
+        self._reload_requested = False
+
+        app.add_url_rule("/workers", "workers", lambda: jsonify(self.health()))
+
+    def health(self):
+        """
+        Returns the state of the server and of every worker, read from the shared health table.
+
+        Returns:
+            dict: "server" (pid, model generation and version, worker and replacement counts) and "workers",
+                one dict per worker with its pid, model version, requests, errors, time busy on the current
+                request, time since its last heartbeat and memory use.
+        """
+        now = time.time()
+        server = {name: self.server[name].item() for name in SERVER_SLOT.names}
+        server["model_version"] = server["model_version"].decode()
+        server["uptime_s"] = round(now - server["started_at"], 3)
+        workers = []
+        for index, slot in enumerate(self.slots):
+            if slot["pid"] == 0:
+                continue
+            workers.append({
+                "index": index,
+                "pid": int(slot["pid"]),
+                "generation": int(slot["generation"]),
+                "model_version": slot["model_version"].decode(),
+                "current": int(slot["generation"]) == server["generation"],
+                "uptime_s": round(now - slot["started_at"], 3),
+                "requests": int(slot["requests"]),
+                "errors": int(slot["errors"]),
+                "busy_s": round(now - slot["busy_since"], 3) if slot["busy_since"] else 0.0,
+                "heartbeat_age_s": round(now - slot["heartbeat"], 3) if slot["heartbeat"] else None,
+                **_memory(int(slot["pid"])),
+            })
+        return {"server": dict(server, **_memory(server["pid"])), "workers": workers}
+
+    def _load_model(self, force=False):
+        """
+        Loads the model in the parent if the artifacts changed, warms it up and freezes the garbage collector.
+
+        Returns:
+            bool: True if a new model version was loaded.
+        """
+        loaded = self.registry.reload(force=force)
+        if loaded.version.encode() == self.server["model_version"] and not force:
+            return False
+
+        if loaded.compiled_preprocessor is not None:
+            # Predict once for one row and for a batch, so lazily built state exists before the workers copy it
+            features = loaded.preprocessor.transform(build_probe_frame(loaded.compiled_preprocessor))
+            loaded.predict(features[:1])
+            loaded.predict(features)
+        gc.collect()
+        gc.freeze()  # objects in the permanent generation are never touched by the collector, in any process
+
+        self.server["generation"] += 1
+        self.server["model_version"] = loaded.version.encode()
+        self.server["reloads"] += 1
+        logging.info(f"Parent {os.getpid()} loaded model version {loaded.version} (generation {int(self.server['generation'])})")
+        return True
+
+    def _spawn(self, index):
+        """
+        Forks a worker into a free slot of the health table.
+        """
+        self.slots[index] = np.zeros((), dtype=WORKER_SLOT)
+        gc.freeze()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self._worker(index)
+            except BaseException as e:
+                logging.error(f"Worker {index} (pid {os.getpid()}) failed to start: {e}")
+                stop_logging()
+            finally:
+                os._exit(1)  # never return into the parent's code
+        self.slots[index]["pid"] = pid
+        self._workers[pid] = index
+        self.server["spawned"] += 1
+
+    def _worker(self, index):
+        """
+        Runs in the forked worker: serves requests from the shared socket until stopped or recycled.
+        """
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+        for signum in (signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, signal.SIG_IGN)  # meant for the parent, which forwards what the workers need
+        install_signal_handler()  # SIGUSR2 profiles the next requests
+
+        # Workers share one log directory, each with its own file, so size rotation never races between processes
+        configure_logging(LoggingConfig(file_name=f"worker-{index}.log"))
+        random.seed()
+        self.registry.pin()  # the parent reloads, then replaces the workers
+
+        # A background thread does not survive the fork: start the micro-batcher again if the app uses one
+        app_module = sys.modules.get(self.app.import_name)
+        if getattr(app_module, "micro_batcher", None) is not None:
+            from src.pipeline.micro_batcher import MicroBatcher
+            app_module.micro_batcher = MicroBatcher(PredictPipeline().predict_batch)
+
+        slot = self.slots[index]
+        slot["generation"] = self.server["generation"]
+        slot["model_version"] = self.server["model_version"]
+        slot["started_at"] = slot["heartbeat"] = time.time()
+
+        limit = self.config.max_requests
+        if limit:
+            limit += int(random.random() * self.config.max_requests_jitter * limit)
+
+        server = make_server(self.config.host, self.config.port, _TrackedApp(self.app, slot), fd=self._socket.fileno())
+        server.socket.setblocking(False)  # a worker that loses the race for a connection goes back to waiting
+        server.timeout = 1.0  # handle_request returns at least once a second, to check for SIGTERM
+        logging.info(f"Worker {index} (pid {os.getpid()}) serving model version {slot['model_version'].decode()}")
+        try:
+            while not stopping and not (limit and slot["requests"] >= limit):
+                server.handle_request()
+                slot["heartbeat"] = time.time()
+        except Exception as e:
+            logging.error(f"Worker {index} (pid {os.getpid()}) failed: {e}")
+            stop_logging()
+            os._exit(1)
+
+        logging.info(f"Worker {index} (pid {os.getpid()}) exiting after {int(slot['requests'])} requests")
+        server.server_close()
+        stop_logging()
+        os._exit(0)
+
+    def _reap(self):
+        """
+        Collects the workers that have exited and frees their slots.
+        """
+        while self._workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            index = self._workers.pop(pid, None)
+            if index is None:
+                continue
+            slot = self.slots[index]
+            code = os.waitstatus_to_exitcode(status)
+            if self._retiring.pop(pid, None) is not None:
+                pass
+            elif code == 0:
+                self.server["recycled"] += 1
+                logging.info(f"Worker {index} (pid {pid}) recycled after {int(slot['requests'])} requests")
+            else:
+                self.server["died"] += 1
+                logging.warning(f"Worker {index} (pid {pid}) exited with code {code}")
+            self.slots[index] = np.zeros((), dtype=WORKER_SLOT)
+
+    def _supervise(self):
+        """
+        One round of supervision: replace missing workers, kill stuck ones, and retire one stale worker at a time.
+        """
+        now = time.time()
+        for pid, index in list(self._workers.items()):
+            heartbeat = self.slots[index]["heartbeat"]
+            if pid in self._retiring:
+                if now > self._retiring[pid]:
+                    logging.error(f"Worker {index} (pid {pid}) did not stop within {self.config.graceful_timeout}s, killing it")
+                    os.kill(pid, signal.SIGKILL)
+            elif heartbeat and now - heartbeat > self.config.worker_timeout:
+                logging.error(f"Worker {index} (pid {pid}) sent no heartbeat for {now - heartbeat:.1f}s, killing it")
+                self.server["killed"] += 1
+                self._retiring[pid] = now  # replaced right away; killed again at the next round if still alive
+                os.kill(pid, signal.SIGKILL)
+
+        live = [pid for pid in self._workers if pid not in self._retiring]
+        for _ in range(self._target - len(live)):
+            used = set(self._workers.values())
+            self._spawn(next(index for index in range(self.config.max_workers) if index not in used))
+        for pid in live[self._target:]:
+            self._retire(pid)
+
+        # Replace workers still serving an older model one at a time, once every other worker is up
+        if not self._retiring and all(self.slots[index]["heartbeat"] for index in self._workers.values()):
+            stale = [pid for pid, index in self._workers.items() if self.slots[index]["generation"] != self.server["generation"]]
+            if stale:
+                self._retire(stale[0])
+        self.server["workers"] = len(self._workers)
+
+    def _retire(self, pid):
+        """
+        Asks a worker to exit after its request in progress.
+        """
+        self._retiring[pid] = time.time() + self.config.graceful_timeout
+        os.kill(pid, signal.SIGTERM)
+
+    def _handle_signal(self, signum, frame):
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            self._stopping = True
+        elif signum == signal.SIGHUP:
+            self._reload_requested = True
+        elif signum == signal.SIGTTIN:
+            self._target = min(self._target + 1, self.config.max_workers)
+        elif signum == signal.SIGTTOU:
+            self._target = max(self._target - 1, 1)
+        elif signum == signal.SIGUSR2:
+            for pid in list(self._workers):
+                os.kill(pid, signal.SIGUSR2)
+
+    def _shutdown(self):
+        """
+        Stops every worker, waiting up to `graceful_timeout` for their requests to finish.
+        """
+        for pid in list(self._workers):
+            self._retire(pid)
+        deadline = time.monotonic() + self.config.graceful_timeout
+        while self._workers and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(self.config.poll_interval)
+        for pid in list(self._workers):
+            os.kill(pid, signal.SIGKILL)
+        while self._workers:
+            pid, _ = os.waitpid(-1, 0)
+            self._workers.pop(pid, None)
+        self._socket.close()
+        logging.info("Pre-fork server stopped")
+
+    def run(self):
+        """
+        Binds the socket, loads the model, forks the workers and supervises them until SIGTERM or SIGINT.
+
+        Raises:
+            CustomException: If the socket cannot be bound or the model cannot be loaded.
+        """
+        try:
+            self._socket = socket.create_server(
+                (self.config.host, self.config.port), backlog=self.config.backlog, reuse_port=False,
+            )
+            self._socket.setblocking(False)
+            self.server["pid"] = os.getpid()
+            self.server["started_at"] = time.time()
+            self._load_model()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU, signal.SIGUSR2):
+            signal.signal(signum, self._handle_signal)
+        logging.info(f"Pre-fork server {os.getpid()} listening on {self.config.host}:{self.config.port} with {self._target} workers")
+        print(f"Serving on http://{self.config.host}:{self.config.port} with {self._target} workers (pid {os.getpid()})")
+
+        next_check = time.monotonic() + self.config.reload_check_interval
+        while not self._stopping:
+            self._reap()
+            if self._stopping:
+                break
+            if self._reload_requested or time.monotonic() >= next_check:
+                try:
+                    self._load_model(force=self._reload_requested)
+                except Exception as e:
+                    logging.error(f"Reloading the model in the parent failed, workers keep their model: {e}")
+                self._reload_requested = False
+                next_check = time.monotonic() + self.config.reload_check_interval
+            self._supervise()
+            time.sleep(self.config.poll_interval)
+
+        self._shutdown()
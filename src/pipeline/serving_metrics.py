@@ -0,0 +1,283 @@
+"""
+This module contains the ServingMetrics class, which records how long each stage of serving a prediction takes and
+how many requests and errors there were, and renders them as text for a metrics endpoint.
+
+Each stage (form parsing, CustomData construction, artifact load, preprocessing, model predict, template render, ...)
+is timed with `time.perf_counter` and recorded in a histogram with fixed, logarithmically spaced buckets: recording
+a duration is one bisect and one counter increment under a lock, whatever the traffic, and memory does not grow
+with it. The p50/p95/p99 are estimated from the buckets, to within about 9% of the true value.
+
+Stages that depend on the model (artifact load, preprocessing, model predict, cache and table lookups) are recorded
+per model version, so a reload that makes serving slower shows up as a new series rather than being averaged in.
+
+The text follows the Prometheus exposition format, one summary per stage and version:
+
+    serving_stage_seconds{stage="model_predict",model_version="3f2a9c0e1b7d",quantile="0.99"} 0.000412
+    serving_stage_seconds_count{stage="model_predict",model_version="3f2a9c0e1b7d"} 1520
+    serving_requests_total{route="/predict",status="200"} 1518
+
+Classes:
+    ServingMetricsConfig: Configuration for the histogram buckets and the quantiles reported.
+    LatencyHistogram: A fixed-bucket histogram of durations.
+    ServingMetrics: Thread-safe stage histograms and request/error counters.
+
+Functions:
+    get_serving_metrics(): Returns the process-wide ServingMetrics instance.
+
+Usage:
+    metrics = get_serving_metrics()
+    with metrics.stage("preprocess", version=loaded.version):
+        data_scaled = loaded.preprocessor.transform(features)
+    metrics.count_request("/predict", 200, seconds)
+    text = metrics.render()
+"""
+
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+@dataclass
+class ServingMetricsConfig:
+    """Configuration class for the serving metrics."""
+    enabled: bool = os.environ.get("SERVING_METRICS", "1") != "0"  # set SERVING_METRICS=0 to record nothing
+    min_seconds: float = 1e-6  # upper bound of the first bucket
+    max_seconds: float = 100.0  # durations beyond it all fall in the last bucket
+    buckets_per_doubling: int = 4  # bucket bounds grow by 2 ** (1 / 4), about 19%, from one to the next
+    quantiles: tuple = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """
+    A histogram of durations over fixed bucket bounds. Not thread-safe on its own; ServingMetrics holds the lock.
+
+    Methods:
+        observe(seconds): Records one duration.
+        quantile(q): Estimates a quantile from the bucket counts.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket holds everything above the last bound
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """
+        Estimates a quantile, interpolating geometrically inside the bucket it falls in.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float: The estimated duration in seconds, or NaN if nothing was recorded.
+        """
+        if not self.count:
+            return float("nan")
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                lower = self.bounds[index - 1] if index > 0 else upper / 2
+                fraction = (rank - seen) / count
+                return min(lower * (upper / lower) ** fraction, self.max)
+            seen += count
+        return self.max
+
+
+class ServingMetrics:
+    """
+    Records stage durations and request/error counters for the serving process.
+
+    Methods:
+        stage(name, version): Context manager that times a block and counts it as an error if it raises.
+        observe(name, seconds, version): Records a duration measured by the caller.
+        count_error(name, version): Counts an error in a stage.
+        count_request(route, status, seconds): Counts a finished request and records its duration.
+        snapshot(): Returns the histograms and counters as a dict.
+        render(): Returns the metrics in the Prometheus text format.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or ServingMetricsConfig()
+        bounds, bound = [], self.config.min_seconds
+        growth = 2 ** (1 / self.config.buckets_per_doubling)
+        while bound < self.config.max_seconds:
+            bounds.append(bound)
+            bound *= growth
+        self._bounds = bounds
+        self._lock = threading.Lock()
+        self._stages = {}  # (stage, model version) -> LatencyHistogram
+        self._requests = {}  # (route, status) -> LatencyHistogram of whole-request durations
+        self._errors = {}  # (stage, model version) -> count
+        self._started = time.time()
+
+    @property
+    def enabled(self):
+        return self.config.enabled
+
+    def observe(self, name, seconds, version=None):
+        """
+        Records the duration of one stage.
+
+        Args:
+            name (str): The stage.
+            seconds (float): Its duration.
+            version (str, optional): Version of the model the stage used, for stages that depend on it.
+        """
+        if not self.config.enabled:
+            return
+        with self._lock:
+            histogram = self._stages.get((name, version))
+            if histogram is None:
+                histogram = self._stages[(name, version)] = LatencyHistogram(self._bounds)
+            histogram.observe(seconds)
+
+    def count_error(self, name, version=None):
+        """
+        Counts an error raised in a stage.
+
+        Args:
+            name (str): The stage.
+            version (str, optional): Version of the model the stage used.
+        """
+        if not self.config.enabled:
+            return
+        with self._lock:
+            self._errors[(name, version)] = self._errors.get((name, version), 0) + 1
+
+    @contextmanager
+    def stage(self, name, version=None):
+        """
+        Times the enclosed block as one stage; if it raises, the error is counted and re-raised.
+
+        Args:
+            name (str): The stage.
+            version (str, optional): Version of the model the stage uses.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.count_error(name, version)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, version)
+
+    def count_request(self, route, status, seconds):
+        """
+        Counts a finished request and records how long it took.
+
+        Args:
+            route (str): The route that served it.
+            status (int): The HTTP status code of the response.
+            seconds (float): Time from receiving the request to returning the response.
+        """
+        if not self.config.enabled:
+            return
+        with self._lock:
+            histogram = self._requests.get((route, status))
+            if histogram is None:
+                histogram = self._requests[(route, status)] = LatencyHistogram(self._bounds)
+            histogram.observe(seconds)
+
+    @staticmethod
+    def _summary(histogram, quantiles):
+        return {
+            "count": histogram.count,
+            "sum": histogram.sum,
+            "max": histogram.max,
+            **{str(q): histogram.quantile(q) for q in quantiles},
+        }
+
+    def snapshot(self):
+        """
+        Returns the recorded metrics.
+
+        Returns:
+            dict: "uptime_seconds", and "stages", "requests" and "errors", each keyed by its label tuple.
+                Histograms are summarized as count, sum, max and one value per configured quantile.
+        """
+        quantiles = self.config.quantiles
+        with self._lock:
+            return {
+                "uptime_seconds": time.time() - self._started,
+                "stages": {key: self._summary(histogram, quantiles) for key, histogram in self._stages.items()},
+                "requests": {key: self._summary(histogram, quantiles) for key, histogram in self._requests.items()},
+                "errors": dict(self._errors),
+            }
+
+    @staticmethod
+    def _labels(**labels):
+        return ",".join(f'{name}="{value}"' for name, value in labels.items() if value is not None)
+
+    def render(self):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: One summary per stage and model version, one per route and status, the error counters and the
+                uptime, from which a single scrape gives the request throughput.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP serving_uptime_seconds Seconds since the serving metrics started.",
+            "# TYPE serving_uptime_seconds gauge",
+            f"serving_uptime_seconds {snapshot['uptime_seconds']:.3f}",
+        ]
+
+        def summary(metric, description, series, label_names):
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} summary")
+            for key, values in sorted(series.items(), key=lambda item: tuple(map(str, item[0]))):
+                labels = self._labels(**dict(zip(label_names, key)))
+                for q in self.config.quantiles:
+                    lines.append(f'{metric}{{{labels},quantile="{q}"}} {values[str(q)]:.6g}')
+                lines.append(f"{metric}_sum{{{labels}}} {values['sum']:.6g}")
+                lines.append(f"{metric}_count{{{labels}}} {values['count']}")
+
+        summary("serving_stage_seconds", "Time spent in each serving stage.", snapshot["stages"], ("stage", "model_version"))
+        summary("serving_request_seconds", "Time spent serving each request.", snapshot["requests"], ("route", "status"))
+
+        lines.append("# HELP serving_requests_total Requests served, by route and status.")
+        lines.append("# TYPE serving_requests_total counter")
+        for (route, status), values in sorted(snapshot["requests"].items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            lines.append(f"serving_requests_total{{{self._labels(route=route, status=status)}}} {values['count']}")
+
+        lines.append("# HELP serving_stage_errors_total Errors raised in each serving stage.")
+        lines.append("# TYPE serving_stage_errors_total counter")
+        for (name, version), count in sorted(snapshot["errors"].items(), key=lambda item: tuple(map(str, item[0]))):
+            lines.append(f"serving_stage_errors_total{{{self._labels(stage=name, model_version=version)}}} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_serving_metrics():
+    """
+    Returns the process-wide ServingMetrics, creating it on first use.
+
+    Returns:
+        ServingMetrics: The shared metrics.
+    """
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = ServingMetrics()
+    return _metrics
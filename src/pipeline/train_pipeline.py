@@ -1,9 +1,335 @@
-# The purpose of the train_pipeline in the src/components is to orchestrate the entire training process of the machine learning model.
-# This typically includes:
-# 1. Data Loading: Reading and preprocessing the data from various sources.
-# 2. Feature Engineering: Transforming raw data into features that can be used by the machine learning model.
-# 3. Model Training: Training the machine learning model using the prepared data.
-# 4. Model Evaluation: Evaluating the performance of the trained model using validation data.
-# 5. Model Saving: Saving the trained model to disk for later use.
-# 6. Logging: Logging important information and metrics throughout the training process for monitoring and debugging purposes.
+"""
+This module contains the TrainPipeline class, which orchestrates the entire training process of the machine learning
+model as a graph of stages: data ingestion -> data transformation -> model training.
 
+Each stage is skipped when nothing it depends on has changed since its last run. Its key is a hash of:
+- the content of its input files (the source data, or the outputs of the stages before it),
+- its configuration,
+- the source code of the modules that implement it.
+Its outputs are kept under artifacts/ and recorded in artifacts/pipeline_state.json with their checksums, so a
+stage whose key is unchanged and whose outputs are still in place is not run again. Because downstream keys are
+built from the checksums of upstream outputs, a change to the model grid only retrains, and a change to the
+data reruns everything, but a stage that reruns and produces identical files does not invalidate the ones after it.
+
+Classes:
+    Stage: One step of the pipeline: how to run it, what it depends on and what it writes.
+    TrainPipeline: Runs the stages in order, skipping the unchanged ones, and reports timings and cache hits.
+
+Usage:
+    python -m src.pipeline.train_pipeline [--force transformation] [--profile transformation "search:Random Forest"]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import importlib
+from dataclasses import dataclass, field
+from typing import Callable
+
+from src.exception import CustomException
+from src.logger import logging, bind_log_context, reset_log_context, new_id
+from src.profiler import get_profiler
+from src.utils import file_checksum, file_stamp, load_array
+from src.components.data_ingestion import DataIngestion, DataIngestionConfig
+from src.components.data_transformation import DataTransformation, DataTransformationConfig
+from src.components.model_trainer import ModelTrainer, ModelTrainerConfig
+from src.components.prediction_table import PredictionTableConfig
+from src.components.tree_engine import TreeEngineConfig
+from src.components.model_selection import ModelSelectionConfig
+from src.components.model_distillation import DistillationConfig
+
+
+@dataclass
+class TrainPipelineConfig:
+    """Configuration class for the training pipeline."""
+    state_file_path: str = os.path.join("artifacts", "pipeline_state.json")
+
+
+@dataclass
+class Stage:
+    """
+    One step of the training pipeline.
+
+    Attributes:
+        name (str): Name of the stage.
+        run (Callable): Takes the results of the upstream stages (dict name -> result) and returns this stage's result.
+        load (Callable): Rebuilds the result of a skipped stage from its outputs and the recorded result.
+        upstream (list): Names of the stages whose outputs this one reads.
+        inputs (list): Files read that no stage produces, such as the source data.
+        config (object): The stage's configuration, or a list of configurations; every field is part of its key.
+        modules (list): Modules whose source code is part of its key.
+        outputs (list): Files the stage writes. Outputs missing after a run are treated as optional.
+    """
+    name: str
+    run: Callable
+    load: Callable
+    upstream: list = field(default_factory=list)
+    inputs: list = field(default_factory=list)
+    config: object = None
+    modules: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+
+
+def _config_fields(config):
+    """
+    Returns every setting of a config object, including the class-level defaults the repo's config classes
+    declare without type annotations (which dataclasses.asdict would miss).
+    """
+    fields = {
+        name: value for name, value in vars(type(config)).items()
+        if not name.startswith("_") and not callable(value) and not isinstance(value, (property, staticmethod, classmethod))
+    }
+    fields.update(vars(config))
+    return {name: repr(value) for name, value in sorted(fields.items())}
+
+
+def _file_stamp(file_path):
+    mtime_ns, size = file_stamp(file_path)
+    return {"size": size, "mtime_ns": mtime_ns}
+
+
+class TrainPipeline:
+    """
+    Runs the training stages in dependency order and skips the ones whose inputs have not changed.
+
+    Methods:
+        run(force): Runs the pipeline and returns the result of every stage.
+        report(): Returns the status, reason and duration of every stage of the last run.
+    """
+
+    def __init__(self, config=None, stages=None):
+        self.config = config or TrainPipelineConfig()
+        self.stages = stages or self._default_stages()
+        self.last_report = []
+
+    def _default_stages(self):
+        ingestion_config = DataIngestionConfig()
+        transformation_config = DataTransformationConfig()
+        trainer_config = ModelTrainerConfig()
+
+        ingestion_outputs = [ingestion_config.raw_data_path, ingestion_config.train_data_path, ingestion_config.test_data_path]
+        if ingestion_config.export_csv:
+            ingestion_outputs += [os.path.splitext(path)[0] + ".csv" for path in ingestion_outputs]
+
+        def run_ingestion(results):
+            return DataIngestion().initiate_data_ingestion()
+
+        def run_transformation(results):
+            train_path, test_path = results["ingestion"]
+            return DataTransformation().initiate_data_transformation(train_path, test_path)
+
+        def run_training(results):
+            train_arr, test_arr, _ = results["transformation"]
+            return ModelTrainer().initiate_model_trainer(train_arr, test_arr)
+
+        return [
+            Stage(
+                name="ingestion",
+                run=run_ingestion,
+                load=lambda result: (ingestion_config.train_data_path, ingestion_config.test_data_path),
+                inputs=[ingestion_config.source_data_path],
+                config=ingestion_config,
+                modules=["src.components.data_ingestion", "src.utils"],
+                outputs=ingestion_outputs,
+            ),
+            Stage(
+                name="transformation",
+                run=run_transformation,
+                load=lambda result: (
+                    load_array(transformation_config.train_array_file_path),
+                    load_array(transformation_config.test_array_file_path),
+                    transformation_config.preprocessor_obj_file_path,
+                ),
+                upstream=["ingestion"],
+                config=transformation_config,
+                modules=["src.components.data_transformation", "src.components.data_validaton", "src.utils"],
+                outputs=[
+                    transformation_config.train_array_file_path,
+                    transformation_config.test_array_file_path,
+                    transformation_config.preprocessor_obj_file_path,
+                ],
+            ),
+            Stage(
+                name="training",
+                run=run_training,
+                load=lambda result: result,
+                upstream=["transformation"],
+                config=[trainer_config, ModelSelectionConfig(), DistillationConfig()],
+                modules=[
+                    "src.components.model_trainer", "src.components.model_search",
+                    "src.components.prediction_table", "src.components.tree_engine",
+                    "src.components.model_selection", "src.components.model_distillation", "src.utils",
+                ],
+                outputs=[
+                    trainer_config.trained_model_file_path,
+                    trainer_config.search_trace_file_path,
+                    PredictionTableConfig().prediction_table_file_path,
+                    TreeEngineConfig().tree_engine_file_path,
+                    ModelSelectionConfig().selection_report_file_path,
+                    DistillationConfig().distillation_report_file_path,
+                    DistillationConfig().teacher_model_file_path,
+                ],
+            ),
+        ]
+
+    def _read_state(self):
+        if not os.path.exists(self.config.state_file_path):
+            return {}
+        try:
+            with open(self.config.state_file_path) as file_obj:
+                return json.load(file_obj).get("stages", {})
+        except (OSError, ValueError):
+            logging.warning(f"Ignoring unreadable pipeline state {self.config.state_file_path}")
+            return {}
+
+    def _write_state(self, state):
+        os.makedirs(os.path.dirname(self.config.state_file_path) or ".", exist_ok=True)
+        temporary_path = self.config.state_file_path + ".tmp"
+        with open(temporary_path, "w") as file_obj:
+            json.dump({"stages": state, "last_run": self.last_report}, file_obj, indent=2)
+        os.replace(temporary_path, self.config.state_file_path)
+
+    def _stage_key(self, stage, state):
+        """
+        Hashes everything a stage depends on: its input files, the outputs of its upstream stages, its
+        configuration and the source of its modules.
+        """
+        description = {
+            "inputs": {path: file_checksum(path) for path in stage.inputs},
+            "upstream": {
+                name: {path: recorded["checksum"] for path, recorded in state[name]["outputs"].items()}
+                for name in stage.upstream
+            },
+            "config": self._stage_config(stage.config),
+            "code": {module: file_checksum(importlib.import_module(module).__file__) for module in stage.modules},
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def _stage_config(config):
+        if config is None:
+            return {}
+        if isinstance(config, (list, tuple)):
+            return {type(item).__name__: _config_fields(item) for item in config}
+        return _config_fields(config)
+
+    @staticmethod
+    def _outputs_intact(record):
+        """
+        Checks that the recorded outputs of a stage are still there and untouched since it ran.
+        """
+        for path, recorded in record["outputs"].items():
+            if not os.path.exists(path):
+                return False
+            stamp = _file_stamp(path)
+            if stamp["size"] != recorded["size"] or stamp["mtime_ns"] != recorded["mtime_ns"]:
+                return False
+        return True
+
+    def run(self, force=()):
+        """
+        Runs every stage whose key changed or whose outputs are gone, and reuses the others.
+
+        Args:
+            force (iterable, optional): Names of stages to run even if they are unchanged. The stages after
+                them run again only if the forced stage's outputs change.
+
+        Returns:
+            dict: Stage name -> result (paths, arrays or the test R2 score, as returned by each component).
+
+        Raises:
+            CustomException: If a stage fails. The state of the stages that completed is kept.
+        """
+        token = bind_log_context(run_id=new_id())  # every record of this run carries the same run_id
+        try:
+            unknown = set(force) - {stage.name for stage in self.stages}
+            if unknown:
+                raise ValueError(f"Unknown stages {sorted(unknown)}")
+
+            state = self._read_state()
+            results, self.last_report = {}, []
+
+            for stage in self.stages:
+                started = time.perf_counter()
+                key = self._stage_key(stage, state)
+                previous = state.get(stage.name)
+
+                if stage.name in force:
+                    reason = "forced"
+                elif previous is None:
+                    reason = "no previous run"
+                elif previous["key"] != key:
+                    reason = "inputs changed"
+                elif not self._outputs_intact(previous):
+                    reason = "outputs changed or missing"
+                else:
+                    reason = None
+
+                if reason is None:
+                    results[stage.name] = stage.load(previous.get("result"))
+                    status = "hit"
+                else:
+                    logging.info(f"Running stage {stage.name}: {reason}")
+                    with get_profiler().profile(stage.name):
+                        result = stage.run(results)
+                    results[stage.name] = result
+                    outputs = {
+                        path: dict(checksum=file_checksum(path), **_file_stamp(path))
+                        for path in stage.outputs if os.path.exists(path)
+                    }
+                    state[stage.name] = {
+                        "key": key,
+                        "outputs": outputs,
+                        "result": float(result) if isinstance(result, (int, float)) else None,
+                        "duration": time.perf_counter() - started,
+                        "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    }
+                    status = "miss"
+
+                self.last_report.append({
+                    "stage": stage.name,
+                    "status": status,
+                    "reason": reason or "unchanged",
+                    "duration": round(time.perf_counter() - started, 3),
+                })
+                logging.info(
+                    f"Stage {stage.name}: {status} ({reason or 'unchanged'}) in {self.last_report[-1]['duration']}s",
+                    extra={"stage": stage.name, "status": status, "duration_ms": round((time.perf_counter() - started) * 1000, 3)},
+                )
+                self._write_state(state)
+
+            return results
+
+        except Exception as e:
+            raise CustomException(e, sys)
+        finally:
+            reset_log_context(token)
+
+    def report(self):
+        """
+        Returns the status of every stage of the last run.
+
+        Returns:
+            list: One dict per stage with its cache status ("hit" or "miss"), the reason and the duration in seconds.
+        """
+        return list(self.last_report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the training pipeline, skipping unchanged stages.")
+    parser.add_argument("--force", nargs="*", default=[], help="stages to run even if unchanged")
+    parser.add_argument("--profile", nargs="*", default=[], help="stages to profile, or search:<model name>; see src.profiler")
+    parser.add_argument("--profile-mode", choices=["deterministic", "sampled"], help="defaults to PROFILE_MODE")
+    args = parser.parse_args()
+
+    for target in args.profile:
+        get_profiler().arm(target, count=None, mode=args.profile_mode)
+
+    pipeline = TrainPipeline()
+    results = pipeline.run(force=args.force)
+    for entry in pipeline.report():
+        print(f"{entry['stage']:<15} {entry['status']:<5} {entry['duration']:>9.3f}s  {entry['reason']}")
+    print(results["training"])  # this will give the r2_score
@@ -0,0 +1,374 @@
+"""
+profiler.py
+
+This module provides on-demand profiling of serving requests and training stages. A profile is only taken for a
+target that has been armed, for a number of runs of it, and the targets can be armed while the process is running:
+
+- "predict" and "predict_batch": the /predict and /predict_batch requests, armed with SIGUSR2 (PROFILE_SIGNAL_REQUESTS
+  requests per signal; the pre-fork server forwards it to every worker), with POST /profile when PROFILING_ENDPOINT=1,
+  or from startup with PROFILE_REQUESTS;
+- "ingestion", "transformation", "training": the stages of TrainPipeline;
+- "search:<model name>": the hyperparameter search of one model in evaluate_models, gathered from every search
+  worker into one profile. "search" alone matches the search of every model, and any "prefix" matches every
+  "prefix:..." target.
+
+Stages are armed with PROFILE_STAGES="transformation,search:Random Forest" (profiled on every run) or with
+`get_profiler().arm(...)`.
+
+Two kinds of profile are written to PROFILE_DIR (`profiles/` by default), one file per profiled run:
+- "deterministic" (the default): every call, with cProfile, saved as a `.pstats` file for pstats, snakeviz or
+  flameprof;
+- "sampled": the stack of the profiled thread every PROFILE_SAMPLE_INTERVAL_MS, saved as collapsed stacks
+  (`.folded`, one "frame;frame;frame count" line per stack) for flamegraph.pl or speedscope. It slows the profiled
+  code much less than cProfile does, so the timings stay close to the real ones.
+
+While nothing is armed, `profile()` returns a shared no-op context manager after one attribute check.
+
+Classes:
+    ProfilingConfig: Output directory, default mode and the targets armed at startup.
+    Profiler: Arms targets and takes and writes the profiles.
+
+Functions:
+    get_profiler(): Returns the process-wide Profiler instance.
+    profile_call(mode, interval, function, *args): Calls a function under a profile, for worker processes.
+    install_signal_handler(): Arms the next requests on SIGUSR2.
+
+Usage:
+    from src.profiler import get_profiler
+
+    with get_profiler().profile("transformation"):
+        ...
+
+    get_profiler().arm("predict", count=20, mode="sampled")   # or: kill -USR2 <pid>
+"""
+import os
+import re
+import sys
+import time
+import pstats
+import signal
+import cProfile
+import itertools
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+
+from src.logger import logging
+
+MODES = ("deterministic", "sampled")
+_EXTENSIONS = {"deterministic": "pstats", "sampled": "folded"}
+_NOT_PROFILED = nullcontext()
+
+
+def _parse_targets(text):
+    return [target.strip() for target in text.split(",") if target.strip()]
+
+
+@dataclass
+class ProfilingConfig:
+    """Configuration class for the profiler."""
+    profile_dir: str = os.environ.get("PROFILE_DIR", os.path.join(os.getcwd(), "profiles"))
+    mode: str = os.environ.get("PROFILE_MODE", "deterministic")  # "deterministic" (cProfile) or "sampled"
+    sample_interval: float = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", 5)) / 1000  # seconds between samples
+    requests: int = int(os.environ.get("PROFILE_REQUESTS", 0))  # /predict requests profiled from startup
+    signal_requests: int = int(os.environ.get("PROFILE_SIGNAL_REQUESTS", 10))  # /predict and /predict_batch requests armed by SIGUSR2
+    stages: list = field(default_factory=lambda: _parse_targets(os.environ.get("PROFILE_STAGES", "")))  # profiled on every run
+    endpoint: bool = os.environ.get("PROFILING_ENDPOINT", "0") == "1"  # allow arming over HTTP with POST /profile
+    history: int = 100  # paths of the latest profiles kept for status()
+
+
+class _StatsData:
+    """
+    Raw cProfile statistics in the form pstats.Stats loads, for statistics that came from another process.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class _Sampler:
+    """
+    Records the stack of one thread at a fixed interval, from a background thread.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+
+# Whether the current thread is being profiled: cProfile cannot nest in one thread, so inner targets are skipped
+_active = threading.local()
+
+
+def _start(mode, interval):
+    if mode == "deterministic":
+        session = cProfile.Profile()
+        session.enable()
+    else:
+        session = _Sampler(threading.get_ident(), interval)
+        session.start()
+    _active.mode = mode
+    return session
+
+
+def _stop(mode, session):
+    _active.mode = None
+    if mode == "deterministic":
+        session.disable()
+        session.create_stats()
+        return session.stats
+    return session.stop()
+
+
+def profile_call(mode, interval, function, *args, **kwargs):
+    """
+    Calls a function under a profile and returns its result with the raw profile data, which can be sent back
+    from a worker process and written by the parent with Profiler.save.
+
+    Args:
+        mode (str): "deterministic" or "sampled".
+        interval (float): Seconds between samples, for the sampled mode.
+        function: The function to call.
+
+    Returns:
+        tuple: (result, profile data), with None as data if this thread was already being profiled.
+    """
+    if getattr(_active, "mode", None):
+        return function(*args, **kwargs), None
+    session = _start(mode, interval)
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        data = _stop(mode, session)
+    return result, data
+
+
+class Profiler:
+    """
+    Profiles the next runs of armed targets and writes one profile file per run.
+
+    Methods:
+        arm(target, count, mode): Profiles the next `count` runs of a target.
+        disarm(target): Stops profiling a target, or every target.
+        profile(target): Context manager that profiles the block if the target is armed.
+        take(target): Uses up one armed run of a target, for code that gathers the profile itself.
+        save(target, mode, pieces): Writes a profile, merging the pieces gathered from several workers.
+        status(): Returns the armed targets and the latest profiles written.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or ProfilingConfig()
+        self._armed = {}  # target -> [runs left (None for every run), mode]
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self.written = deque(maxlen=self.config.history)
+        if self.config.requests:
+            self.arm("predict", self.config.requests)
+        for target in self.config.stages:
+            self.arm(target, None)
+
+    @property
+    def enabled(self):
+        return bool(self._armed)
+
+    def arm(self, target, count=1, mode=None):
+        """
+        Profiles the next `count` runs of a target.
+
+        Args:
+            target (str): e.g. "predict", "transformation" or "search:Random Forest".
+            count (int, optional): Runs to profile; None profiles every run until disarmed, 0 disarms.
+            mode (str, optional): "deterministic" or "sampled". Defaults to the configured mode.
+
+        Raises:
+            ValueError: If the mode is unknown.
+        """
+        mode = mode or self.config.mode
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}', expected one of {MODES}")
+        with self._lock:
+            if count == 0:
+                self._armed.pop(target, None)
+            else:
+                self._armed[target] = [count, mode]
+        logging.info(f"Profiling armed for {target}: {'every run' if count is None else f'{count} runs'}, {mode}")
+
+    def disarm(self, target=None):
+        """
+        Stops profiling a target, or every target when none is given.
+        """
+        with self._lock:
+            if target is None:
+                self._armed.clear()
+            else:
+                self._armed.pop(target, None)
+
+    def take(self, target):
+        """
+        Uses up one armed run of the target, or of the prefix before its ":".
+
+        Returns:
+            str: The mode to profile this run with, or None if the target is not armed.
+        """
+        if not self._armed:
+            return None
+        with self._lock:
+            for key in (target, target.split(":")[0]):
+                armed = self._armed.get(key)
+                if armed is not None:
+                    if armed[0] is not None:
+                        armed[0] -= 1
+                        if armed[0] <= 0:
+                            del self._armed[key]
+                    return armed[1]
+        return None
+
+    def profile(self, target):
+        """
+        Profiles the block if the target is armed, and writes the profile when it ends.
+
+        Args:
+            target (str): The name the run is profiled under.
+
+        Returns:
+            A context manager.
+        """
+        if not self._armed:
+            return _NOT_PROFILED
+        return self._profiled(target)
+
+    @contextmanager
+    def _profiled(self, target):
+        mode = None if getattr(_active, "mode", None) else self.take(target)
+        if mode is None:
+            yield
+            return
+        session = _start(mode, self.config.sample_interval)
+        try:
+            yield
+        finally:
+            self.save(target, mode, [_stop(mode, session)])
+
+    def save(self, target, mode, pieces):
+        """
+        Writes one profile, merging the data of every piece (e.g. one per worker task).
+
+        Args:
+            target (str): The name the run was profiled under.
+            mode (str): The mode the pieces were taken in.
+            pieces (list): Raw data from the profiling sessions, as returned by profile_call; None entries are skipped.
+
+        Returns:
+            str: The path of the profile, or None if there was nothing to write.
+        """
+        pieces = [piece for piece in pieces if piece]
+        if not pieces:
+            logging.info(f"No {target} profile written: the run ended before the first sample")
+            return None
+        try:
+            os.makedirs(self.config.profile_dir, exist_ok=True)
+            name = re.sub(r"[^A-Za-z0-9_.-]+", "_", target)
+            file_path = os.path.join(
+                self.config.profile_dir,
+                f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence)}.{_EXTENSIONS[mode]}",
+            )
+            if mode == "deterministic":
+                stats = pstats.Stats(_StatsData(pieces[0]))
+                for piece in pieces[1:]:
+                    stats.add(_StatsData(piece))
+                stats.dump_stats(file_path)
+            else:
+                counts = sum((Counter(piece) for piece in pieces), Counter())
+                with open(file_path, "w") as file_obj:
+                    file_obj.writelines(f"{stack} {count}\n" for stack, count in counts.most_common())
+            self.written.append(file_path)
+            logging.info(f"Wrote the {target} profile to {file_path}", extra={"profile": file_path})
+            return file_path
+        except Exception as e:
+            # A profile that cannot be written must never fail the request or stage it was taken from
+            logging.warning(f"Writing the {target} profile failed: {e}")
+            return None
+
+    def status(self):
+        """
+        Returns the armed targets and the latest profiles written.
+
+        Returns:
+            dict: {"armed": {target: {"remaining", "mode"}}, "written": [paths]}.
+        """
+        with self._lock:
+            armed = {target: {"remaining": count, "mode": mode} for target, (count, mode) in self._armed.items()}
+        return {"armed": armed, "written": list(self.written)}
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """
+    Returns the process-wide Profiler, creating it on first use.
+
+    Returns:
+        Profiler: The shared profiler.
+    """
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = Profiler()
+    return _profiler
+
+
+SIGNAL_TARGETS = ("predict", "predict_batch")  # armed by SIGUSR2
+
+
+def _arm_signal_targets():
+    profiler = get_profiler()
+    for target in SIGNAL_TARGETS:
+        profiler.arm(target, profiler.config.signal_requests)
+
+
+def _on_signal(signum, frame):
+    # The handler interrupts the main thread anywhere, possibly while it holds the profiler or logging locks, so
+    # the arming is left to another thread
+    threading.Thread(target=_arm_signal_targets, daemon=True).start()
+
+
+def install_signal_handler():
+    """
+    Arms the next PROFILE_SIGNAL_REQUESTS /predict and /predict_batch requests whenever the process receives SIGUSR2.
+
+    Returns:
+        bool: Whether the handler was installed; signal handlers can only be set from the main thread.
+    """
+    if not hasattr(signal, "SIGUSR2") or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signal.SIGUSR2, _on_signal)
+    return True
@@ -26,26 +26,45 @@ Usage:
 
 import os
 import sys
+import time
+import hashlib
 import dill
-import pickle
 
 import numpy as np
-import pandas as pd
-
-from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
 
+# pandas and scikit-learn are imported inside the functions that need them: the serving path only uses the
+# artifact helpers here, and should not pay for importing the training stack at startup
 from src.exception import CustomException
+from src.logger import logging
+from src.artifact_store import save_artifact, load_artifact, artifact_version, is_artifact, CURRENT_FILE
+
+def _resolve_object_path(file_path):
+    """
+    Returns the path an object is actually stored at: the given path, or, when it does not exist, the legacy
+    pickle `<path>.pkl` written before the artifacts moved to artifact directories.
+    """
+    if not os.path.exists(file_path) and os.path.isfile(file_path + ".pkl"):
+        return file_path + ".pkl"
+    return file_path
 
 def save_object(file_path, obj):
     """
-    Saves an object to the specified file path using dill.
+    Saves an object to the specified path.
+
+    Paths ending in .pkl are written as a single dill pickle. Any other path is written as an artifact
+    directory (see src.artifact_store), whose arrays are memory-mapped on load and shared between processes.
 
     Args:
         file_path (str): Path to save the object.
         obj: Object to be saved.
+
+    Returns:
+        str: The content checksum of the saved artifact, or None for a pickle.
     """
     try:
+        if not file_path.endswith(".pkl"):
+            return save_artifact(file_path, obj)
+
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
 
@@ -55,9 +74,13 @@ def save_object(file_path, obj):
     except Exception as e:
         raise CustomException(e, sys)
     
-def evaluate_models(X_train, y_train,X_test,y_test,models,param):
+def evaluate_models(X_train, y_train,X_test,y_test,models,param,search=None):
     """
-    Evaluates multiple machine learning models using GridSearchCV.
+    Evaluates multiple machine learning models using a cross-validated grid search.
+
+    The search of every model runs in parallel across (model, parameter combination, fold) tasks,
+    see src.components.model_search. With the default grid strategy the selected parameters are the
+    same as with GridSearchCV(cv=3).
 
     Args:
         X_train: Training features.
@@ -66,25 +89,30 @@ def evaluate_models(X_train, y_train,X_test,y_test,models,param):
         y_test: Testing target.
         models: Dictionary of models to evaluate.
         param: Dictionary of hyperparameters for each model.
+        search (ModelSearch, optional): The search to run, which keeps its trace for the caller.
+            Defaults to a parallel grid search.
 
     Returns:
         dict: A dictionary containing model names as keys and their R2 scores as values.
     """
     try:
-        report = {}
+        from sklearn.metrics import r2_score
+        from src.components.model_search import ModelSearch
 
-        for model_name, model in models.items():
-            para = param[model_name]
-        
-        # for i in range(len(list(models))):
-          #  model = list(models.values())[i]
-          #  para=param[list(models.keys())[i]]
+        report = {}
 
-            gs = GridSearchCV(model,para,cv=3) # you can also apply randomSearchCV
-            gs.fit(X_train,y_train)  # to select the best parameter
+        search = search or ModelSearch()
+        best_params = search.run(models, param, X_train, y_train)
 
-            model.set_params(**gs.best_params_)  # set the best parameter to the model
+        for model_name, model in models.items():
+            model.set_params(**best_params[model_name])  # set the best parameter to the model
+            started = time.perf_counter()
             model.fit(X_train,y_train)
+            search.refit_times[model_name] = time.perf_counter() - started
+            logging.info(
+                f"Refitted {model_name} in {search.refit_times[model_name]:.3f}s",
+                extra={"stage": "refit", "model": model_name, "duration_ms": round(search.refit_times[model_name] * 1000, 3)},
+            )
 
             # model.fit(X_train,y_train) # train the model
 
@@ -106,10 +134,11 @@ def evaluate_models(X_train, y_train,X_test,y_test,models,param):
     
 def load_object(file_path):
     """
-    Load a serialized object from a file using pickle.
+    Load a serialized object from an artifact directory, or from a file using dill (which can read everything
+    save_object wrote with dill, unlike plain pickle).
     
     Parameters:
-    file_path (str): The path to the file containing the serialized object, which was previously converted into a byte stream (serialized) and saved.
+    file_path (str): The path to the artifact directory or to the file containing the serialized object, which was previously converted into a byte stream (serialized) and saved.
     
     Returns:
     object: The original object that was converted into a byte stream and stored, now restored back to its usable state (deserialized).
@@ -118,7 +147,240 @@ def load_object(file_path):
     CustomException: If an error occurs during loading.
     """
     try:
+        file_path = _resolve_object_path(file_path)
+        if is_artifact(file_path):
+            return load_artifact(file_path)
         with open(file_path, "rb") as file_obj:
-            return pickle.load(file_obj)
+            return dill.load(file_obj)
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def file_checksum(file_path, chunk_size=1 << 20, length=None):
+    """
+    Computes the SHA-256 checksum of a file, reading it in chunks. For an artifact directory, returns the
+    checksum of its current version, which is recorded at save time and covers every file of the version.
+
+    Args:
+        file_path (str): Path of the file to hash.
+        chunk_size (int): Number of bytes read at a time.
+        length (int, optional): Only hash the first `length` bytes, to check that a file was appended to.
+
+    Returns:
+        str: The hexadecimal digest of the file contents.
+
+    Raises:
+        CustomException: If the file cannot be read.
+    """
+    try:
+        file_path = _resolve_object_path(file_path)
+        if length is None and is_artifact(file_path):
+            return artifact_version(file_path)
+        digest = hashlib.sha256()
+        remaining = float("inf") if length is None else length
+        with open(file_path, "rb") as file_obj:
+            while remaining > 0:
+                chunk = file_obj.read(int(min(chunk_size, remaining)))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+        return digest.hexdigest()
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def file_stamp(file_path):
+    """
+    Returns the modification time and size of a file, used to notice cheaply that it has changed. For an
+    artifact directory, these are the ones of its `current.json`, which is replaced on every save.
+
+    Args:
+        file_path (str): Path of the file or artifact directory.
+
+    Returns:
+        tuple: (mtime in nanoseconds, size in bytes).
+    """
+    file_path = _resolve_object_path(file_path)
+    if is_artifact(file_path):
+        file_path = os.path.join(file_path, CURRENT_FILE)
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+def save_table(df, file_path):
+    """
+    Saves a DataFrame as Parquet or CSV, depending on the file extension.
+
+    Parquet keeps the column types and is read back far faster than CSV, which is kept as an export option.
+
+    Args:
+        df (pd.DataFrame): The table to save.
+        file_path (str): Path ending in ".parquet" or ".csv".
+
+    Raises:
+        CustomException: If the extension is not supported or the file cannot be written.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet":
+            df.to_parquet(file_path, index=False)
+        elif extension == ".csv":
+            df.to_csv(file_path, index=False, header=True)
+        else:
+            raise ValueError(f"Unsupported table format '{extension}' for {file_path}")
     except Exception as e:
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
+
+def load_table(file_path, columns=None):
+    """
+    Loads a DataFrame saved by save_table.
+
+    Args:
+        file_path (str): Path ending in ".parquet" or ".csv".
+        columns (list, optional): Only read these columns.
+
+    Returns:
+        pd.DataFrame: The table.
+
+    Raises:
+        CustomException: If the extension is not supported or the file cannot be read.
+    """
+    try:
+        import pandas as pd
+
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet":
+            return pd.read_parquet(file_path, columns=columns)
+        if extension == ".csv":
+            return pd.read_csv(file_path, usecols=columns)
+        raise ValueError(f"Unsupported table format '{extension}' for {file_path}")
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def create_array(file_path, shape, dtype=np.float64, fortran_order=False):
+    """
+    Creates a .npy file of the given shape and returns it as a writable memory map, so large arrays can be
+    filled in place instead of being built in memory and then copied to disk.
+
+    Args:
+        file_path (str): Path of the .npy file.
+        shape (tuple): Shape of the array.
+        dtype: Type of the array.
+        fortran_order (bool): Store columns contiguously, which makes column slices contiguous views.
+
+    Returns:
+        np.memmap: The writable array; call flush() once it is filled.
+
+    Raises:
+        CustomException: If the file cannot be created.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        return np.lib.format.open_memmap(file_path, mode="w+", dtype=dtype, shape=shape, fortran_order=fortran_order)
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def load_array(file_path):
+    """
+    Opens a .npy file as a read-only memory map: nothing is read until the values are used, and worker
+    processes that receive it share the same pages instead of copies.
+
+    Args:
+        file_path (str): Path of the .npy file.
+
+    Returns:
+        np.memmap: The read-only array.
+
+    Raises:
+        CustomException: If the file cannot be opened.
+    """
+    try:
+        return np.load(file_path, mmap_mode="r")
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def iter_table_chunks(file_path, chunk_size, columns=None, dtype=None):
+    """
+    Reads a Parquet or CSV table in chunks of at most `chunk_size` rows, so memory use does not grow with the
+    size of the file.
+
+    Args:
+        file_path (str): Path ending in ".parquet" or ".csv".
+        chunk_size (int): Rows per chunk.
+        columns (list, optional): Only read these columns.
+        dtype (dict, optional): Column types for CSV files; Parquet files keep their own.
+
+    Yields:
+        pd.DataFrame: The next chunk.
+
+    Raises:
+        CustomException: If the extension is not supported or the file cannot be read.
+    """
+    try:
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet":
+            import pyarrow.parquet as pq
+
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size, columns=columns):
+                yield batch.to_pandas()
+        elif extension == ".csv":
+            import pandas as pd
+
+            yield from pd.read_csv(file_path, usecols=columns, dtype=dtype, chunksize=chunk_size)
+        else:
+            raise ValueError(f"Unsupported table format '{extension}' for {file_path}")
+    except Exception as e:
+        raise CustomException(e, sys)
+
+class TableWriter:
+    """
+    Appends DataFrame chunks to a Parquet or CSV file, so a table can be written without ever holding all of it.
+
+    Every chunk must have the columns and types of the first one.
+
+    Usage:
+        with TableWriter(os.path.join("artifacts", "train.parquet")) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.rows = 0
+        self._extension = os.path.splitext(file_path)[1].lower()
+        self._writer = None
+        if self._extension not in (".parquet", ".csv"):
+            raise CustomException(f"Unsupported table format '{self._extension}' for {file_path}", sys)
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+
+    def write(self, df):
+        """
+        Appends a chunk.
+
+        Args:
+            df (pd.DataFrame): The chunk.
+        """
+        try:
+            if self._extension == ".parquet":
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if self._writer is None:
+                    self._writer = pq.ParquetWriter(self.file_path, table.schema)
+                self._writer.write_table(table.cast(self._writer.schema))
+            else:
+                df.to_csv(self.file_path, mode="w" if self.rows == 0 else "a", index=False, header=self.rows == 0)
+            self.rows += len(df)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
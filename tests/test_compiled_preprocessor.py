@@ -0,0 +1,108 @@
+"""
+Parity tests of the compiled preprocessor against the sklearn preprocessor it is compiled from.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.exception import DataValidationError
+from src.components.data_transformation import DataTransformation
+from src.components.data_validaton import FEATURE_COLUMNS, SCORE_RANGE
+from src.pipeline.compiled_preprocessor import compile_preprocessor, build_probe_frame
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "notebook", "data", "stud.csv")
+
+
+def _dense(features):
+    return features.toarray() if hasattr(features, "toarray") else np.asarray(features)
+
+
+def _records(frame):
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return pd.read_csv(DATA_PATH).sample(200, random_state=0).reset_index(drop=True)[FEATURE_COLUMNS]
+
+
+@pytest.fixture(scope="module")
+def preprocessor(frame):
+    return DataTransformation().get_data_transformer_object().fit(frame)
+
+
+@pytest.fixture(scope="module")
+def compiled(preprocessor):
+    return compile_preprocessor(preprocessor)
+
+
+def test_transform_matches_sklearn(compiled, preprocessor, frame):
+    expected = _dense(preprocessor.transform(frame))
+    np.testing.assert_allclose(compiled.transform(_records(frame)), expected, rtol=0, atol=1e-9)
+
+
+def test_every_category_matches_sklearn(compiled, preprocessor, frame):
+    probe = build_probe_frame(compiled)
+    for column, table in zip(compiled.categorical_columns, compiled.category_index):
+        assert set(table) == set(frame[column])
+        assert set(table) <= set(probe[column].dropna())
+
+    expected = _dense(preprocessor.transform(probe))
+    np.testing.assert_allclose(compiled.transform(_records(probe)), expected, rtol=0, atol=1e-9)
+
+
+def test_missing_values_are_imputed_like_sklearn(compiled, preprocessor, frame):
+    probe = frame.head(len(FEATURE_COLUMNS)).copy()
+    for row, column in enumerate(FEATURE_COLUMNS):
+        probe.loc[row, column] = np.nan
+    expected = _dense(preprocessor.transform(probe))
+
+    records = _records(probe)
+    assert all(records[row][column] is None for row, column in enumerate(FEATURE_COLUMNS))
+    np.testing.assert_allclose(compiled.transform(records), expected, rtol=0, atol=1e-9)
+
+    # NaN, as a parsed CSV or a DataFrame gives it, is missing too
+    records = probe.to_dict("records")
+    np.testing.assert_allclose(compiled.transform(records), expected, rtol=0, atol=1e-9)
+
+
+def test_rows_encode_like_dicts(compiled, frame):
+    records = _records(frame.head(20))
+    rows = [[record[column] for column in FEATURE_COLUMNS] for record in records]
+    np.testing.assert_array_equal(compiled.transform(rows), compiled.transform(records))
+
+    numeric, codes = compiled.encode(records, value_range=SCORE_RANGE)
+    np.testing.assert_array_equal(compiled.transform_encoded(numeric, codes), compiled.transform(records))
+
+
+def test_unknown_category_is_rejected(compiled, frame):
+    records = _records(frame.head(3))
+    records[1]["gender"] = "unknown"
+    with pytest.raises(DataValidationError) as raised:
+        compiled.encode(records)
+    assert any("gender" in error and "[1]" in error for error in raised.value.errors)
+
+
+def test_invalid_score_is_rejected(compiled, frame):
+    records = _records(frame.head(3))
+    records[0]["reading_score"] = "abc"
+    records[2]["writing_score"] = 150
+    with pytest.raises(DataValidationError) as raised:
+        compiled.encode(records, value_range=SCORE_RANGE)
+    assert "reading_score is not a number in rows [0]" in raised.value.errors
+    assert "writing_score is outside (0, 100) in rows [2]" in raised.value.errors
+
+
+def test_missing_and_extra_keys_are_rejected(compiled, frame):
+    records = _records(frame.head(3))
+    del records[0]["lunch"]
+    records[2]["writting_score"] = records[2].pop("writing_score")
+    with pytest.raises(DataValidationError) as raised:
+        compiled.encode(records)
+    assert raised.value.errors == [
+        "lunch is missing in rows [0]",
+        "writing_score is missing in rows [2]",
+        "Unknown column 'writting_score' in rows [2]",
+    ]
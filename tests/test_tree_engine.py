@@ -0,0 +1,83 @@
+"""
+Parity tests of the tree engine against model.predict.
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from src.components.tree_engine import TreeEngine, compile_tree_model
+
+ATOL = 1e-9
+MODELS = {
+    "Decision Tree": lambda: DecisionTreeRegressor(max_depth=8, random_state=0),
+    "Random Forest": lambda: RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0),
+    "Gradient Boosting": lambda: GradientBoostingRegressor(n_estimators=30, max_depth=3, random_state=0),
+    "AdaBoost Regressor": lambda: AdaBoostRegressor(n_estimators=20, random_state=0),
+}
+
+
+def _data(n_rows=400, n_features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    X[:, 0] = rng.integers(0, 2, size=n_rows)  # a one-hot like column, so some thresholds are tied by many rows
+    y = 3 * X[:, 0] + X[:, 1] ** 2 - X[:, 2] * X[:, 3] + rng.normal(scale=0.1, size=n_rows)
+    return X, y
+
+
+@pytest.fixture(scope="module", params=list(MODELS))
+def fitted(request):
+    X, y = _data()
+    model = MODELS[request.param]().fit(X, y)
+    engine = compile_tree_model(model)
+    assert isinstance(engine, TreeEngine)
+    return model, engine
+
+
+def test_predict_matches_model(fitted):
+    model, engine = fitted
+    X, _ = _data(n_rows=300, seed=1)
+    np.testing.assert_allclose(engine.predict(X), model.predict(X), rtol=0, atol=ATOL)
+
+
+def test_predict_matches_model_on_thresholds(fitted):
+    model, engine = fitted
+    X = engine.probe(500)
+    np.testing.assert_allclose(engine.predict(X), model.predict(X), rtol=0, atol=ATOL)
+
+
+def test_single_row(fitted):
+    model, engine = fitted
+    X, _ = _data(n_rows=1, seed=2)
+    np.testing.assert_allclose(engine.predict(X), model.predict(X), rtol=0, atol=ATOL)
+    np.testing.assert_allclose(engine.predict(X[0]), model.predict(X), rtol=0, atol=ATOL)
+
+
+def test_empty_batch(fitted):
+    _, engine = fitted
+    preds = engine.predict(np.empty((0, engine.n_features)))
+    assert preds.shape == (0,)
+
+
+def test_batches_larger_than_a_block(fitted, monkeypatch):
+    model, engine = fitted
+    monkeypatch.setattr(engine, "block_size", 7 * engine.n_trees)  # 7 rows per block
+    X, _ = _data(n_rows=50, seed=3)
+    np.testing.assert_allclose(engine.predict(X), model.predict(X), rtol=0, atol=ATOL)
+
+
+def test_wrong_number_of_features_is_rejected(fitted):
+    _, engine = fitted
+    with pytest.raises(ValueError):
+        engine.predict(np.zeros((2, engine.n_features + 1)))
+
+
+@pytest.mark.parametrize("name", ["Decision Tree", "Random Forest"])
+def test_missing_values_follow_the_model(name):
+    X, y = _data()
+    X[::7, 1] = np.nan
+    model = MODELS[name]().fit(X, y)
+    engine = compile_tree_model(model)
+    X_test, _ = _data(n_rows=200, seed=4)
+    X_test[::3, 1] = np.nan
+    np.testing.assert_allclose(engine.predict(X_test), model.predict(X_test), rtol=0, atol=ATOL)